@@ -1,28 +1,66 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 import os
-from dotenv import load_dotenv
-from flask_migrate import Migrate
 
-load_dotenv()
+from config import Config
 
 db = SQLAlchemy()
-migrate = Migrate()
 
-def create_app():
+def create_app(migrations=None):
+    """
+    Build the app. Flask-Migrate (and Alembic with it) is only set up for
+    migrations: under the `flask` CLI (`flask db ...`), or with
+    migrations=True (see migrate.py); serving doesn't pay for importing it.
+    """
     app = Flask(__name__)
-    
-    app.config['SECRET_KEY'] = os.getenv('Secret_Key')
-    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('Database_URL')
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    app.config['GROQ_API_KEY'] = os.getenv('Groq_API_Key')
-    app.config['JWT_SECRET'] = os.getenv('JWT_Secret')
-    
+    # Settings are read once, when config is imported: in a preloading
+    # gunicorn master that is before the fork, so every worker shares them
+    app.config.from_object(Config)
+
     db.init_app(app)
-    migrate.init_app(app, db)
+    if migrations is None:
+        migrations = os.environ.get("FLASK_RUN_FROM_CLI") == "true"
+    if migrations:
+        from flask_migrate import Migrate
+        Migrate(app, db)
 
     from app.models.chat import ChatMessage
+    from app.models.write_behind import chat_writer
+    chat_writer.init_app(app)
+    from app.models.tickets import ticket_store
+    ticket_store.init_app(app)
+    from app.tools import Knowledge_base
+    Knowledge_base.init_app(app)
+
+    from app.observability import tracing
+    tracing.init_app(app)
+
     from app.routes.chat_routes import chat_bp
     app.register_blueprint(chat_bp, url_prefix='/chat')
+
+    if Config.METRICS_ENDPOINT_ENABLED:
+        from app.routes.metrics_routes import metrics_bp
+        app.register_blueprint(metrics_bp)
     
-    return app
\ No newline at end of file
+    return app
+
+
+def warm_up(app):
+    """
+    Do the request path's first-use work now: import the Groq SDK and NumPy,
+    load the intent model and build the knowledge-base and doc indexes. Run in
+    a preforking server's master (gunicorn.conf.py) so every worker starts
+    with it done. Opens no sockets of its own.
+    """
+    from app.agents import llm_gateway
+    from app.agents.intent_router import get_intent_router
+    from app.tools.doc_index import get_doc_index
+    from app.tools.doc_search import DEFAULT_DOCUMENTS
+    from app.tools.Knowledge_base import get_knowledge_base
+
+    llm_gateway.sdk()
+    get_intent_router()
+    get_doc_index(DEFAULT_DOCUMENTS)
+    # Knowledge_Base_From_DB reads through the pool, which post_fork discards
+    with app.app_context():
+        get_knowledge_base()
@@ -0,0 +1,54 @@
+import re
+from functools import lru_cache
+
+from config import Config
+
+# Words and individual punctuation marks, roughly how BPE tokenizers split text.
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+# Chat formatting overhead the API adds around every message.
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@lru_cache(maxsize=4096)
+def estimate_tokens(text: str) -> int:
+    """
+    Fast local approximation of the Llama tokenizer.
+    Short words are usually one token; long words are split every ~5 characters.
+    """
+    return sum(1 + (len(piece) - 1) // 5 for piece in _TOKEN_PATTERN.findall(text))
+
+
+def message_tokens(message) -> int:
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def pack_context(messages, budget=None):
+    """
+    Pack a chat history into a prompt-token budget.
+
+    Leading system messages and the final message are always kept; earlier turns
+    are added newest-first until the budget is reached, so the oldest turns drop
+    out first. Returns (packed_messages, token_count).
+    """
+    if budget is None:
+        budget = Config.CONTEXT_TOKEN_BUDGET - Config.COMPLETION_TOKEN_RESERVE
+
+    pinned = 0
+    while pinned < len(messages) - 1 and messages[pinned]["role"] == "system":
+        pinned += 1
+
+    head = messages[:pinned]
+    tail = messages[-1:]
+    used = sum(message_tokens(message) for message in head + tail)
+
+    kept = []
+    for message in reversed(messages[pinned:-1]):
+        cost = message_tokens(message)
+        if used + cost > budget:
+            break
+        kept.append(message)
+        used += cost
+    kept.reverse()
+
+    return head + kept + tail, used
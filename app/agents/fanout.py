@@ -0,0 +1,99 @@
+"""
+Per-request fan-out of independent work for Orchestration_Mode=concurrent.
+
+A Fanout runs up to Orchestration_Max_Parallel jobs of one request at a time
+on a process-wide thread pool (Orchestration_Pool_Workers threads); further
+jobs run inline in the caller, so a single request can't occupy the whole
+pool. Jobs run in a copy of the caller's context, so their spans and LLM usage
+land on the request's Trace.
+
+Leaving the `with` block cancels jobs that haven't started. A thread can't be
+interrupted mid-call, so a job already talking to Groq finishes and its result
+is dropped. AsyncFanout is the asyncio counterpart; there, cancelling a task
+also aborts its in-flight request.
+"""
+import asyncio
+import contextvars
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from config import Config
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _pool():
+    # Created lazily and per process, so forked gunicorn workers each get their own.
+    global _executor, _executor_pid
+    if _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(
+                    max_workers=Config.ORCHESTRATION_POOL_WORKERS,
+                    thread_name_prefix="orchestrate",
+                )
+                _executor_pid = os.getpid()
+    return _executor
+
+
+class Fanout:
+    def __init__(self, limit=None):
+        self._slots = threading.BoundedSemaphore(max(1, limit or Config.ORCHESTRATION_MAX_PARALLEL))
+        self._futures = []
+
+    def submit(self, fn, *args):
+        """Start fn(*args) on the pool, or run it now if the request has no free slot; returns a Future."""
+        if not self._slots.acquire(blocking=False):
+            future = Future()
+            try:
+                future.set_result(fn(*args))
+            except Exception as exc:
+                future.set_exception(exc)
+            return future
+
+        context = contextvars.copy_context()
+        future = _pool().submit(context.run, fn, *args)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+        return future
+
+    def cancel_pending(self):
+        for future in self._futures:
+            future.cancel()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cancel_pending()
+        return False
+
+
+class AsyncFanout:
+    def __init__(self, limit=None):
+        self._slots = asyncio.Semaphore(max(1, limit or Config.ORCHESTRATION_MAX_PARALLEL))
+        self._tasks = []
+
+    async def _bounded(self, fn, args):
+        async with self._slots:
+            return await fn(*args)
+
+    def submit(self, fn, *args):
+        """Schedule the coroutine fn(*args) as a task; it waits for a slot before starting."""
+        task = asyncio.create_task(self._bounded(fn, args))
+        self._tasks.append(task)
+        return task
+
+    def cancel_pending(self):
+        for task in self._tasks:
+            task.cancel()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.cancel_pending()
+        return False
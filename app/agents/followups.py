@@ -0,0 +1,167 @@
+import re
+import zlib
+
+from app.agents.prompts import FOLLOWUP_PROMPT
+from app.observability.metrics import counter
+
+# InterCloud services for generating relevant questions
+INTERCLOUD_SERVICES = [
+    "Ants Shop online shopping",
+    "Brilliant Cloud services",
+    "Telephony and PBX solutions",
+    "SMS services",
+    "Business Internet and Data connectivity",
+    "Brilliant Connect app"
+]
+
+# Precomputed follow-up questions per service, plus the keywords that tie a
+# response to that service. Picking from here replaces an extra LLM round-trip.
+QUESTION_BANK = {
+    "Ants Shop online shopping": {
+        "keywords": ["ants shop", "shop", "order", "delivery", "return", "cash on delivery", "brand"],
+        "questions": [
+            "Would you like help tracking an Ants Shop order or starting a return?",
+            "Are you looking for a particular brand on Ants Shop today?",
+            "Did you know Ants Shop offers cash on delivery and a 7-day return policy? Would you like to know more?",
+        ],
+    },
+    "Brilliant Cloud services": {
+        "keywords": ["cloud", "server", "vm", "instance", "storage", "s3", "backup", "disaster recovery", "iaas"],
+        "questions": [
+            "Would you like to know how Brilliant Cloud VM instances could host your workloads?",
+            "Are you interested in Brilliant Cloud storage or backup options for your data?",
+            "Could Brilliant Cloud's disaster recovery and scalability help your business?",
+        ],
+    },
+    "Telephony and PBX solutions": {
+        "keywords": ["telephony", "pbx", "call", "ivr", "toll free", "conference", "shortcode", "extension"],
+        "questions": [
+            "Would an app-based Brilliant PBX with personal IVR setup help your team?",
+            "Are you interested in Brilliant Telephony options like toll-free numbers or audio conferencing?",
+            "Would you like to learn how Hosted PBX lets your team roam anywhere with zero upfront cost?",
+        ],
+    },
+    "SMS services": {
+        "keywords": ["sms", "message", "masking", "bulk", "push pull", "text"],
+        "questions": [
+            "Would you like to know more about our enterprise SMS with masking and non-masking options?",
+            "Are you sending customer notifications that could benefit from InterCloud's SMS solutions?",
+            "Would push-pull or return SMS services be useful for your business?",
+        ],
+    },
+    "Business Internet and Data connectivity": {
+        "keywords": ["internet", "data", "connectivity", "mpls", "iplc", "bandwidth", "network", "leased"],
+        "questions": [
+            "Would you like details on InterCloud Business Internet or Direct Internet Access plans?",
+            "Could MPLS or domestic data connectivity help link your branch offices?",
+            "Are you looking to improve your office network with a dedicated InterCloud connection?",
+        ],
+    },
+    "Brilliant Connect app": {
+        "keywords": ["connect", "app", "video call", "calling", "chat", "friends", "family"],
+        "questions": [
+            "Have you tried the Brilliant Connect app for free app-to-app and video calls?",
+            "Would you like to know how Brilliant Connect keeps your messages secure with encryption?",
+            "Would you like help setting up Brilliant Connect to stay in touch with friends and family?",
+        ],
+    },
+}
+
+GENERIC_QUESTIONS = [
+    "Would you like to learn more about any of InterCloud's services, such as our Cloud solutions, Telephony, or Ants Shop?",
+    "Is there anything else I can help you with regarding InterCloud's Cloud, PBX, SMS, or Internet services?",
+]
+
+INTERCLOUD_KEYWORDS = [
+    "intercloud", "ants shop", "cloud", "telephony", "pbx",
+    "sms", "internet", "data", "connect", "brilliant"
+]
+
+# One whole-word pattern per service, so "app" doesn't match "happy".
+_SERVICE_PATTERNS = {
+    service: re.compile(r"\b(?:" + "|".join(re.escape(k) for k in entry["keywords"]) + r")\b")
+    for service, entry in QUESTION_BANK.items()
+}
+
+followup_paths = counter(
+    "followup_questions_total",
+    "Follow-up questions by how they were produced",
+    labelnames=("path",),
+)
+
+
+def _pick(options, response):
+    # Stable per response, but varies across turns so users don't see repeats.
+    return options[zlib.crc32(response.encode("utf-8")) % len(options)]
+
+
+def _matching_service(response_lower):
+    best_service, best_hits = None, 0
+    for service in INTERCLOUD_SERVICES:
+        hits = len(set(_SERVICE_PATTERNS[service].findall(response_lower)))
+        if hits > best_hits:
+            best_service, best_hits = service, hits
+    return best_service
+
+
+def followup_messages(context):
+    """Messages asking the LLM for a follow-up question about `context`."""
+    # Instructions live in the registered system prompt so the prefix is shared across calls
+    return [
+        FOLLOWUP_PROMPT.message(),
+        {"role": "user", "content": f"Conversation context: {context}"}
+    ]
+
+
+def _ask_llm(response, llm):
+    question = llm(followup_messages(response)).strip()
+    if question and not question.endswith('?'):
+        question += "?"
+    return question
+
+
+def _local_suffix(response):
+    """(path, suffix) when no LLM is needed for this response, else None."""
+    response_lower = response.lower()
+
+    # Check if response already ends with a question about InterCloud services
+    if response.endswith('?') and any(keyword in response_lower for keyword in INTERCLOUD_KEYWORDS):
+        return "existing", ""
+
+    service = _matching_service(response_lower)
+    if service:
+        return "bank", f"\n\n{_pick(QUESTION_BANK[service]['questions'], response)}"
+    return None
+
+
+def needs_llm_question(text):
+    """Whether followup_suffix would consult the LLM for this text."""
+    return _local_suffix(text.strip()) is None
+
+
+def followup_suffix(response, llm=None):
+    """
+    Returns the text to append so the response ends with a relevant InterCloud
+    question, or an empty string when it already ends with one.
+
+    Questions come from QUESTION_BANK. `llm` is only consulted when no service
+    matches the response; without it a generic question is used.
+    """
+    response = response.strip()
+    local = _local_suffix(response)
+    if local is not None:
+        path, suffix = local
+        followup_paths.inc(path=path)
+        return suffix
+
+    if llm is not None:
+        try:
+            question = _ask_llm(response, llm)
+            if question:
+                followup_paths.inc(path="llm")
+                return f"\n\n{question}"
+        except Exception:
+            followup_paths.inc(path="llm_error")
+
+    followup_paths.inc(path="generic")
+    return f"\n\n{_pick(GENERIC_QUESTIONS, response)}"
@@ -0,0 +1,247 @@
+"""
+Incident aggregation for keyword-triggered reports.
+
+A carrier-side SMS outage makes many users report "I'm not getting my OTP"
+at once. Every report is counted per category in ring buffers covering the
+last Incident_Window_Seconds, and per conversation in a count-min sketch, so
+a conversation repeating itself doesn't count twice towards the threshold.
+Both are fixed-size and kept per worker.
+
+Once Incident_Threshold distinct conversations of a category have reported
+within the window, the worker opens an incident: one parent ticket, whose
+status goes into the incident store (Incident_Store: 'sqlite' is shared by
+all workers on the host, 'memory' is per worker, 'none' disables
+aggregation). While an incident is open, new reports from any worker are
+attached to the parent ticket instead of opening tickets of their own; the
+ticket_reports unique constraint keeps that to one row per conversation, and the users get a reply built
+from the cached status. Workers re-read the parent ticket's status every
+Incident_Status_TTL seconds. The incident ends when that ticket is resolved
+or when a whole window passes without reports; the next burst after that
+opens a new one.
+
+The parent ticket is keyed by category and window-aligned period, so workers
+crossing the threshold in the same period share one ticket. A resolved
+incident isn't reopened in the period it was resolved in.
+"""
+import hashlib
+import threading
+import time
+from array import array
+
+from app.cache.backends import make_backend
+from app.models.tickets import ticket_store
+from app.observability.metrics import counter
+from config import Config
+
+# What each category's reports are about, for the parent ticket and replies.
+INCIDENT_LABELS = {"otp": "OTP delivery"}
+CLOSED_STATUSES = ("Resolved", "Closed")
+
+# A worker that found no open incident asks the store again after this long.
+_MISS_TTL = 1.0
+
+incident_reports = counter(
+    "incident_reports_total",
+    "Keyword-triggered reports by category and outcome (ticket: no incident open, "
+    "attached: added to the incident, repeat: already attached)",
+    labelnames=("category", "outcome"),
+)
+incidents_opened = counter(
+    "incidents_opened_total",
+    "Incident parent tickets opened, by category",
+    labelnames=("category",),
+)
+
+
+class WindowCounter:
+    """Events in the last `window` seconds, counted in a ring of `buckets` slots."""
+
+    def __init__(self, window, buckets=60):
+        self.buckets = buckets
+        self.width = window / buckets
+        self._counts = [0] * buckets
+        self._periods = [-1] * buckets
+
+    def add(self, now, amount=1):
+        period = int(now // self.width)
+        slot = period % self.buckets
+        if self._periods[slot] != period:
+            # The slot still holds a period that has left the window
+            self._periods[slot] = period
+            self._counts[slot] = 0
+        self._counts[slot] += amount
+
+    def total(self, now):
+        current = int(now // self.width)
+        return sum(count for period, count in zip(self._periods, self._counts) if current - period < self.buckets)
+
+
+class CountMinSketch:
+    """
+    Approximate per-key counts in depth x width counters; estimates never
+    undercount. With the default size a window of 5000 conversations mistakes
+    about one new conversation in 200 for a repeat.
+    """
+
+    def __init__(self, width=16384, depth=4):
+        self.width = width
+        self.depth = depth
+        self._rows = [array("I", bytes(4 * width)) for _ in range(depth)]
+
+    def _cells(self, key):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=4 * self.depth).digest()
+        return [int.from_bytes(digest[4 * row:4 * row + 4], "little") % self.width for row in range(self.depth)]
+
+    def add(self, key):
+        """Count `key` once; returns its new estimate."""
+        estimate = None
+        for row, cell in zip(self._rows, self._cells(key)):
+            row[cell] += 1
+            estimate = row[cell] if estimate is None else min(estimate, row[cell])
+        return estimate
+
+
+class WindowedSketch:
+    """
+    Count-min sketch over a sliding window: two sketches that swap every
+    `window` seconds, so counts cover between one and two windows.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self._current = CountMinSketch()
+        self._previous = None
+        self._rotate_at = None
+
+    def add(self, key, now):
+        if self._rotate_at is None:
+            self._rotate_at = now + self.window
+        elif now >= self._rotate_at:
+            # A gap of two windows leaves nothing worth keeping
+            self._previous = self._current if now < self._rotate_at + self.window else None
+            self._current = CountMinSketch()
+            self._rotate_at = now + self.window
+        count = self._current.add(key)
+        if self._previous is not None:
+            count += min(row[cell] for row, cell in zip(self._previous._rows, self._previous._cells(key)))
+        return count
+
+
+class _Category:
+    def __init__(self, window):
+        self.reports = WindowCounter(window)
+        self.conversations = WindowCounter(window)
+        self.sketch = WindowedSketch(window)
+
+
+class IncidentAggregator:
+    def __init__(self):
+        self._categories = {}
+        self._status = {}
+        self._lock = threading.Lock()
+        self._store = None
+        self._store_lock = threading.Lock()
+
+    def get_store(self):
+        if self._store is None and Config.INCIDENT_STORE != "none":
+            with self._store_lock:
+                if self._store is None:
+                    self._store = make_backend(
+                        Config.INCIDENT_STORE, 64, path=Config.INCIDENT_STORE_PATH, table="incidents"
+                    )
+        return self._store
+
+    def _count(self, category, conversation_id, now):
+        """
+        Count a report; returns the conversations in the window. A sketch
+        collision can make a new conversation look like a repeat, so this only
+        ever undercounts; it never decides whether a report is attached.
+        """
+        with self._lock:
+            stats = self._categories.get(category)
+            if stats is None:
+                stats = self._categories[category] = _Category(Config.INCIDENT_WINDOW_SECONDS)
+            first = stats.sketch.add(conversation_id, now) == 1
+            stats.reports.add(now)
+            if first:
+                stats.conversations.add(now)
+            return stats.conversations.total(now)
+
+    def status(self, category, now=None):
+        """The open incident of `category` as a dict, or None; cached for Incident_Status_TTL."""
+        now = now or time.time()
+        cached = self._status.get(category)
+        if cached is not None and now < cached[0]:
+            return cached[1]
+        store = self.get_store()
+        status = store.get(f"incident:{category}") if store is not None else None
+        if status is not None and now - status["checked_at"] >= Config.INCIDENT_STATUS_TTL:
+            # Reports are still arriving, so this also keeps the incident open
+            status["status"] = ticket_store.status(status["number"]) or status["status"]
+            status["checked_at"] = now
+            store.set(f"incident:{category}", status, Config.INCIDENT_WINDOW_SECONDS)
+        self._status[category] = (now + (Config.INCIDENT_STATUS_TTL if status is not None else _MISS_TTL), status)
+        return status
+
+    def _open(self, category, issue, conversations, now):
+        window = Config.INCIDENT_WINDOW_SECONDS
+        label = INCIDENT_LABELS.get(category, category)
+        ticket, created = ticket_store.create(
+            f"Incident: {label}, {conversations} conversations within {window}s. First report: {issue}",
+            conversation_id=f"incident:{category}",
+            key=f"incident-{category}-{int(now // window)}",
+        )
+        if created:
+            incidents_opened.inc(category=category)
+        status = {
+            "category": category,
+            "label": label,
+            "ticket_id": ticket["ticket_id"],
+            "number": ticket["number"],
+            "status": ticket["status"],
+            "opened_at": now,
+            "checked_at": now,
+        }
+        self.get_store().set(f"incident:{category}", status, window)
+        self._status[category] = (now + Config.INCIDENT_STATUS_TTL, status)
+        return status
+
+    def report(self, category, conversation_id, issue):
+        """
+        Count a report. Returns None when no incident is open (the caller handles
+        the report as before), otherwise the incident status plus "attached":
+        whether this report was just added to the parent ticket.
+        """
+        if self.get_store() is None or conversation_id is None:
+            return None
+        now = time.time()
+        conversations = self._count(category, conversation_id, now)
+        status = self.status(category, now)
+        if status is None and conversations >= Config.INCIDENT_THRESHOLD:
+            status = self._open(category, issue, conversations, now)
+        if status is None or status["status"] in CLOSED_STATUSES:
+            incident_reports.inc(category=category, outcome="ticket")
+            return None
+        # Every report tries: the conversations that pushed the count to the
+        # threshold predate the incident, and the unique constraint drops repeats
+        attached = ticket_store.attach(status["number"], conversation_id, issue)
+        incident_reports.inc(category=category, outcome="attached" if attached else "repeat")
+        return {**status, "attached": attached}
+
+    def counts(self):
+        """Reports and distinct conversations per category in the current window, with any open incident."""
+        now = time.time()
+        with self._lock:
+            categories = {
+                category: {
+                    "reports": stats.reports.total(now),
+                    "conversations": stats.conversations.total(now),
+                }
+                for category, stats in self._categories.items()
+            }
+        for category, counts in categories.items():
+            counts["incident"] = self.status(category, now)
+        return {"window_seconds": Config.INCIDENT_WINDOW_SECONDS, "categories": categories}
+
+
+incidents = IncidentAggregator()
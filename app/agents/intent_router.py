@@ -0,0 +1,201 @@
+"""
+Local intent classifier that routes a message before any network call.
+
+A multinomial logistic regression over hashed word uni/bigrams and character
+trigrams. The weights are one NumPy matrix (features x intents) stored in an
+.npz file; a prediction is a sum of the rows for the message's features plus a
+softmax, i.e. microseconds.
+
+Train and evaluate offline:
+
+    python -m app.agents.intent_router train app/agents/intent_data/train.jsonl app/agents/intent_data/intent_router.npz
+    python -m app.agents.intent_router eval app/agents/intent_data/eval.jsonl
+
+Each worker loads Intent_Model_Path once on first use. Without a model file
+every message is routed to the LLM, which is the behaviour before the router.
+"""
+import argparse
+import json
+import os
+import re
+import threading
+import zlib
+
+import numpy as np
+
+from app.observability.metrics import counter
+from config import Config
+
+# "llm" must stay first: it is the fallback route.
+INTENTS = ("llm", "kb", "ticket", "doc_search")
+N_FEATURES = 1 << 14
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+intent_routes = counter(
+    "intent_routes_total",
+    "Messages by the route the intent router picked",
+    labelnames=("intent",),
+)
+
+
+def _hash(feature):
+    return zlib.crc32(feature.encode("utf-8")) % N_FEATURES
+
+
+def featurize(text):
+    """Hashed feature indices of a message (duplicates count twice)."""
+    words = _WORD_PATTERN.findall(text.lower())
+    features = [f"w:{word}" for word in words]
+    features.extend(f"b:{first} {second}" for first, second in zip(words, words[1:]))
+    for word in words:
+        padded = f"<{word}>"
+        features.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    return np.fromiter((_hash(feature) for feature in features), dtype=np.int64, count=len(features))
+
+
+def _softmax(scores):
+    scores = scores - scores.max(axis=-1, keepdims=True)
+    exp = np.exp(scores)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+class IntentRouter:
+    def __init__(self, weights, bias, intents=INTENTS):
+        self.weights = weights
+        self.bias = bias
+        self.intents = tuple(intents)
+
+    def probabilities(self, text):
+        indices = featurize(text)
+        scores = self.bias + self.weights[indices].sum(axis=0) / max(1.0, np.sqrt(len(indices)))
+        return _softmax(scores)
+
+    def predict(self, text):
+        """(intent, confidence) for a message."""
+        probabilities = self.probabilities(text)
+        best = int(probabilities.argmax())
+        return self.intents[best], float(probabilities[best])
+
+    @classmethod
+    def train(cls, examples, epochs=30, learning_rate=0.5, l2=1e-5, seed=0):
+        """Fit on (text, intent) pairs with plain SGD on the cross-entropy loss."""
+        rng = np.random.default_rng(seed)
+        label_index = {intent: i for i, intent in enumerate(INTENTS)}
+        data = [(featurize(text), label_index[intent]) for text, intent in examples]
+        weights = np.zeros((N_FEATURES, len(INTENTS)), dtype=np.float32)
+        bias = np.zeros(len(INTENTS), dtype=np.float32)
+
+        for epoch in range(epochs):
+            rate = learning_rate / (1 + epoch * 0.1)
+            for position in rng.permutation(len(data)):
+                indices, label = data[position]
+                scale = 1.0 / max(1.0, np.sqrt(len(indices)))
+                probabilities = _softmax(bias + weights[indices].sum(axis=0) * scale)
+                gradient = probabilities
+                gradient[label] -= 1.0
+                np.subtract.at(weights, indices, rate * (scale * gradient + l2 * weights[indices]))
+                bias -= rate * gradient
+        return cls(weights, bias)
+
+    def save(self, path):
+        np.savez_compressed(path, weights=self.weights, bias=self.bias, intents=np.array(self.intents))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["weights"], data["bias"], [str(intent) for intent in data["intents"]])
+
+
+def load_examples(path):
+    """(text, intent) pairs from a JSON-lines file of {"text": ..., "intent": ...}."""
+    with open(path, "r", encoding="utf-8") as handle:
+        rows = [json.loads(line) for line in handle if line.strip()]
+    return [(row["text"], row["intent"]) for row in rows]
+
+
+def evaluate(router, examples, min_confidence=0.0):
+    """
+    Accuracy and per-intent precision/recall. Predictions under `min_confidence`
+    count as "llm", as they would be routed in production.
+    """
+    confusion = {expected: {predicted: 0 for predicted in INTENTS} for expected in INTENTS}
+    for text, expected in examples:
+        predicted, confidence = router.predict(text)
+        if confidence < min_confidence:
+            predicted = INTENTS[0]
+        confusion[expected][predicted] += 1
+
+    per_intent = {}
+    for intent in INTENTS:
+        true_positives = confusion[intent][intent]
+        predicted_total = sum(confusion[expected][intent] for expected in INTENTS)
+        actual_total = sum(confusion[intent].values())
+        per_intent[intent] = {
+            "precision": round(true_positives / predicted_total, 3) if predicted_total else None,
+            "recall": round(true_positives / actual_total, 3) if actual_total else None,
+            "support": actual_total,
+        }
+    correct = sum(confusion[intent][intent] for intent in INTENTS)
+    return {
+        "examples": len(examples),
+        "accuracy": round(correct / len(examples), 3) if examples else None,
+        "per_intent": per_intent,
+        "confusion": confusion,
+    }
+
+
+_router = None
+_router_loaded = False
+_router_lock = threading.Lock()
+
+
+def get_intent_router():
+    """The process-wide router, or None when no model file is available."""
+    global _router, _router_loaded
+    if not _router_loaded:
+        with _router_lock:
+            if not _router_loaded:
+                if Config.INTENT_MODEL_PATH and os.path.exists(Config.INTENT_MODEL_PATH):
+                    _router = IntentRouter.load(Config.INTENT_MODEL_PATH)
+                _router_loaded = True
+    return _router
+
+
+def route_intent(message):
+    """
+    (intent, confidence) for a message. Anything the model isn't sure about
+    goes to "llm", so a wrong guess costs at most the old two-call flow.
+    """
+    router = get_intent_router()
+    intent, confidence = (INTENTS[0], 0.0) if router is None else router.predict(message)
+    if confidence < Config.INTENT_MIN_CONFIDENCE:
+        intent = INTENTS[0]
+    intent_routes.inc(intent=intent)
+    return intent, confidence
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train or evaluate the intent router.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    train_parser = subcommands.add_parser("train", help="fit weights on a labelled JSON-lines file")
+    train_parser.add_argument("examples")
+    train_parser.add_argument("output", help=".npz file to write")
+    train_parser.add_argument("--epochs", type=int, default=30)
+    eval_parser = subcommands.add_parser("eval", help="report accuracy on a labelled JSON-lines file")
+    eval_parser.add_argument("examples")
+    eval_parser.add_argument("--model", default=Config.INTENT_MODEL_PATH)
+    eval_parser.add_argument("--min-confidence", type=float, default=Config.INTENT_MIN_CONFIDENCE)
+    args = parser.parse_args()
+
+    if args.command == "train":
+        examples = load_examples(args.examples)
+        IntentRouter.train(examples, epochs=args.epochs).save(args.output)
+        print(f"Trained on {len(examples)} examples into {args.output}")
+    else:
+        report = evaluate(IntentRouter.load(args.model), load_examples(args.examples), args.min_confidence)
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
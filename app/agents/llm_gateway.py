@@ -0,0 +1,312 @@
+"""
+Single entry point for Groq chat completions.
+
+Owns the pooled HTTP clients and wraps every call with a per-attempt timeout,
+an overall deadline, jittered exponential backoff on 429/5xx/network errors,
+and a circuit breaker. While the breaker is open calls fail fast with
+LLMUnavailable so callers can serve a degraded reply instead of holding a
+worker. Latency and errors are recorded per call site.
+
+The Groq SDK (with httpx and pydantic) is imported on the first call rather
+than at startup, and clients are created per process, so a gunicorn master
+that preloads the app never hands its sockets to the workers.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+
+from app.observability import tracing
+from app.observability.metrics import counter, histogram
+from config import Config
+
+DEFAULT_MODEL = "llama-3.1-8b-instant"
+
+llm_latency = histogram(
+    "llm_call_duration_seconds",
+    "Groq call latency by call site and outcome",
+    labelnames=("call_site", "outcome"),
+)
+llm_errors = counter(
+    "llm_call_errors_total",
+    "Failed Groq attempts by call site and error kind",
+    labelnames=("call_site", "kind"),
+)
+llm_tokens = counter(
+    "llm_tokens_total",
+    "Tokens Groq reported by call site and kind (prompt/completion)",
+    labelnames=("call_site", "kind"),
+)
+
+
+class LLMError(Exception):
+    """The completion could not be produced."""
+
+
+class LLMUnavailable(LLMError):
+    """Upstream is unhealthy (retries exhausted or circuit open); serve a degraded reply."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures. After `reset_timeout`
+    seconds one trial call is let through (half-open); its outcome closes or
+    re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        """
+        False when the call must fail fast, otherwise the state it was let
+        through in: "closed", or "half_open" for the trial call, which must be
+        settled by record_success, record_failure or end_trial.
+        """
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return state
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return state
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def end_trial(self):
+        """The trial call ended without a verdict (client error, other exception, cancellation): count a failure."""
+        with self._lock:
+            if self._trial_in_flight:
+                self.failures += 1
+                self.opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+
+breaker = CircuitBreaker(Config.LLM_BREAKER_THRESHOLD, Config.LLM_BREAKER_RESET_SECONDS)
+
+_client = None
+_async_client = None
+_client_pid = _async_client_pid = None
+_client_lock = threading.Lock()
+
+
+def sdk():
+    """The groq module, imported on first use."""
+    import groq
+
+    return groq
+
+
+def _limits():
+    import httpx
+
+    return httpx.Limits(
+        max_connections=Config.LLM_POOL_CONNECTIONS,
+        max_keepalive_connections=Config.LLM_POOL_KEEPALIVE,
+    )
+
+
+def get_client():
+    """Process-wide Groq client; created on first use in each process so forked workers don't share sockets."""
+    global _client, _client_pid
+    if _client_pid != os.getpid():
+        with _client_lock:
+            if _client_pid != os.getpid():
+                import httpx
+
+                _client = sdk().Groq(
+                    api_key=Config.GROQ_API_KEY,
+                    base_url=Config.GROQ_BASE_URL,
+                    timeout=Config.LLM_TIMEOUT_SECONDS,
+                    max_retries=0,
+                    http_client=httpx.Client(limits=_limits()),
+                )
+                _client_pid = os.getpid()
+    return _client
+
+
+def get_async_client():
+    global _async_client, _async_client_pid
+    if _async_client_pid != os.getpid():
+        import httpx
+
+        _async_client = sdk().AsyncGroq(
+            api_key=Config.GROQ_API_KEY,
+            base_url=Config.GROQ_BASE_URL,
+            timeout=Config.LLM_TIMEOUT_SECONDS,
+            max_retries=0,
+            http_client=httpx.AsyncClient(limits=_limits()),
+        )
+        _async_client_pid = os.getpid()
+    return _async_client
+
+
+def _classify(exc):
+    """(kind, retryable, retry_after_seconds_or_None) for an exception from the SDK."""
+    groq = sdk()
+    if isinstance(exc, groq.APITimeoutError):
+        return "timeout", True, None
+    if isinstance(exc, groq.APIConnectionError):
+        return "connection", True, None
+    if isinstance(exc, groq.APIStatusError):
+        status = exc.status_code
+        if status == 429 or status >= 500:
+            retry_after = exc.response.headers.get("retry-after") if exc.response is not None else None
+            try:
+                retry_after = float(retry_after) if retry_after else None
+            except ValueError:
+                retry_after = None
+            return ("rate_limited" if status == 429 else "server_error"), True, retry_after
+        return f"http_{status}", False, None
+    return type(exc).__name__, False, None
+
+
+def _backoff(attempt, retry_after, remaining):
+    # Full jitter: uniform in [0, base * 2^attempt], capped, honoring Retry-After.
+    delay = random.uniform(0, min(Config.LLM_BACKOFF_MAX_SECONDS, Config.LLM_BACKOFF_BASE_SECONDS * 2 ** attempt))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return min(delay, max(0.0, remaining))
+
+
+def _attempts(call_site):
+    """Shared retry loop state for complete/acomplete: (deadline, whether this is the half-open trial)."""
+    admitted = breaker.allow()
+    if not admitted:
+        llm_errors.inc(call_site=call_site, kind="circuit_open")
+        raise LLMUnavailable("Groq circuit breaker is open")
+    return time.monotonic() + Config.LLM_DEADLINE_SECONDS, admitted == "half_open"
+
+
+def _failed(call_site, exc, attempt, deadline):
+    """Record a failed attempt; returns the sleep before retrying, or raises."""
+    kind, retryable, retry_after = _classify(exc)
+    llm_errors.inc(call_site=call_site, kind=kind)
+    if not retryable:
+        # The request itself is bad; that says nothing about upstream health,
+        # so the failure count of an ongoing outage is left alone.
+        raise LLMError(f"Groq rejected the request ({kind})") from exc
+    remaining = deadline - time.monotonic()
+    if attempt >= Config.LLM_MAX_RETRIES or remaining <= 0:
+        breaker.record_failure()
+        raise LLMUnavailable(f"Groq unavailable after {attempt + 1} attempt(s) ({kind})") from exc
+    return _backoff(attempt, retry_after, remaining)
+
+
+def record_usage(call_site, usage):
+    """Count the usage block of a completion (or of a stream's final chunk)."""
+    if usage is None:
+        return
+    llm_tokens.inc(usage.prompt_tokens or 0, call_site=call_site, kind="prompt")
+    llm_tokens.inc(usage.completion_tokens or 0, call_site=call_site, kind="completion")
+    tracing.record_usage(usage.prompt_tokens, usage.completion_tokens)
+
+
+def chunk_usage(chunk):
+    """Usage carried by a stream chunk: OpenAI-style `usage` or Groq's `x_groq.usage`."""
+    if getattr(chunk, "usage", None) is not None:
+        return chunk.usage
+    x_groq = getattr(chunk, "x_groq", None)
+    return getattr(x_groq, "usage", None) if x_groq is not None else None
+
+
+def complete(messages, call_site, model=DEFAULT_MODEL, stream=False):
+    """
+    Chat completion with retries, deadline and circuit breaking. With
+    stream=True the retry covers establishing the stream, not its body;
+    the caller records the stream's usage with chunk_usage/record_usage.
+    """
+    with tracing.span(f"llm.{call_site}"):
+        response = _complete(messages, call_site, model, stream)
+    if not stream:
+        record_usage(call_site, response.usage)
+    return response
+
+
+def _complete(messages, call_site, model, stream):
+    groq = sdk()
+    deadline, trial = _attempts(call_site)
+    try:
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = get_client().chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    stream=stream,
+                    timeout=max(0.1, min(Config.LLM_TIMEOUT_SECONDS, deadline - time.monotonic())),
+                )
+            except groq.GroqError as exc:
+                llm_latency.observe(time.perf_counter() - start, call_site=call_site, outcome="error")
+                time.sleep(_failed(call_site, exc, attempt, deadline))
+                attempt += 1
+                continue
+            llm_latency.observe(time.perf_counter() - start, call_site=call_site, outcome="ok")
+            breaker.record_success()
+            return response
+    finally:
+        if trial:
+            # However the trial ended, the breaker must not stay half-open with it in flight
+            breaker.end_trial()
+
+
+async def acomplete(messages, call_site, model=DEFAULT_MODEL):
+    """Async counterpart of complete() for the ASGI chat path."""
+    with tracing.span(f"llm.{call_site}"):
+        response = await _acomplete(messages, call_site, model)
+    record_usage(call_site, response.usage)
+    return response
+
+
+async def _acomplete(messages, call_site, model):
+    groq = sdk()
+    deadline, trial = _attempts(call_site)
+    try:
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = await get_async_client().chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    timeout=max(0.1, min(Config.LLM_TIMEOUT_SECONDS, deadline - time.monotonic())),
+                )
+            except groq.GroqError as exc:
+                llm_latency.observe(time.perf_counter() - start, call_site=call_site, outcome="error")
+                await asyncio.sleep(_failed(call_site, exc, attempt, deadline))
+                attempt += 1
+                continue
+            llm_latency.observe(time.perf_counter() - start, call_site=call_site, outcome="ok")
+            breaker.record_success()
+            return response
+    finally:
+        if trial:
+            # However the trial ended, the breaker must not stay half-open with it in flight
+            breaker.end_trial()
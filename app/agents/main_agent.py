@@ -1,24 +1,32 @@
-from groq import Groq
-import os
-from dotenv import load_dotenv
+import asyncio
+import re
 
+from app.agents import llm_gateway, model_router
+from app.agents.context_builder import pack_context
+from app.agents.fanout import AsyncFanout, Fanout
+from app.agents.followups import followup_messages, followup_suffix, needs_llm_question
+from app.agents.incidents import incidents
+from app.agents.llm_gateway import LLMError
+from app.agents.prompts import prompt_for
+from app.cache import response_cache
+from app.cache.single_flight import get_single_flight
+from app.observability.metrics import counter
+from app.observability.tracing import span, traced
 from app.tools.summarizer import summarize_text
 from app.tools.ticket_creator import create_ticket, TICKET_CREATION_LINK
 from app.tools.doc_search import search_docs
-from app.tools.Knowledge_base import search_knowledge_base
-load_dotenv()
+from app.tools.Knowledge_base import get_knowledge_base, search_knowledge_base
+from config import Config
 
-client = Groq(api_key=os.getenv('Groq_API_Key'))
+# Markers the system prompt tells the model to emit when it wants a tool
+TOOL_MARKERS = ("__Search__:", "__SUMMARY__:", "__CREATE_TICKET__:")
+_MARKER_PREFIX_LENGTH = max(len(marker) for marker in TOOL_MARKERS)
 
-# InterCloud services for generating relevant questions
-INTERCLOUD_SERVICES = [
-    "Ants Shop online shopping",
-    "Brilliant Cloud services",
-    "Telephony and PBX solutions",
-    "SMS services",
-    "Business Internet and Data connectivity",
-    "Brilliant Connect app"
-]
+speculative_calls = counter(
+    "speculative_llm_calls_total",
+    "LLM calls started before they were known to be needed, by purpose and outcome",
+    labelnames=("purpose", "outcome"),
+)
 
 
 def _is_otp_issue(message: str) -> bool:
@@ -37,121 +45,578 @@ def _is_otp_issue(message: str) -> bool:
     return any(keyword in normalized for keyword in keywords)
 
 
-def _truncate_history(history, max_messages=15):
+# Asking for a ticket, as opposed to saying what the ticket is about
+_TICKET_REQUEST_WORDS = frozenset("""
+    a about again an and any asap at can case complaint could create do escalate file for get have help i
+    in incident is issue it just kindly like lodge log look make me my need new on open our please pls
+    problem raise regarding register report request someone something submit support the this ticket to up urgent urgently
+    want we with would you
+""".split())
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _describes_issue(message: str) -> bool:
     """
-    Truncate conversation history to keep within token limits.
-    Always keeps system message and the most recent messages.
-    Groq limit is 6000 tokens, so we keep last 15 messages to be safe.
+    Whether a ticket request says what is wrong ("open a ticket, my vm is
+    down") rather than only asking for one ("i want to open a ticket").
     """
-    if len(history) <= max_messages:
-        return history
-    
-    # Always keep the system message (first message)
-    system_message = history[0]
-    
-    # Keep the most recent messages (excluding system message)
-    # This ensures we keep the latest context while staying within token limits
-    recent_messages = history[-(max_messages - 1):]
-    
-    # Combine system message with recent messages
-    return [system_message] + recent_messages
+    details = [word for word in _WORD.findall(message.lower()) if word not in _TICKET_REQUEST_WORDS]
+    return len(details) >= 2
 
 
-def generate_response(messages):
-    # Truncate history to prevent token limit errors
-    messages = _truncate_history(messages, max_messages=20)
-    
-    chat = client.chat.completions.create(
-        model="llama-3.1-8b-instant",
-        messages=messages
-    )
-    return chat.choices[0].message.content
+def _prepare_messages(messages, metadata=None):
+    # Pack history into the prompt-token budget to prevent token limit errors
+    messages, context_tokens = pack_context(messages)
+    if metadata is not None:
+        metadata["context_tokens"] = context_tokens
+        metadata["context_messages"] = len(messages)
+        prompt = prompt_for(messages)
+        if prompt is not None:
+            metadata["prompt_version"] = prompt.version
+            metadata["prompt_tokens"] = prompt.tokens
+    return messages
+
+
+@traced("cache.lookup")
+def _cached_reply(messages, metadata):
+    cache_key, cached = response_cache.lookup(messages, _intent(metadata))
+    if metadata is not None and cache_key is not None:
+        metadata["cache"] = "hit" if cached is not None else "miss"
+    return cache_key, cached
+
+
+def _intent(metadata):
+    return metadata.get("intent") if metadata is not None else None
+
+
+def _flight_key(messages, call_site, metadata):
+    """
+    Single-flight key: the whole conversation (so only calls with the same
+    context are shared) for the same call site and intent, or None when not
+    shareable.
+    """
+    key = response_cache.conversation_key(messages)
+    if key is None:
+        return None
+    return f"{call_site}:{_intent(metadata) or ''}:{key}"
+
+
+def _note_coalesced(metadata, role):
+    if metadata is not None and role in ("follower", "shared"):
+        metadata["coalesced"] = role
+
+
+def generate_response(messages, metadata=None, call_site="answer"):
+    cache_key, cached = _cached_reply(messages, metadata)
+    if cached is not None:
+        return cached
+
+    prepared = _prepare_messages(messages, metadata)
+
+    def complete():
+        chat = model_router.complete(prepared, call_site, _intent(metadata), metadata)
+        return chat.choices[0].message.content
+
+    flights = get_single_flight()
+    key = _flight_key(messages, call_site, metadata) if flights is not None else None
+    if key is None:
+        reply = complete()
+    else:
+        reply, role = flights.do(key, complete)
+        _note_coalesced(metadata, role)
+    response_cache.store(cache_key, reply, messages)
+    return reply
+
+
+async def agenerate_response(messages, metadata=None, call_site="answer"):
+    """Async counterpart of generate_response for the ASGI chat path."""
+    # The response cache is a SQLite file unless configured otherwise
+    cache_key, cached = await asyncio.to_thread(_cached_reply, messages, metadata)
+    if cached is not None:
+        return cached
+
+    prepared = _prepare_messages(messages, metadata)
+
+    async def complete():
+        chat = await model_router.acomplete(prepared, call_site, _intent(metadata), metadata)
+        return chat.choices[0].message.content
+
+    flights = get_single_flight()
+    key = _flight_key(messages, call_site, metadata) if flights is not None else None
+    if key is None:
+        reply = await complete()
+    else:
+        reply, role = await flights.ado(key, complete)
+        _note_coalesced(metadata, role)
+    await asyncio.to_thread(response_cache.store, cache_key, reply, messages)
+    return reply
+
+
+def stream_completion(messages, metadata=None, call_site="answer"):
+    """Yield completion text deltas as Groq produces them."""
+    cache_key, cached = _cached_reply(messages, metadata)
+    if cached is not None:
+        yield cached
+        return
+
+    stream = model_router.stream(_prepare_messages(messages, metadata), call_site, _intent(metadata), metadata)
+    reply = ""
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            reply += chunk.choices[0].delta.content
+            yield chunk.choices[0].delta.content
+        llm_gateway.record_usage(call_site, llm_gateway.chunk_usage(chunk))
+    response_cache.store(cache_key, reply, messages)
+
+
+def _followup_question_llm(messages):
+    return generate_response(messages, call_site="followup_question")
+
+
+@traced("followup")
+def _intercloud_question_suffix(response: str) -> str:
+    """
+    Returns the text to append so the response ends with a relevant InterCloud question,
+    or an empty string when it already ends with one. The LLM is only asked when
+    Followup_LLM_Fallback is enabled and the question bank has no match.
+    """
+    llm = _followup_question_llm if Config.FOLLOWUP_LLM_FALLBACK else None
+    return followup_suffix(response, llm=llm)
+
+async def _aintercloud_question_suffix(response: str) -> str:
+    if Config.FOLLOWUP_LLM_FALLBACK:
+        # Rare path (no bank match); the sync client in a thread is good enough
+        return await asyncio.to_thread(_intercloud_question_suffix, response)
+    return followup_suffix(response)
 
 def _add_intercloud_question(response: str) -> str:
     """
     Ensures the response ends with a relevant InterCloud question.
     If it already ends with a question, returns as is. Otherwise adds one.
     """
-    response = response.strip()
-    
-    # Check if response already ends with a question mark
-    if response.endswith('?'):
-        # Check if it's about InterCloud services
-        response_lower = response.lower()
-        intercloud_keywords = [
-            "intercloud", "ants shop", "cloud", "telephony", "pbx", 
-            "sms", "internet", "data", "connect", "brilliant"
-        ]
-        if any(keyword in response_lower for keyword in intercloud_keywords):
-            return response
-    
-    # Add a relevant InterCloud question
-    question_prompt = (
-        f"Based on this conversation, generate a single, natural question about InterCloud's services "
-        f"(Ants Shop, Cloud, Telephony, PBX, SMS, Internet/Data, or Connect app) that could help the user. "
-        f"Make it conversational and relevant. Return ONLY the question, nothing else."
-    )
-    
-    question_messages = [
-        {"role": "system", "content": "You are a helpful assistant that generates relevant questions about InterCloud services."},
-        {"role": "user", "content": f"Conversation context: {response}\n\n{question_prompt}"}
-    ]
-    
-    try:
-        question = generate_response(question_messages).strip()
-        if question and not question.endswith('?'):
-            question += "?"
-        return f"{response}\n\n{question}"
-    except:
-        # Fallback question if generation fails
-        return f"{response}\n\nWould you like to learn more about any of InterCloud's services, such as our Cloud solutions, Telephony, or Ants Shop?"
-
-def orchestrate_response(history):
+    return response.strip() + _intercloud_question_suffix(response)
+
+@traced("intent")
+def _route(history, metadata=None):
+    """Classify the new user turn locally and record the route taken."""
+    # Imported on first use: NumPy is a large share of startup
+    from app.agents.intent_router import route_intent
+
+    intent, confidence = route_intent(history[-1]["content"])
+    if metadata is not None:
+        metadata["intent"] = intent
+        metadata["intent_confidence"] = round(confidence, 3)
+    return intent
+
+def _direct_reply(history, intent="llm", conversation_id=None):
+    """
+    Replies that need no LLM call: OTP issues, knowledge base hits and clear
+    ticket requests. Returns None when the message should go through the LLM flow.
+    """
     user_message = history[-1]["content"]
 
     # Auto-handle OTP issues: create a ticket using the first prompt and ask for the phone number.
     if _is_otp_issue(user_message):
-        ticket = create_ticket(user_message)
-        response = (
+        # During an OTP incident the report joins the incident's ticket instead
+        with span("tool.incident"):
+            incident = incidents.report("otp", conversation_id, user_message)
+        if incident is not None:
+            return _incident_reply(incident)
+        # One OTP ticket per conversation, however the follow-up messages are worded
+        with span("tool.create_ticket"):
+            ticket, created = create_ticket(user_message, conversation_id, key="otp")
+        if not created:
+            return (
+                f"Your OTP issue is already being tracked in ticket {ticket['ticket_id']}. "
+                f"If you haven't yet, please share the phone number linked to your account so I can add it to the ticket.\n\n"
+                f"You can also create or manage tickets directly at: {TICKET_CREATION_LINK}"
+            )
+        return (
             f"I've opened ticket {ticket['ticket_id']} for your OTP issue based on your first message. "
             f"Please share the phone number linked to your account so I can add it to the ticket.\n\n"
             f"You can also create or manage tickets directly at: {TICKET_CREATION_LINK}"
         )
-        return _add_intercloud_question(response)
 
     # First, check knowledge base
-    kb_result = search_knowledge_base(user_message)
+    with span("kb"):
+        kb_result = search_knowledge_base(user_message)
     
     if kb_result["found"]:
         # Return direct answer from knowledge base
-        return _add_intercloud_question(kb_result["response"])
-    
-    # If not in KB, proceed with normal LLM flow
-    response = generate_response(history)
-    
+        return kb_result["response"]
+
+    # The router is confident this is a KB question; a weaker keyword match is enough
+    if intent == "kb" and kb_result["topic"]:
+        return get_knowledge_base().responses[kb_result["topic"]]
+
+    # Ticket requests that describe the issue skip the __CREATE_TICKET__
+    # round-trip; bare ones go to the LLM, which asks for the details first
+    if intent == "ticket" and _describes_issue(user_message):
+        with span("tool.create_ticket"):
+            ticket, _ = create_ticket(user_message, conversation_id)
+        return (
+            f"I've created ticket {ticket['ticket_id']} for your issue. Our support team will follow up with you.\n\n"
+            f"You can create or manage tickets at: {TICKET_CREATION_LINK}"
+        )
+
+    return None
+
+async def _adirect_reply(history, intent="llm", conversation_id=None):
+    """
+    _direct_reply for the event loop. The OTP and ticket routes read and write
+    tickets through the sync engine, so they run in a thread; the others are
+    in-memory lookups and stay inline.
+    """
+    if intent == "ticket" or _is_otp_issue(history[-1]["content"]):
+        return await asyncio.to_thread(_direct_reply, history, intent, conversation_id)
+    return _direct_reply(history, intent, conversation_id)
+
+def _incident_reply(incident):
+    attached = (
+        "I've added your report to it, so there's no need to open a separate ticket."
+        if incident["attached"]
+        else "Your report is already part of it."
+    )
+    return (
+        f"We're aware of an ongoing problem with {incident['label']} and our team is working on it "
+        f"under incident {incident['ticket_id']} (status: {incident['status']}). {attached} "
+        f"We'll follow up once it's resolved.\n\n"
+        f"You can also create or manage tickets directly at: {TICKET_CREATION_LINK}"
+    )
+
+def _prefetch_docs(history, intent):
+    """
+    For doc questions, run the search up front so one completion answers from
+    the results instead of first asking for __Search__.
+    """
+    if intent == "doc_search":
+        _run_tool(f"__Search__: {history[-1]['content']}", history)
+
+def _run_tool(response, history, conversation_id=None):
+    """
+    Executes the tool requested by a marker in the LLM response and appends its
+    result to the history. Returns the marker handled, or None if there was none.
+    """
     if "__Search__:" in response:
         query = response.replace("__Search__:", "").strip()
-        tool_results = search_docs(query)
+        with span("tool.search_docs"):
+            tool_results = search_docs(query)
         history.append({"role": "assistant", "content": str(tool_results)})
-        response = generate_response(history)
-        return _add_intercloud_question(response)
+        return "__Search__:"
     
     if "__SUMMARY__:" in response:
         text = response.replace("__SUMMARY__:", "").strip()
-        tool_results = summarize_text(text)
+        with span("tool.summarize"):
+            tool_results = summarize_text(text)
         history.append({"role": "assistant", "content": tool_results})
-        response = generate_response(history)
-        return _add_intercloud_question(response)
+        return "__SUMMARY__:"
     
     if "__CREATE_TICKET__:" in response:
         issue = response.replace("__CREATE_TICKET__:", "").strip()
-        tool_results = create_ticket(issue)
+        with span("tool.create_ticket"):
+            tool_results, _ = create_ticket(issue, conversation_id)
         ticket_info = f"Ticket {tool_results['ticket_id']} has been created. You can create or manage tickets at: {TICKET_CREATION_LINK}"
         history.append({"role": "assistant", "content": f"{tool_results}\n{ticket_info}"})
-        response = generate_response(history)
-        # Ensure ticket link is included in final response
-        if TICKET_CREATION_LINK not in response:
-            response += f"\n\nCreate or manage tickets at: {TICKET_CREATION_LINK}"
-        return _add_intercloud_question(response)
+        return "__CREATE_TICKET__:"
+
+    return None
+
+async def _arun_tool(response, history, conversation_id=None):
+    """_run_tool for the event loop; ticket creation runs in a thread."""
+    if "__CREATE_TICKET__:" in response:
+        return await asyncio.to_thread(_run_tool, response, history, conversation_id)
+    return _run_tool(response, history, conversation_id)
+
+def _tool_reply_suffix(marker, response):
+    # Ensure ticket link is included in final response
+    if marker == "__CREATE_TICKET__:" and TICKET_CREATION_LINK not in response:
+        return f"\n\nCreate or manage tickets at: {TICKET_CREATION_LINK}"
+    return ""
+
+def _degraded_reply(user_message, metadata=None):
+    """
+    Answer without the LLM while it is unavailable: the closest knowledge base
+    topic if any keyword matched, otherwise a canned reply with the ticket link.
+    """
+    if metadata is not None:
+        metadata["degraded"] = True
+    knowledge_base = get_knowledge_base()
+    kb_result = knowledge_base.search(user_message)
+    if kb_result["topic"]:
+        return knowledge_base.responses[kb_result["topic"]]
+    return (
+        "I'm having trouble reaching our support assistant right now. Please try again in a few minutes, "
+        f"or create a support ticket directly at: {TICKET_CREATION_LINK}"
+    )
+
+def orchestrate_response(history, metadata=None, conversation_id=None):
+    if Config.ORCHESTRATION_MODE == "concurrent":
+        return _orchestrate_concurrent(history, metadata, conversation_id)
+
+    intent = _route(history, metadata)
+    direct = _direct_reply(history, intent, conversation_id)
+    if direct is not None:
+        return _add_intercloud_question(direct)
+    
+    # If not in KB, proceed with normal LLM flow
+    user_message = history[-1]["content"]
+    _prefetch_docs(history, intent)
+    try:
+        response = generate_response(history, metadata)
+        
+        marker = _run_tool(response, history, conversation_id)
+        if marker:
+            response = generate_response(history, metadata, call_site="tool_followup")
+            response += _tool_reply_suffix(marker, response)
+    except LLMError:
+        response = _degraded_reply(user_message, metadata)
+    
+    return _add_intercloud_question(response)
+
+async def aorchestrate_response(history, metadata=None, conversation_id=None):
+    """
+    Async counterpart of orchestrate_response: LLM calls are awaited so one
+    event loop can multiplex many conversations. Local tools run inline,
+    except ticket reads and writes, which run in a thread.
+    """
+    if Config.ORCHESTRATION_MODE == "concurrent":
+        return await _aorchestrate_concurrent(history, metadata, conversation_id)
+
+    intent = _route(history, metadata)
+    direct = await _adirect_reply(history, intent, conversation_id)
+    if direct is not None:
+        return direct.strip() + await _aintercloud_question_suffix(direct)
+    
+    user_message = history[-1]["content"]
+    _prefetch_docs(history, intent)
+    try:
+        response = await agenerate_response(history, metadata)
+        
+        marker = await _arun_tool(response, history, conversation_id)
+        if marker:
+            response = await agenerate_response(history, metadata, call_site="tool_followup")
+            response += _tool_reply_suffix(marker, response)
+    except LLMError:
+        response = _degraded_reply(user_message, metadata)
     
-    return _add_intercloud_question(response)
\ No newline at end of file
+    return response.strip() + await _aintercloud_question_suffix(response)
+
+def _speculate_answer(history, intent):
+    # Only when no local route is likely to answer, and the prompt won't change
+    # before the completion (doc prefetch adds search results to it).
+    return intent == "llm" and not _is_otp_issue(history[-1]["content"])
+
+def _speculate_question(user_message):
+    # The follow-up question is asked about the user's message instead of the
+    # reply, which doesn't exist yet; skipped when the bank already covers it.
+    return Config.FOLLOWUP_LLM_FALLBACK and needs_llm_question(user_message)
+
+def _drop(future, purpose):
+    """Cancel a speculative call whose result isn't needed."""
+    if future is not None:
+        outcome = "cancelled" if future.cancel() else "discarded"
+        speculative_calls.inc(purpose=purpose, outcome=outcome)
+
+def _tool_calls(response):
+    """
+    Tool requests in a completion. Several marker lines are independent calls;
+    a single marker keeps the whole text as its argument, as _run_tool does.
+    """
+    lines = [line.strip() for line in response.splitlines() if _starts_with_tool_marker(line)]
+    if len(lines) > 1:
+        return lines
+    return [response] if any(marker in response for marker in TOOL_MARKERS) else []
+
+def _tool_output(call, conversation_id=None):
+    output = []
+    return _run_tool(call, output, conversation_id), output
+
+async def _atool_output(call, conversation_id=None):
+    output = []
+    return await _arun_tool(call, output, conversation_id), output
+
+def _finish_tools(history, outputs):
+    """Append tool results to the history in request order; returns the markers handled."""
+    markers = []
+    for marker, output in outputs:
+        history.extend(output)
+        if marker not in markers:
+            markers.append(marker)
+    return markers
+
+def _question_suffix(response, question):
+    """_intercloud_question_suffix, answered by the speculative question when it is needed."""
+    if question is None:
+        return _intercloud_question_suffix(response)
+    if not needs_llm_question(response):
+        _drop(question, "followup")
+        return _intercloud_question_suffix(response)
+    speculative_calls.inc(purpose="followup", outcome="used")
+    with span("followup"):
+        return followup_suffix(response, llm=lambda _messages: question.result())
+
+def _orchestrate_concurrent(history, metadata=None, conversation_id=None):
+    """
+    orchestrate_response with independent work overlapped: the completion starts
+    while the local lookups run and is dropped if one of them answers, the
+    follow-up question is generated alongside the answer, and several tool
+    calls in one completion run side by side.
+    """
+    intent = _route(history, metadata)
+    user_message = history[-1]["content"]
+    with Fanout() as fanout:
+        answer_metadata = {}
+        answer = question = None
+        if _speculate_answer(history, intent):
+            answer = fanout.submit(generate_response, list(history), answer_metadata)
+        if _speculate_question(user_message):
+            question = fanout.submit(_followup_question_llm, followup_messages(user_message))
+
+        direct = _direct_reply(history, intent, conversation_id)
+        if direct is not None:
+            _drop(answer, "answer")
+            return direct.strip() + _question_suffix(direct, question)
+
+        _prefetch_docs(history, intent)
+        try:
+            if answer is not None:
+                response = answer.result()
+                speculative_calls.inc(purpose="answer", outcome="used")
+                if metadata is not None:
+                    metadata.update(answer_metadata)
+            else:
+                response = generate_response(history, metadata)
+
+            calls = _tool_calls(response)
+            if calls:
+                outputs = [fanout.submit(_tool_output, call, conversation_id) for call in calls]
+                markers = _finish_tools(history, [output.result() for output in outputs])
+                response = generate_response(history, metadata, call_site="tool_followup")
+                response += "".join(_tool_reply_suffix(marker, response) for marker in markers)
+        except LLMError:
+            response = _degraded_reply(user_message, metadata)
+
+        return response.strip() + _question_suffix(response, question)
+
+async def _aquestion_suffix(response, question):
+    if question is None:
+        return await _aintercloud_question_suffix(response)
+    if not needs_llm_question(response):
+        _drop(question, "followup")
+        return followup_suffix(response)
+    speculative_calls.inc(purpose="followup", outcome="used")
+    with span("followup"):
+        try:
+            text = await question
+        except LLMError:
+            return followup_suffix(response)
+        return followup_suffix(response, llm=lambda _messages: text)
+
+async def _aorchestrate_concurrent(history, metadata=None, conversation_id=None):
+    """Async counterpart of _orchestrate_concurrent; dropped calls are aborted mid-request."""
+    intent = _route(history, metadata)
+    user_message = history[-1]["content"]
+    async with AsyncFanout() as fanout:
+        answer_metadata = {}
+        answer = question = None
+        if _speculate_answer(history, intent):
+            answer = fanout.submit(agenerate_response, list(history), answer_metadata)
+        if _speculate_question(user_message):
+            question = fanout.submit(agenerate_response, followup_messages(user_message), None, "followup_question")
+
+        direct = await _adirect_reply(history, intent, conversation_id)
+        if direct is not None:
+            _drop(answer, "answer")
+            return direct.strip() + await _aquestion_suffix(direct, question)
+
+        _prefetch_docs(history, intent)
+        try:
+            if answer is not None:
+                response = await answer
+                speculative_calls.inc(purpose="answer", outcome="used")
+                if metadata is not None:
+                    metadata.update(answer_metadata)
+            else:
+                response = await agenerate_response(history, metadata)
+
+            # Local tools run in order; only ticket creation leaves the event loop
+            markers = _finish_tools(history, [await _atool_output(call, conversation_id) for call in _tool_calls(response)])
+            if markers:
+                response = await agenerate_response(history, metadata, call_site="tool_followup")
+                response += "".join(_tool_reply_suffix(marker, response) for marker in markers)
+        except LLMError:
+            response = _degraded_reply(user_message, metadata)
+
+        return response.strip() + await _aquestion_suffix(response, question)
+
+def _starts_with_tool_marker(text):
+    head = text.lstrip()
+    return any(head.startswith(marker) for marker in TOOL_MARKERS)
+
+def _forward_unless_tool_call(deltas):
+    """
+    Re-yields completion deltas as they arrive, unless the completion opens with a
+    tool marker, in which case it is consumed silently. Returns the full text.
+    """
+    text = ""
+    state = "undecided"
+    for delta in deltas:
+        text += delta
+        if state == "text":
+            yield delta
+        elif state == "undecided":
+            head = text.lstrip()
+            if _starts_with_tool_marker(head):
+                state = "tool"
+            elif len(head) < _MARKER_PREFIX_LENGTH and any(marker.startswith(head) for marker in TOOL_MARKERS):
+                # Could still turn into a marker; hold it back a little longer
+                continue
+            else:
+                state = "text"
+                yield text
+    if state == "undecided" and text:
+        yield text
+    return text
+
+def stream_response(history, metadata=None, conversation_id=None):
+    """
+    Streaming counterpart of orchestrate_response: yields reply chunks whose
+    concatenation is the final reply. Tool markers only take effect when the
+    completion starts with one, as the system prompt instructs.
+    """
+    intent = _route(history, metadata)
+    direct = _direct_reply(history, intent, conversation_id)
+    if direct is not None:
+        yield _add_intercloud_question(direct)
+        return
+
+    # The gateway raises LLMError before the first delta, so nothing has been sent yet
+    user_message = history[-1]["content"]
+    _prefetch_docs(history, intent)
+    try:
+        response = yield from _forward_unless_tool_call(stream_completion(history, metadata))
+    except LLMError:
+        yield _add_intercloud_question(_degraded_reply(user_message, metadata))
+        return
+
+    if _starts_with_tool_marker(response):
+        marker = _run_tool(response, history, conversation_id)
+        try:
+            deltas = stream_completion(history, metadata, call_site="tool_followup")
+            response = next(deltas, "")
+        except LLMError:
+            yield _add_intercloud_question(_degraded_reply(user_message, metadata))
+            return
+        if response:
+            yield response
+        for delta in deltas:
+            response += delta
+            yield delta
+        suffix = _tool_reply_suffix(marker, response)
+        if suffix:
+            response += suffix
+            yield suffix
+
+    suffix = _intercloud_question_suffix(response)
+    if suffix:
+        yield suffix
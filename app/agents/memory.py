@@ -0,0 +1,168 @@
+from datetime import datetime
+
+from sqlalchemy import and_, func, literal
+
+from app import db
+from app.models.chat import ChatMessage, ConversationSummary, User
+from app.tools.summarizer import summarize_text
+from config import Config
+
+
+# Lower bound for conversations that have no summary yet.
+_BEGINNING = datetime(1970, 1, 1)
+
+
+def _unsummarized():
+    """
+    Rows newer than the conversation's summary, for queries that outer-join
+    ConversationSummary. Everything at or before summarized_until is already
+    in the summary and outside the window, and the bound lets Postgres skip
+    older partitions of chat_messages.
+    """
+    return ChatMessage.created_at > func.coalesce(
+        ConversationSummary.summarized_until, literal(_BEGINNING, db.DateTime)
+    )
+
+
+def _newest_first(query, limit):
+    rows = (
+        query.order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+        .limit(limit)
+        .all()
+    )
+    rows.reverse()
+    return rows
+
+
+def load_recent_rows(conversation_id, limit=None, session=None):
+    """
+    Load the newest `limit` messages of a conversation plus its rolling summary,
+    in one round-trip.
+
+    Reads newest-first with a LIMIT so the (conversation_id, created_at) index
+    bounds the scan, then flips the rows back into chronological order. Rows
+    already folded into the summary are excluded, so the scan never reaches
+    old (or archived) turns.
+    Returns (summary_text_or_None, [(role, content, created_at), ...]).
+    `session` defaults to the Flask-SQLAlchemy session.
+    """
+    session = session or db.session
+    limit = limit or Config.HISTORY_WINDOW_MESSAGES
+
+    query = (
+        session.query(ChatMessage.role, ChatMessage.content, ChatMessage.created_at, ConversationSummary.summary)
+        .outerjoin(ConversationSummary, ConversationSummary.conversation_id == ChatMessage.conversation_id)
+        .filter(ChatMessage.conversation_id == conversation_id, _unsummarized())
+    )
+    rows = _newest_first(query, limit)
+    summary = rows[0].summary if rows and rows[0].summary else None
+    return summary, [(row.role, row.content, row.created_at) for row in rows]
+
+
+def load_user_history(user_id, limit=None, session=None):
+    """
+    load_recent_rows for the user's default conversation, resolving the user
+    in the same query. Returns (conversation_id, summary, rows), or None when
+    the user doesn't exist.
+    """
+    session = session or db.session
+    limit = limit or Config.HISTORY_WINDOW_MESSAGES
+
+    query = (
+        session.query(
+            User.default_conversation_id,
+            ChatMessage.role,
+            ChatMessage.content,
+            ChatMessage.created_at,
+            ConversationSummary.summary,
+        )
+        .select_from(User)
+        .outerjoin(ConversationSummary, ConversationSummary.conversation_id == User.default_conversation_id)
+        .outerjoin(ChatMessage, and_(
+            ChatMessage.conversation_id == User.default_conversation_id,
+            _unsummarized(),
+        ))
+        .filter(User.id == user_id)
+    )
+    rows = _newest_first(query, limit)
+    if not rows:
+        return None
+
+    summary = rows[0].summary or None
+    messages = [(row.role, row.content, row.created_at) for row in rows if row.role is not None]
+    return rows[0].default_conversation_id, summary, messages
+
+
+def load_recent_history(conversation_id, limit=None, session=None):
+    """
+    Returns (summary_text_or_None, [{"role": ..., "content": ...}, ...]) for
+    the newest `limit` messages of the conversation.
+    """
+    summary, rows = load_recent_rows(conversation_id, limit, session)
+    return summary, [{"role": role, "content": content} for role, content, _ in rows]
+
+
+def _format_summary_line(message):
+    return f"{message.role.capitalize()}: {summarize_text(message.content.strip())}"
+
+
+def update_rolling_summary(conversation_id, window=None, session=None):
+    """
+    Fold messages that have fallen out of the history window into the
+    conversation's summary row.
+
+    Only rows newer than `summarized_until` are read, at most
+    HISTORY_SUMMARY_BATCH at a time, so the cost per turn stays bounded no
+    matter how long the conversation is. Does not commit.
+    """
+    session = session or db.session
+    window = window or Config.HISTORY_WINDOW_MESSAGES
+
+    # Oldest message still inside the window; everything before it is overflow.
+    boundary = (
+        session.query(ChatMessage.created_at)
+        .filter(ChatMessage.conversation_id == conversation_id)
+        .order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+        .offset(window - 1)
+        .limit(1)
+        .scalar()
+    )
+    if boundary is None:
+        return None
+
+    summary = session.get(ConversationSummary, conversation_id)
+
+    query = session.query(ChatMessage).filter(
+        ChatMessage.conversation_id == conversation_id,
+        ChatMessage.created_at < boundary,
+    )
+    if summary and summary.summarized_until:
+        query = query.filter(ChatMessage.created_at > summary.summarized_until)
+
+    overflow = (
+        query.order_by(ChatMessage.created_at.asc(), ChatMessage.id.asc())
+        .limit(Config.HISTORY_SUMMARY_BATCH)
+        .all()
+    )
+    if not overflow:
+        return summary
+
+    if summary is None:
+        summary = ConversationSummary(conversation_id=conversation_id, summary="", message_count=0)
+        session.add(summary)
+
+    lines = [summary.summary] if summary.summary else []
+    lines.extend(_format_summary_line(message) for message in overflow)
+    text = "\n".join(lines)
+
+    # Keep the most recent part of the summary when it outgrows its budget.
+    max_chars = Config.HISTORY_SUMMARY_MAX_CHARS
+    if len(text) > max_chars:
+        text = text[-max_chars:]
+        text = text[text.find("\n") + 1:] if "\n" in text else text
+
+    summary.summary = text
+    summary.summarized_until = overflow[-1].created_at
+    summary.message_count = (summary.message_count or 0) + len(overflow)
+    summary.updated_at = datetime.utcnow()
+    return summary
@@ -0,0 +1,261 @@
+"""
+Model tiers for Groq calls.
+
+Each call picks a tier ("small" or "large") by call site and intent: the
+most specific Model_Routes entry ("answer.doc_search=large") wins, then
+the call site alone ("tool_followup=large"), then DEFAULT_ROUTES. Answers
+from the small tier are escalated to the large one when escalation_reason
+finds them wanting (truncated, empty, hedging, or far too short for a long
+question), unless the large tier is saturated, in which case the small
+answer stands.
+
+Each tier allows Model_<Tier>_Concurrency calls per worker at once. A call
+that waits longer than Model_Tier_Wait_Seconds for a slot fails with
+LLMUnavailable, so the caller serves its degraded reply. Latency, tokens
+and cost are recorded per tier.
+"""
+import asyncio
+import re
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from app.agents import llm_gateway
+from app.agents.llm_gateway import LLMError, LLMUnavailable
+from app.observability.metrics import counter, histogram
+from config import Config
+
+SMALL, LARGE = "small", "large"
+
+DEFAULT_ROUTES = {"answer": SMALL, "tool_followup": SMALL, "followup_question": SMALL}
+# Call sites whose weak small-tier replies are worth a large-tier retry.
+ESCALATING_CALL_SITES = ("answer", "tool_followup")
+
+_HEDGING = re.compile(
+    r"\b(i'?m not sure|i am not sure|i don'?t know|i do not know|i cannot help|i can'?t help|unable to answer)\b",
+    re.IGNORECASE,
+)
+
+tier_latency = histogram(
+    "llm_tier_duration_seconds",
+    "Groq call latency by model tier and call site, including the wait for a tier slot",
+    labelnames=("tier", "call_site"),
+)
+tier_tokens = counter(
+    "llm_tier_tokens_total",
+    "Tokens by model tier and kind (prompt/completion)",
+    labelnames=("tier", "kind"),
+)
+tier_cost = counter(
+    "llm_tier_cost_usd_total",
+    "Estimated spend in USD by model tier, from the Model_*_Price settings",
+    labelnames=("tier",),
+)
+escalations = counter(
+    "llm_escalations_total",
+    "Small-tier replies retried on the large tier, by call site and reason",
+    labelnames=("call_site", "reason"),
+)
+tier_rejections = counter(
+    "llm_tier_rejections_total",
+    "Calls that found their tier saturated, by tier and what happened (failed/kept_small)",
+    labelnames=("tier", "outcome"),
+)
+
+
+class Tier:
+    def __init__(self, name, model, concurrency, input_price, output_price):
+        self.name = name
+        self.model = model
+        self.concurrency = concurrency
+        # USD per million tokens
+        self.input_price = input_price
+        self.output_price = output_price
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self._async_slots = None
+
+    @property
+    def async_slots(self):
+        # Created on first use so it belongs to the running event loop
+        if self._async_slots is None:
+            self._async_slots = asyncio.Semaphore(self.concurrency)
+        return self._async_slots
+
+
+TIERS = {
+    SMALL: Tier(SMALL, Config.MODEL_SMALL, Config.MODEL_SMALL_CONCURRENCY,
+                Config.MODEL_SMALL_INPUT_PRICE, Config.MODEL_SMALL_OUTPUT_PRICE),
+    LARGE: Tier(LARGE, Config.MODEL_LARGE, Config.MODEL_LARGE_CONCURRENCY,
+                Config.MODEL_LARGE_INPUT_PRICE, Config.MODEL_LARGE_OUTPUT_PRICE),
+}
+
+
+def _parse_routes(text):
+    routes = dict(DEFAULT_ROUTES)
+    for entry in filter(None, (part.strip() for part in text.split(","))):
+        key, _, tier = entry.partition("=")
+        if tier.strip() in TIERS:
+            routes[key.strip()] = tier.strip()
+    return routes
+
+
+ROUTES = _parse_routes(Config.MODEL_ROUTES)
+
+
+def tier_for(call_site, intent=None):
+    if intent is not None and f"{call_site}.{intent}" in ROUTES:
+        return TIERS[ROUTES[f"{call_site}.{intent}"]]
+    return TIERS[ROUTES.get(call_site, SMALL)]
+
+
+def escalation_reason(response, messages):
+    """Why a small-tier completion should be retried on the large tier, or None."""
+    choice = response.choices[0]
+    reply = (choice.message.content or "").strip()
+    if choice.finish_reason == "length":
+        return "truncated"
+    if not reply:
+        return "empty"
+    # Tool markers (__Search__: ...) are short by design
+    if reply.startswith("__"):
+        return None
+    if _HEDGING.search(reply):
+        return "low_confidence"
+    question = messages[-1]["content"] if messages and messages[-1]["role"] == "user" else ""
+    if len(question) >= Config.MODEL_ESCALATION_LONG_PROMPT_CHARS and len(reply) < Config.MODEL_ESCALATION_MIN_REPLY_CHARS:
+        return "too_short"
+    return None
+
+
+def record(tier, call_site, elapsed, usage):
+    tier_latency.observe(elapsed, tier=tier.name, call_site=call_site)
+    if usage is None:
+        return
+    prompt_tokens = usage.prompt_tokens or 0
+    completion_tokens = usage.completion_tokens or 0
+    tier_tokens.inc(prompt_tokens, tier=tier.name, kind="prompt")
+    tier_tokens.inc(completion_tokens, tier=tier.name, kind="completion")
+    tier_cost.inc(
+        (prompt_tokens * tier.input_price + completion_tokens * tier.output_price) / 1_000_000,
+        tier=tier.name,
+    )
+
+
+@contextmanager
+def slot(tier, wait=None):
+    """Hold one of the tier's slots; raises LLMUnavailable after `wait` seconds."""
+    wait = Config.MODEL_TIER_WAIT_SECONDS if wait is None else wait
+    if not tier.slots.acquire(timeout=wait):
+        tier_rejections.inc(tier=tier.name, outcome="failed")
+        raise LLMUnavailable(f"{tier.name} model tier is saturated")
+    try:
+        yield
+    finally:
+        tier.slots.release()
+
+
+@asynccontextmanager
+async def aslot(tier, wait=None):
+    wait = Config.MODEL_TIER_WAIT_SECONDS if wait is None else wait
+    try:
+        await asyncio.wait_for(tier.async_slots.acquire(), wait)
+    except asyncio.TimeoutError:
+        tier_rejections.inc(tier=tier.name, outcome="failed")
+        raise LLMUnavailable(f"{tier.name} model tier is saturated") from None
+    try:
+        yield
+    finally:
+        tier.async_slots.release()
+
+
+def _note(metadata, tier, reason=None):
+    if metadata is not None:
+        metadata["model"] = tier.model
+        if reason is not None:
+            metadata["escalated"] = reason
+
+
+def _should_escalate(tier, call_site):
+    return Config.MODEL_ESCALATION and tier.name == SMALL and call_site in ESCALATING_CALL_SITES
+
+
+def complete(messages, call_site, intent=None, metadata=None):
+    """llm_gateway.complete on the routed tier, escalating when the answer falls short."""
+    tier = tier_for(call_site, intent)
+    start = time.perf_counter()
+    with slot(tier):
+        response = llm_gateway.complete(messages, call_site, model=tier.model)
+    record(tier, call_site, time.perf_counter() - start, response.usage)
+
+    reason = escalation_reason(response, messages) if _should_escalate(tier, call_site) else None
+    if reason is None:
+        _note(metadata, tier)
+        return response
+
+    large = TIERS[LARGE]
+    # Don't queue behind a saturated large tier; the small answer is better than a wait
+    if not large.slots.acquire(blocking=False):
+        tier_rejections.inc(tier=large.name, outcome="kept_small")
+        _note(metadata, tier)
+        return response
+    escalations.inc(call_site=call_site, reason=reason)
+    start = time.perf_counter()
+    try:
+        escalated = llm_gateway.complete(messages, call_site, model=large.model)
+    except LLMError:
+        # The small answer is still an answer
+        _note(metadata, tier)
+        return response
+    finally:
+        large.slots.release()
+    record(large, call_site, time.perf_counter() - start, escalated.usage)
+    _note(metadata, large, reason)
+    return escalated
+
+
+async def acomplete(messages, call_site, intent=None, metadata=None):
+    """Async counterpart of complete()."""
+    tier = tier_for(call_site, intent)
+    start = time.perf_counter()
+    async with aslot(tier):
+        response = await llm_gateway.acomplete(messages, call_site, model=tier.model)
+    record(tier, call_site, time.perf_counter() - start, response.usage)
+
+    reason = escalation_reason(response, messages) if _should_escalate(tier, call_site) else None
+    if reason is None:
+        _note(metadata, tier)
+        return response
+
+    large = TIERS[LARGE]
+    if large.async_slots.locked():
+        tier_rejections.inc(tier=large.name, outcome="kept_small")
+        _note(metadata, tier)
+        return response
+    escalations.inc(call_site=call_site, reason=reason)
+    start = time.perf_counter()
+    try:
+        async with aslot(large):
+            escalated = await llm_gateway.acomplete(messages, call_site, model=large.model)
+    except LLMError:
+        _note(metadata, tier)
+        return response
+    record(large, call_site, time.perf_counter() - start, escalated.usage)
+    _note(metadata, large, reason)
+    return escalated
+
+
+def stream(messages, call_site, intent=None, metadata=None):
+    """
+    Streamed completion on the routed tier, holding the tier slot until the
+    stream is consumed or closed. Streams are never escalated: their text is
+    already on its way to the client.
+    """
+    tier = tier_for(call_site, intent)
+    start = time.perf_counter()
+    usage = None
+    with slot(tier):
+        _note(metadata, tier)
+        for chunk in llm_gateway.complete(messages, call_site, model=tier.model, stream=True):
+            usage = llm_gateway.chunk_usage(chunk) or usage
+            yield chunk
+    record(tier, call_site, time.perf_counter() - start, usage)
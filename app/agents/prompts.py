@@ -0,0 +1,127 @@
+"""
+Prompt template registry.
+
+System prompts are built once at import and registered with a content-derived
+version and a token estimate. Requests put the registered prompt first, byte for
+byte, and everything per-conversation (summary, turns) after it, so the provider
+can reuse its cached prefix across requests.
+"""
+import hashlib
+
+from app.agents.context_builder import estimate_tokens
+
+# InterCloud company context
+INTERCLOUD_CONTEXT = """
+InterCloud (https://intercloud.com.bd/) is a leading IT-enabled technology brand of Bangladesh, part of Brilliant Group. 
+
+Our Products & Services:
+1. Ants Shop - Online shopping hub bringing major national brands into a single platform with best prices, easy ordering, 7-day return policy, quick delivery, and cash on delivery.
+
+2. Brilliant Cloud - First public cloud service provider in Bangladesh offering:
+   - IaaS/VM Instance, BaaS, STaaS, S3, LaaS, MaaS
+   - Cost savings, no power headaches, no physical servers
+   - Fast disaster recovery, redundancy, scalability
+
+3. Brilliant Telephony - Nationwide IP Telephony Service Provider (IPTSP) with:
+   - App-based PBX, Hosted PBX, Business Telephony
+   - Audio Conference, Toll Free Service, Shortcode
+
+4. Brilliant PBX - First app-based PBX solution in Bangladesh with:
+   - Personal IVR Setup, Custom Portal to Manage
+   - 0 Upfront Cost, Roam Anywhere
+   - Free App to App Calls, 24/7 Customer Support, Easy Configuration
+
+5. SMS Solutions - Commercial enterprise SMS with:
+   - Call Back Option, Push Pull Service
+   - Masking, Non-masking, Return SMS, QoS Ensured
+
+6. Internet & Data - Global telecommunications leadership:
+   - Business Internet, Domestic Data Connectivity
+   - Multi Protocol Label Switching (MPLS)
+   - Direct Internet Access, Internet Private Leased Circuit (IPLC)
+
+7. Brilliant Connect - Communication app for friends and family:
+   - App to App Calling, Video Calling, Text Messaging
+   - Photo and Video Sharing, Location Sharing
+   - Security by Encryption
+
+Sister Companies: NovoTel, NovoCom, Novoair, Tusuka
+"""
+
+SYSTEM_PROMPT = (
+    f"You are a smart AI support agent for InterCloud company (https://intercloud.com.bd/).\n\n"
+    f"{INTERCLOUD_CONTEXT}\n\n"
+    "IMPORTANT RULES:\n"
+    "1. Always maintain awareness of InterCloud's products and services in every conversation.\n"
+    "2. When users greet you or express they need help, ask what issue they're experiencing.\n"
+    "3. Once you understand their issue clearly, use the appropriate tool:\n\n"
+    "- To search documentation: respond ONLY with '__Search__: <query>'\n"
+    "- To summarize text: respond ONLY with '__SUMMARY__: <text>'\n"
+    "- To create a support ticket: respond ONLY with '__CREATE_TICKET__: <issue_description>'\n\n"
+    "4. Always gather enough information before creating a ticket. The issue description should be clear and specific.\n"
+    "5. After responding to the user, ALWAYS end your message with a relevant question about InterCloud's services or products that could help them further. "
+    "This question should be natural and related to the conversation context, even if the conversation went off-topic.\n"
+    "6. When creating tickets, always provide the direct ticket creation link: https://app-support.brilliant.com.bd/create-ticket"
+    "7. If they ask for Ants Shop website, provide this link: https://ants.brilliant.com.bd/"
+)
+
+
+FOLLOWUP_SYSTEM_PROMPT = (
+    "You are a helpful assistant that generates relevant questions about InterCloud services.\n\n"
+    "Based on the conversation context the user gives you, generate a single, natural question about InterCloud's services "
+    "(Ants Shop, Cloud, Telephony, PBX, SMS, Internet/Data, or Connect app) that could help the user. "
+    "Make it conversational and relevant. Return ONLY the question, nothing else."
+)
+
+
+class PromptTemplate:
+    """A registered system prompt: its text, content version and token estimate."""
+
+    def __init__(self, name, text):
+        self.name = name
+        self.text = text
+        self.version = f"{name}@{hashlib.sha256(text.encode('utf-8')).hexdigest()[:10]}"
+        self.tokens = estimate_tokens(text)
+
+    def message(self):
+        return {"role": "system", "content": self.text}
+
+
+# name -> PromptTemplate, and text -> PromptTemplate to recognise a request's prefix
+PROMPTS = {}
+_BY_TEXT = {}
+
+
+def register_prompt(name, text):
+    template = PromptTemplate(name, text)
+    PROMPTS[name] = template
+    _BY_TEXT[text] = template
+    return template
+
+
+def get_prompt(name):
+    return PROMPTS[name]
+
+
+def prompt_for(messages):
+    """The registered template a request starts with, or None."""
+    if messages and messages[0]["role"] == "system":
+        return _BY_TEXT.get(messages[0]["content"])
+    return None
+
+
+SUPPORT_PROMPT = register_prompt("support", SYSTEM_PROMPT)
+FOLLOWUP_PROMPT = register_prompt("followup_question", FOLLOWUP_SYSTEM_PROMPT)
+
+
+def build_history(summary, previous_messages, user_message):
+    """
+    Stable system prompt first, then the rolling summary as its own system
+    message, the recent turns and the new user turn.
+    """
+    history = [SUPPORT_PROMPT.message()]
+    if summary:
+        history.append({"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"})
+    history.extend(previous_messages)
+    history.append({"role": "user", "content": user_message})
+    return history
@@ -1,21 +1,28 @@
 import jwt
-import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from functools import wraps
 from flask import request, jsonify
-from dotenv import load_dotenv
 
-load_dotenv()
+from config import Config
 
-JWT_SECRET = os.getenv('JWT_Secret', os.getenv('Secret_Key'))
+JWT_SECRET = Config.JWT_SECRET or Config.SECRET_KEY
 ACCESS_TOKEN_EXPIRY = timedelta(hours=1)  # 1 hour
 
+# Tokens whose signature already checked out -> decoded payload, reused until
+# the token's own expiry so repeat requests skip the HMAC and JSON decode.
+_verified_tokens = OrderedDict()
+_verified_lock = threading.Lock()
 
-def generate_access_token(user_id, email):
-    """Generate a JWT access token"""
+
+def generate_access_token(user_id, email, conversation_id=None):
+    """Generate a JWT access token carrying the user's default conversation id"""
     payload = {
         'user_id': user_id,
         'email': email,
+        'conversation_id': conversation_id,
         'type': 'access',
         'exp': datetime.utcnow() + ACCESS_TOKEN_EXPIRY,
         'iat': datetime.utcnow()
@@ -23,10 +30,34 @@ def generate_access_token(user_id, email):
     return jwt.encode(payload, JWT_SECRET, algorithm='HS256')
 
 
+def _cached_payload(token):
+    with _verified_lock:
+        entry = _verified_tokens.get(token)
+        if entry is None:
+            return None
+        if entry['exp'] <= time.time():
+            del _verified_tokens[token]
+            return None
+        _verified_tokens.move_to_end(token)
+        return entry
+
+
+def _remember(token, payload):
+    if Config.JWT_CACHE_SIZE <= 0 or not isinstance(payload.get('exp'), (int, float)):
+        return
+    with _verified_lock:
+        _verified_tokens[token] = payload
+        while len(_verified_tokens) > Config.JWT_CACHE_SIZE:
+            _verified_tokens.popitem(last=False)
+
+
 def verify_token(token, token_type='access'):
-    """Verify and decode a JWT token"""
+    """Verify and decode a JWT token. The returned payload is shared; don't modify it."""
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
+        payload = _cached_payload(token)
+        if payload is None:
+            payload = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
+            _remember(token, payload)
         
         # Verify token type
         if payload.get('type') != token_type:
@@ -54,6 +85,34 @@ def get_token_from_header():
         return None
 
 
+class CurrentUser:
+    """The authenticated caller, taken from the access token without a database lookup."""
+
+    __slots__ = ('id', 'email', 'default_conversation_id')
+
+    def __init__(self, id, email, default_conversation_id=None):
+        self.id = id
+        self.email = email
+        self.default_conversation_id = default_conversation_id
+
+    @classmethod
+    def from_payload(cls, payload):
+        return cls(payload.get('user_id'), payload.get('email'), payload.get('conversation_id'))
+
+
+def get_current_user():
+    """The request's authenticated user, or None for anonymous/invalid tokens. Resolved once per request."""
+    if not hasattr(request, 'current_user'):
+        user = None
+        token = get_token_from_header()
+        if token:
+            payload, error = verify_token(token, token_type='access')
+            if not error:
+                user = CurrentUser.from_payload(payload)
+        request.current_user = user
+    return request.current_user
+
+
 def token_required(f):
     """Decorator to protect routes with JWT authentication"""
     @wraps(f)
@@ -69,6 +128,7 @@ def token_required(f):
             return jsonify({"error": error}), 401
         
         # Add user info to request context
+        request.current_user = CurrentUser.from_payload(payload)
         request.current_user_id = payload.get('user_id')
         request.current_user_email = payload.get('email')
         
@@ -0,0 +1,136 @@
+"""
+Password hashing off the request workers.
+
+Hashes are deliberately CPU-heavy, so register/login hand them to a small
+process pool (Password_Hash_Workers processes per worker) instead of computing
+them inline. At most Password_Hash_Queue_Max jobs may be queued or running;
+beyond that callers get AuthBusy immediately and answer 503, so a login spike
+can't tie up every worker that also serves chat.
+
+The hash method and cost come from Password_Hash_Method (any werkzeug method
+string, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000"). A successful login
+whose stored hash used other parameters returns a fresh hash to store.
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from app.observability.metrics import counter, histogram
+from config import Config
+
+hash_latency = histogram(
+    "auth_password_hash_duration_seconds",
+    "Password hash/verify time including queueing, by operation and outcome",
+    labelnames=("operation", "outcome"),
+)
+hash_rejections = counter(
+    "auth_password_hash_rejections_total",
+    "Password hash/verify jobs refused because the pool was saturated or slow",
+    labelnames=("operation", "reason"),
+)
+
+
+class AuthBusy(Exception):
+    """The hashing pool is saturated (or too slow); ask the client to retry."""
+
+
+@lru_cache(maxsize=8)
+def _method_prefix(method):
+    # Werkzeug expands short names ("scrypt") to the full parameter string it stores.
+    return generate_password_hash("", method=method).split("$", 1)[0]
+
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _verify(stored_hash, password, method):
+    """(valid, new_hash); new_hash is set when the stored hash used other parameters."""
+    if not check_password_hash(stored_hash, password):
+        return False, None
+    if stored_hash.split("$", 1)[0] != _method_prefix(method):
+        return True, generate_password_hash(password, method=method)
+    return True, None
+
+
+class PasswordHasher:
+    def __init__(self):
+        self._executor = None
+        self._pid = None
+        self._slots = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        # Created lazily and per process, so forked gunicorn workers each get their own.
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=Config.PASSWORD_HASH_WORKERS,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                    self._slots = threading.BoundedSemaphore(Config.PASSWORD_HASH_QUEUE_MAX)
+                    self._pid = os.getpid()
+        return self._executor
+
+    def _run(self, operation, fn, *args):
+        executor = self._pool()
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            hash_rejections.inc(operation=operation, reason="saturated")
+            raise AuthBusy("password hashing pool is saturated")
+
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            try:
+                future = executor.submit(fn, *args)
+            except BaseException:
+                slots.release()
+                raise
+            # The slot is held until the job is done, not until we stop waiting
+            # for it, so timed-out hashes still count against Password_Hash_Queue_Max
+            future.add_done_callback(lambda _: slots.release())
+            result = future.result(timeout=Config.PASSWORD_HASH_TIMEOUT_SECONDS)
+            outcome = "ok"
+            return result
+        except FutureTimeout:
+            future.cancel()
+            outcome = "timeout"
+            hash_rejections.inc(operation=operation, reason="timeout")
+            raise AuthBusy("password hashing timed out") from None
+        except BrokenProcessPool:
+            # A pool process died (e.g. OOM-killed): shut the broken pool down, unless
+            # another caller already replaced it, and start a fresh one on the next call
+            with self._lock:
+                if self._executor is executor:
+                    self.shutdown()
+            hash_rejections.inc(operation=operation, reason="broken_pool")
+            raise AuthBusy("password hashing pool restarted") from None
+        finally:
+            hash_latency.observe(time.perf_counter() - start, operation=operation, outcome=outcome)
+
+    def hash(self, password):
+        return self._run("hash", _hash, password, Config.PASSWORD_HASH_METHOD)
+
+    def verify(self, stored_hash, password):
+        """(valid, new_hash_or_None); store new_hash when it is returned."""
+        return self._run("verify", _verify, stored_hash, password, Config.PASSWORD_HASH_METHOD)
+
+    def shutdown(self):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = self._pid = None
+
+
+password_hasher = PasswordHasher()
+# Each process shuts down only the pool it started (see shutdown)
+atexit.register(password_hasher.shutdown)
@@ -0,0 +1,270 @@
+"""
+Per-client rate limiting for the chat endpoints.
+
+Each client (the JWT user_id, or the remote IP for anonymous traffic) has two
+token buckets:
+
+- requests: one token per chat request, refilled at Rate_Limit_Requests_Per_Minute
+  up to Rate_Limit_Request_Burst;
+- llm_tokens: refilled at Rate_Limit_LLM_Tokens_Per_Minute up to
+  Rate_Limit_LLM_Token_Burst. The prompt and reply tokens of a turn are charged
+  after it completes, which can push the bucket below zero; the client is then
+  refused until it refills.
+
+A refused request gets a 429 with Retry-After. Buckets live in a pluggable
+store: 'memory' (per worker), 'sqlite' (shared by the workers on one host),
+'redis' (shared across hosts; needs the redis package) or 'none' (disabled).
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import g, jsonify, request
+
+from app.agents.context_builder import estimate_tokens
+from app.auth.jwt_auth import get_current_user
+from app.observability.metrics import counter
+from config import Config
+
+rate_limit_rejections = counter(
+    "rate_limit_rejections_total",
+    "Chat requests refused by the rate limiter, by exhausted bucket",
+    labelnames=("bucket",),
+)
+
+# `require` that every bucket satisfies, for charges that may go into debt.
+NO_MINIMUM = -1e18
+
+
+def _refill(tokens, updated_at, now, rate, capacity):
+    return min(capacity, tokens + max(0.0, now - updated_at) * rate)
+
+
+def _take(tokens, cost, require, rate):
+    """(tokens_after, retry_after) for a bucket already refilled to `tokens`."""
+    if tokens >= require:
+        return tokens - cost, 0.0
+    return tokens, (require - tokens) / rate if rate > 0 else math.inf
+
+
+class MemoryBucketStore:
+    """Buckets in a dict, private to the worker. Least recently used keys are dropped past max_keys."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, cost, require, rate, capacity):
+        now = time.monotonic()
+        with self._lock:
+            state = self._buckets.get(key)
+            tokens = capacity if state is None else _refill(state[0], state[1], now, rate, capacity)
+            tokens, retry_after = _take(tokens, cost, require, rate)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+
+class SQLiteBucketStore:
+    """Buckets in a local SQLite file (WAL), updated in one immediate transaction per call."""
+
+    # Idle buckets are full again; drop them every this many writes.
+    PURGE_EVERY = 1024
+    PURGE_IDLE_SECONDS = 3600
+
+    def __init__(self, path, table="rate_limit_buckets"):
+        self.path = path
+        self.table = table
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        # One connection per thread, reopened after a fork.
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def consume(self, key, cost, require, rate, capacity):
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(f"SELECT tokens, updated_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            tokens = capacity if row is None else _refill(row[0], row[1], now, rate, capacity)
+            tokens, retry_after = _take(tokens, cost, require, rate)
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, tokens, updated_at) VALUES (?, ?, ?)",
+                (key, tokens, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            conn.execute(f"DELETE FROM {self.table} WHERE updated_at < ?", (now - self.PURGE_IDLE_SECONDS,))
+        return retry_after
+
+
+# Atomic refill-and-take on a hash {t: tokens, u: updated_at}; returns retry_after as a string.
+_REDIS_CONSUME = """
+local state = redis.call('HMGET', KEYS[1], 't', 'u')
+local cost, require, rate, capacity, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4]), tonumber(ARGV[5])
+local tokens = capacity
+if state[1] then
+    tokens = math.min(capacity, tonumber(state[1]) + math.max(0, now - tonumber(state[2])) * rate)
+end
+local retry_after = 0
+if tokens >= require then
+    tokens = tokens - cost
+else
+    retry_after = (require - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 't', tokens, 'u', now)
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[6]))
+return tostring(retry_after)
+"""
+
+
+class RedisBucketStore:
+    """Buckets in Redis (or any server speaking its protocol), updated by one Lua script call."""
+
+    def __init__(self, url, prefix="ratelimit:"):
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("Rate_Limit_Store=redis needs the 'redis' package") from exc
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(_REDIS_CONSUME)
+
+    def consume(self, key, cost, require, rate, capacity):
+        # Long enough for an empty bucket to refill, after which the key carries no information.
+        idle_ttl = max(1, int(capacity / rate) + 1) if rate > 0 else 86400
+        retry_after = self._script(
+            keys=[self.prefix + key],
+            args=[cost, require, rate, capacity, time.time(), idle_ttl],
+        )
+        return float(retry_after)
+
+
+def make_store(kind, path=None, url=None):
+    """Build a bucket store from config: 'memory', 'sqlite', 'redis' or 'none' (returns None)."""
+    if kind == "none":
+        return None
+    if kind == "memory":
+        return MemoryBucketStore()
+    if kind == "sqlite":
+        return SQLiteBucketStore(path)
+    if kind == "redis":
+        return RedisBucketStore(url)
+    raise ValueError(f"Unknown rate limit store: {kind}")
+
+
+class RateLimiter:
+    def __init__(self, store, requests_per_minute, request_burst, llm_tokens_per_minute, llm_token_burst):
+        self.store = store
+        self.request_rate = requests_per_minute / 60.0
+        self.request_burst = request_burst
+        self.token_rate = llm_tokens_per_minute / 60.0
+        self.token_burst = llm_token_burst
+
+    def check(self, key):
+        """
+        Take one request token. Returns (None, 0) when allowed, else the exhausted
+        bucket and the seconds until the request would be allowed.
+        """
+        if self.store is None:
+            return None, 0.0
+        # LLM budget first, without spending: the turn is charged once its size is known
+        retry_after = self.store.consume(f"tok:{key}", 0, 1, self.token_rate, self.token_burst)
+        if retry_after:
+            return "llm_tokens", retry_after
+        retry_after = self.store.consume(f"req:{key}", 1, 1, self.request_rate, self.request_burst)
+        if retry_after:
+            return "requests", retry_after
+        return None, 0.0
+
+    def charge(self, key, tokens):
+        """Spend LLM tokens after a turn; always applied, even into debt."""
+        if self.store is not None and tokens > 0:
+            self.store.consume(f"tok:{key}", tokens, NO_MINIMUM, self.token_rate, self.token_burst)
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """The process-wide limiter built from Config on first use."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter(
+                    make_store(Config.RATE_LIMIT_STORE, Config.RATE_LIMIT_STORE_PATH, Config.RATE_LIMIT_REDIS_URL),
+                    Config.RATE_LIMIT_REQUESTS_PER_MINUTE,
+                    Config.RATE_LIMIT_REQUEST_BURST,
+                    Config.RATE_LIMIT_LLM_TOKENS_PER_MINUTE,
+                    Config.RATE_LIMIT_LLM_TOKEN_BURST,
+                )
+    return _limiter
+
+
+def client_key(user, remote_addr):
+    """'user:<id>' for an authenticated caller, otherwise 'ip:<address>'."""
+    if user is not None and user.id is not None:
+        return f"user:{user.id}"
+    return f"ip:{remote_addr}"
+
+
+def llm_tokens_used(metadata, reply):
+    """
+    Prompt plus reply tokens of a turn: Groq's reported usage when present,
+    otherwise the local estimate, or 0 when no LLM call was made.
+    """
+    if "usage" in metadata:
+        return metadata["usage"]["prompt_tokens"] + metadata["usage"]["completion_tokens"]
+    if "context_tokens" not in metadata:
+        return 0
+    return metadata["context_tokens"] + estimate_tokens(reply)
+
+
+def too_many_requests(bucket, retry_after):
+    """(body, headers) of a 429 reply."""
+    rate_limit_rejections.inc(bucket=bucket)
+    seconds = max(1, math.ceil(retry_after))
+    return {"error": "rate limit exceeded", "limit": bucket, "retry_after": seconds}, {"Retry-After": str(seconds)}
+
+
+def rate_limited(f):
+    """Decorator: refuse the request with 429 when the client is over its limits."""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        key = client_key(get_current_user(), request.remote_addr)
+        bucket, retry_after = get_rate_limiter().check(key)
+        if bucket:
+            body, headers = too_many_requests(bucket, retry_after)
+            return jsonify(body), 429, headers
+
+        # Routes charge the turn's LLM tokens against this key once it completes
+        g.rate_limit_key = key
+        return f(*args, **kwargs)
+
+    return decorated
@@ -0,0 +1,123 @@
+"""
+Conversation-state cache.
+
+Keeps what load_recent_rows would return for a conversation (its rolling
+summary and newest History_Window_Messages turns) so a turn only reads
+chat_messages on a miss. Writers keep the entry current instead of dropping
+it: after a turn is persisted, append() adds the new rows, trims to the
+window and takes the summary update_rolling_summary produced, which is
+exactly what the next database read would have returned.
+
+Conversation_Cache_Backend picks the store. 'sqlite' (the default) is shared
+by every gunicorn worker on the host, so the next turn hits whichever worker
+serves it. 'memory' is private to one process and only correct when a single
+process serves all turns (e.g. one ASGI worker): another worker's writes
+would never reach it. Entries expire after Conversation_Cache_TTL seconds;
+the memory backend also evicts least recently used entries beyond
+Conversation_Cache_Max_Entries or Conversation_Cache_Max_Bytes.
+
+A conversation's turns arrive one at a time, so the read-modify-write in
+append() doesn't lock across workers; a lost race only costs a stale window
+until the entry is rewritten or expires.
+"""
+import threading
+from datetime import datetime
+
+from app.cache.backends import make_backend
+from app.observability.metrics import counter
+from config import Config
+
+cache_requests = counter(
+    "conversation_cache_requests_total",
+    "Conversation-state cache lookups by result",
+    labelnames=("result",),
+)
+history_reads = counter(
+    "history_db_reads_total",
+    "Recent-history reads that went to the database (conversation cache misses or cache disabled)",
+)
+
+# Passed as append(summary=...) when the turn didn't change the summary
+UNCHANGED = object()
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None and Config.CONVERSATION_CACHE_BACKEND != "none":
+        with _backend_lock:
+            if _backend is None:
+                _backend = make_backend(
+                    Config.CONVERSATION_CACHE_BACKEND,
+                    Config.CONVERSATION_CACHE_MAX_ENTRIES,
+                    path=Config.CONVERSATION_CACHE_PATH,
+                    table="conversation_cache",
+                    max_bytes=Config.CONVERSATION_CACHE_MAX_BYTES,
+                )
+    return _backend
+
+
+def _encode(summary, rows):
+    window = rows[-Config.HISTORY_WINDOW_MESSAGES:]
+    return {
+        "summary": summary,
+        "rows": [[role, content, created_at.isoformat()] for role, content, created_at in window],
+    }
+
+
+def _decode(state):
+    rows = [(role, content, datetime.fromisoformat(created_at)) for role, content, created_at in state["rows"]]
+    return state["summary"], rows
+
+
+def get(conversation_id):
+    """(summary, [(role, content, created_at), ...]) like load_recent_rows, or None on a miss."""
+    backend = get_backend()
+    state = backend.get(conversation_id) if backend is not None else None
+    if backend is not None:
+        cache_requests.inc(result="hit" if state is not None else "miss")
+    if state is None:
+        history_reads.inc()
+        return None
+    return _decode(state)
+
+
+def put(conversation_id, summary, rows):
+    """Store the state just read from the database."""
+    backend = get_backend()
+    if backend is not None:
+        backend.set(conversation_id, _encode(summary, rows), Config.CONVERSATION_CACHE_TTL)
+
+
+def append(conversation_id, rows, summary=UNCHANGED):
+    """
+    Add persisted (role, content, created_at) rows to a cached conversation and
+    replace its summary unless UNCHANGED. Conversations not in the cache are
+    left alone; their next read fills it.
+    """
+    backend = get_backend()
+    if backend is None:
+        return
+    state = backend.get(conversation_id)
+    if state is None:
+        return
+    cached_summary, cached_rows = _decode(state)
+    if summary is UNCHANGED:
+        summary = cached_summary
+    backend.set(conversation_id, _encode(summary, cached_rows + list(rows)), Config.CONVERSATION_CACHE_TTL)
+
+
+def invalidate(conversation_id):
+    backend = get_backend()
+    if backend is not None:
+        backend.delete(conversation_id)
+
+
+def summary_text(summary):
+    """append()'s summary argument for what update_rolling_summary returned."""
+    if summary is None:
+        # Fewer turns than the window: nothing was folded
+        return UNCHANGED
+    return summary.summary or None
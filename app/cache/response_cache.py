@@ -0,0 +1,107 @@
+import hashlib
+import re
+import threading
+
+from app.cache.backends import make_backend
+from app.observability.metrics import counter
+from config import Config
+
+_PUNCTUATION = re.compile(r"[^\w\s?]")
+_WHITESPACE = re.compile(r"\s+")
+
+cache_requests = counter(
+    "response_cache_requests_total",
+    "Response cache lookups by result",
+    labelnames=("result",),
+)
+
+# Intents whose answer doesn't depend on the conversation so far (see lookup).
+FAQ_INTENTS = ("kb",)
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def normalize_prompt(text):
+    """Lowercase, drop punctuation (except '?') and collapse whitespace."""
+    return _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", text.lower())).strip()
+
+
+def _hash(messages):
+    """Hash of every message but the last, plus the normalized last one."""
+    digest = hashlib.sha256()
+    for message in messages[:-1]:
+        digest.update(message["role"].encode("utf-8"))
+        digest.update(b"\x00")
+        digest.update(message["content"].encode("utf-8"))
+        digest.update(b"\x00")
+    digest.update(normalize_prompt(messages[-1]["content"]).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def conversation_key(messages):
+    """
+    Key for identical completions: the whole conversation (prompt, summary,
+    every earlier turn) with the last user turn normalized, or None when the
+    completion doesn't answer a user turn (e.g. a follow-up after a tool).
+    """
+    if not messages or messages[-1]["role"] != "user":
+        return None
+    return _hash(messages)
+
+
+def is_first_turn(messages):
+    """Only the system prompt precedes the user turn: no summary, no earlier turns."""
+    return len(messages) == 2 and messages[0]["role"] == "system" and messages[1]["role"] == "user"
+
+
+def cache_key(messages):
+    """
+    Key for cached replies: the system prompt and the normalized last user
+    turn. The rest of the conversation is left out on purpose, see lookup.
+    """
+    if not messages or messages[-1]["role"] != "user" or messages[0]["role"] != "system":
+        return None
+    return _hash([messages[0], messages[-1]])
+
+
+def get_backend():
+    global _backend
+    if _backend is None and Config.RESPONSE_CACHE_BACKEND != "none":
+        with _backend_lock:
+            if _backend is None:
+                _backend = make_backend(
+                    Config.RESPONSE_CACHE_BACKEND,
+                    Config.RESPONSE_CACHE_MAX_ENTRIES,
+                    path=Config.RESPONSE_CACHE_PATH,
+                    table="response_cache",
+                )
+    return _backend
+
+
+def lookup(messages, intent=None):
+    """
+    Returns (key, cached_reply_or_None); key is None when the call isn't cacheable.
+
+    Only replies to first turns are stored (see store), so every cached reply
+    was written without any conversation context and can't carry one user's
+    details to another. They are served to first turns and, at any point in
+    a conversation, to turns the intent router classified as FAQ_INTENTS:
+    questions about the products, whose answer doesn't depend on what was
+    said before. Other mid-conversation turns always go to the model.
+    """
+    backend = get_backend()
+    if backend is None or not (is_first_turn(messages) or intent in FAQ_INTENTS):
+        return None, None
+    key = cache_key(messages)
+    if key is None:
+        return None, None
+    reply = backend.get(key)
+    cache_requests.inc(result="hit" if reply is not None else "miss")
+    return key, reply
+
+
+def store(key, reply, messages):
+    """Cache a reply to `messages`; only first-turn replies are kept."""
+    if key is not None and reply and is_first_turn(messages):
+        get_backend().set(key, reply, Config.RESPONSE_CACHE_TTL)
@@ -0,0 +1,272 @@
+"""
+Single-flight for identical concurrent LLM completions.
+
+When many users send the same message at once (an OTP delivery outage, say)
+only one of them calls Groq; the others wait for that call and share its
+reply. Two calls are identical when response_cache.conversation_key matches
+for the same call site and intent. That key covers the whole conversation
+(system prompt, summary, every earlier turn) and only normalizes the last
+user turn, so calls are shared by conversations with the same context,
+typically their first message, and never between a "yes please" in one
+conversation and in another.
+
+Within a worker the first caller of a key leads and later callers wait on
+it. A finished reply stays joinable for Single_Flight_Window_Ms, which
+catches the stragglers of a burst even with the response cache disabled.
+With Single_Flight_Store=sqlite the leaders of different workers on the host
+also coordinate through a lock row in a local SQLite file: the worker that
+claims the row calls Groq and writes the reply into it, the others poll it
+every Single_Flight_Poll_Ms. On the async path those store calls run in a
+thread, so polling never blocks the event loop.
+
+Nobody waits forever. A caller that has no reply after
+Single_Flight_Wait_Seconds makes its own call, and a lock row whose leader
+died expires after the same time. A failed call is not shared across
+workers (its row is released and the next caller leads); followers in the
+same worker get the leader's exception, so an outage isn't retried once per
+waiting user.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+
+from app.observability.metrics import counter
+from config import Config
+
+flight_calls = counter(
+    "single_flight_calls_total",
+    "Coalescable LLM completions by role: leader (called Groq), follower (shared a call in this worker), "
+    "shared (reply from another worker), timeout (stopped waiting and called Groq)",
+    labelnames=("role",),
+)
+
+PENDING = object()
+
+
+class SQLiteFlightStore:
+    """Lock rows in a local SQLite file (WAL): owner, reply once finished, and expiry."""
+
+    # Expired rows of keys nobody asks for again; purged every this many claims.
+    PURGE_EVERY = 256
+
+    def __init__(self, path, table="single_flight"):
+        self.path = path
+        self.table = table
+        self._local = threading.local()
+        self._claims = 0
+
+    def _connection(self):
+        # One connection per thread, reopened after a fork.
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, owner TEXT NOT NULL, value TEXT, expires_at REAL NOT NULL)"
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def claim(self, key, owner, lease):
+        """Take the lock for `key` for `lease` seconds; False when another worker holds it or has a fresh reply."""
+        conn = self._connection()
+        now = time.time()
+        conn.execute(f"DELETE FROM {self.table} WHERE key = ? AND expires_at <= ?", (key, now))
+        claimed = conn.execute(
+            f"INSERT OR IGNORE INTO {self.table} (key, owner, value, expires_at) VALUES (?, ?, NULL, ?)",
+            (key, owner, now + lease),
+        ).rowcount == 1
+        self._claims += 1
+        if self._claims % self.PURGE_EVERY == 0:
+            conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,))
+        return claimed
+
+    def result(self, key):
+        """The finished reply, PENDING while its leader is still calling, or None when there's no live row."""
+        row = self._connection().execute(
+            f"SELECT value FROM {self.table} WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        return PENDING if row[0] is None else json.loads(row[0])
+
+    def finish(self, key, owner, value, window):
+        """Publish the reply; it stays readable for `window` seconds."""
+        self._connection().execute(
+            f"UPDATE {self.table} SET value = ?, expires_at = ? WHERE key = ? AND owner = ?",
+            (json.dumps(value), time.time() + window, key, owner),
+        )
+
+    def release(self, key, owner):
+        self._connection().execute(
+            f"DELETE FROM {self.table} WHERE key = ? AND owner = ? AND value IS NULL", (key, owner)
+        )
+
+
+class _Call:
+    def __init__(self, done):
+        self.done = done
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, store=None):
+        self.store = store
+        self._calls = {}
+        self._finished = deque()
+        self._lock = threading.Lock()
+
+    def _join(self, key, new_event):
+        """(call, is_leader) for `key`, registering a new call when none is live."""
+        with self._lock:
+            now = time.monotonic()
+            while self._finished and self._finished[0][0] <= now:
+                _, expired_key, expired = self._finished.popleft()
+                if self._calls.get(expired_key) is expired:
+                    del self._calls[expired_key]
+            call = self._calls.get(key)
+            if call is not None:
+                return call, False
+            call = self._calls[key] = _Call(new_event())
+            return call, True
+
+    def _settle(self, key, call, value=None, error=None):
+        call.value, call.error = value, error
+        with self._lock:
+            if error is not None or Config.SINGLE_FLIGHT_WINDOW_MS <= 0:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            else:
+                self._finished.append((time.monotonic() + Config.SINGLE_FLIGHT_WINDOW_MS / 1000, key, call))
+        call.done.set()
+
+    def _claim_or_result(self, key, owner):
+        """(claimed, reply_or_PENDING) from the shared store."""
+        if self.store.claim(key, owner, Config.SINGLE_FLIGHT_WAIT_SECONDS):
+            return True, None
+        value = self.store.result(key)
+        # The row expired between claim and read: try to claim again
+        return False, PENDING if value is None else value
+
+    def do(self, key, fn):
+        """Run fn() once for all concurrent callers of `key`; returns (value, role)."""
+        call, leader = self._join(key, threading.Event)
+        if not leader:
+            if not call.done.wait(Config.SINGLE_FLIGHT_WAIT_SECONDS):
+                flight_calls.inc(role="timeout")
+                return fn(), "timeout"
+            flight_calls.inc(role="follower")
+            if call.error is not None:
+                raise call.error
+            return call.value, "follower"
+
+        try:
+            value, role = self._lead(key, fn)
+        except Exception as exc:
+            self._settle(key, call, error=exc)
+            raise
+        self._settle(key, call, value)
+        flight_calls.inc(role=role)
+        return value, role
+
+    def _lead(self, key, fn):
+        if self.store is None:
+            return fn(), "leader"
+        owner = uuid.uuid4().hex
+        deadline = time.monotonic() + Config.SINGLE_FLIGHT_WAIT_SECONDS
+        while True:
+            claimed, value = self._claim_or_result(key, owner)
+            if claimed:
+                break
+            if value is not PENDING:
+                return value, "shared"
+            if time.monotonic() >= deadline:
+                return fn(), "timeout"
+            time.sleep(Config.SINGLE_FLIGHT_POLL_MS / 1000)
+        try:
+            value = fn()
+        except Exception:
+            self.store.release(key, owner)
+            raise
+        self.store.finish(key, owner, value, Config.SINGLE_FLIGHT_WINDOW_MS / 1000)
+        return value, "leader"
+
+    async def ado(self, key, afn):
+        """Async counterpart of do(); afn is a coroutine function."""
+        # Threads can't wait on an asyncio.Event, so async calls are registered apart
+        local_key = ("async", key)
+        call, leader = self._join(local_key, asyncio.Event)
+        if not leader:
+            try:
+                await asyncio.wait_for(call.done.wait(), Config.SINGLE_FLIGHT_WAIT_SECONDS)
+            except asyncio.TimeoutError:
+                flight_calls.inc(role="timeout")
+                return await afn(), "timeout"
+            flight_calls.inc(role="follower")
+            if call.error is not None:
+                raise call.error
+            return call.value, "follower"
+
+        try:
+            value, role = await self._alead(key, afn)
+        except Exception as exc:
+            self._settle(local_key, call, error=exc)
+            raise
+        self._settle(local_key, call, value)
+        flight_calls.inc(role=role)
+        return value, role
+
+    async def _alead(self, key, afn):
+        if self.store is None:
+            return await afn(), "leader"
+        owner = uuid.uuid4().hex
+        deadline = time.monotonic() + Config.SINGLE_FLIGHT_WAIT_SECONDS
+        while True:
+            claimed, value = await asyncio.to_thread(self._claim_or_result, key, owner)
+            if claimed:
+                break
+            if value is not PENDING:
+                return value, "shared"
+            if time.monotonic() >= deadline:
+                return await afn(), "timeout"
+            await asyncio.sleep(Config.SINGLE_FLIGHT_POLL_MS / 1000)
+        try:
+            value = await afn()
+        except Exception:
+            await asyncio.to_thread(self.store.release, key, owner)
+            raise
+        await asyncio.to_thread(self.store.finish, key, owner, value, Config.SINGLE_FLIGHT_WINDOW_MS / 1000)
+        return value, "leader"
+
+
+def make_single_flight(kind, path=None):
+    """Build from config: 'memory' (per worker), 'sqlite' (across the host's workers) or 'none' (returns None)."""
+    if kind == "none":
+        return None
+    if kind == "memory":
+        return SingleFlight()
+    if kind == "sqlite":
+        return SingleFlight(SQLiteFlightStore(path))
+    raise ValueError(f"Unknown single-flight store: {kind}")
+
+
+_single_flight = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight():
+    global _single_flight
+    if _single_flight is None and Config.SINGLE_FLIGHT_STORE != "none":
+        with _single_flight_lock:
+            if _single_flight is None:
+                _single_flight = make_single_flight(Config.SINGLE_FLIGHT_STORE, Config.SINGLE_FLIGHT_PATH)
+    return _single_flight
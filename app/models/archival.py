@@ -0,0 +1,217 @@
+"""
+Moves old chat turns out of chat_messages.
+
+    python -m app.models.archival [--older-than-days 90] [--archive-dir DIR] [--dry-run]
+
+Run it periodically (e.g. nightly cron). For every conversation with turns
+older than the cutoff it first advances the rolling summary
+(update_rolling_summary), then moves the raw turns that are both older than
+the cutoff and already folded into the summary to chat_messages_archive, or
+to gzipped JSONL files under --archive-dir. The newest History_Window_Messages
+turns of a conversation are never in the summary, so they stay put however
+old they are and a returning user still gets their context.
+
+On Postgres it also creates the monthly chat_messages partitions for the next
+Chat_Partition_Months_Ahead months and drops old partitions once empty.
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, select, text
+
+from app import db
+from app.agents.memory import update_rolling_summary
+from app.cache import conversation_cache
+from app.models.chat import ArchivedChatMessage, ChatMessage, ConversationSummary
+from config import Config
+
+_PARTITION_NAME = re.compile(r"^chat_messages_(\d{4})_(\d{2})$")
+
+
+def _month_start(moment):
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(month):
+    return month.replace(year=month.year + 1, month=1) if month.month == 12 else month.replace(month=month.month + 1)
+
+
+def compact_summaries(cutoff, session, batch_size, after=""):
+    """
+    Fold turns older than `cutoff` into their conversation summaries, for up to
+    `batch_size` conversations with ids above `after`; returns their ids.
+    """
+    stale = (
+        select(ChatMessage.conversation_id)
+        .outerjoin(ConversationSummary, ConversationSummary.conversation_id == ChatMessage.conversation_id)
+        .where(
+            ChatMessage.conversation_id > after,
+            ChatMessage.created_at < cutoff,
+            (ConversationSummary.summarized_until.is_(None))
+            | (ChatMessage.created_at > ConversationSummary.summarized_until),
+        )
+        .distinct()
+        .order_by(ChatMessage.conversation_id)
+        .limit(batch_size)
+    )
+    conversation_ids = session.execute(stale).scalars().all()
+    for conversation_id in conversation_ids:
+        # Each call folds at most History_Summary_Batch turns
+        previous = None
+        while True:
+            summary = update_rolling_summary(conversation_id, session=session)
+            until = summary.summarized_until if summary is not None else None
+            if until is None or until == previous or until >= cutoff:
+                break
+            previous = until
+        session.commit()
+        # Cached summaries of these conversations are now behind
+        conversation_cache.invalidate(conversation_id)
+    return conversation_ids
+
+
+def _write_file(archive_dir, rows):
+    first = rows[0].created_at
+    path = os.path.join(archive_dir, f"{first:%Y-%m}", f"chat_messages_{first:%Y%m%d}_{rows[0].id}_{rows[-1].id}.jsonl.gz")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with gzip.open(path, "wt", encoding="utf-8") as handle:
+        for row in rows:
+            handle.write(json.dumps({
+                "id": row.id,
+                "conversation_id": row.conversation_id,
+                "role": row.role,
+                "content": row.content,
+                "created_at": row.created_at.isoformat(),
+            }) + "\n")
+        handle.flush()
+        os.fsync(handle.fileno())
+    return path
+
+
+def move_turns(cutoff, session, batch_size, archive_dir=None):
+    """Move summarized turns older than `cutoff`, one committed batch at a time; returns the count."""
+    moved = 0
+    while True:
+        rows = session.execute(
+            select(ChatMessage.id, ChatMessage.conversation_id, ChatMessage.role, ChatMessage.content, ChatMessage.created_at)
+            .join(ConversationSummary, ConversationSummary.conversation_id == ChatMessage.conversation_id)
+            .where(ChatMessage.created_at < cutoff, ChatMessage.created_at <= ConversationSummary.summarized_until)
+            .order_by(ChatMessage.created_at, ChatMessage.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return moved
+
+        if archive_dir:
+            _write_file(archive_dir, rows)
+        else:
+            now = datetime.utcnow()
+            session.execute(insert(ArchivedChatMessage), [{**row._asdict(), "archived_at": now} for row in rows])
+        # The created_at bound lets Postgres prune the partitions it scans
+        session.execute(
+            delete(ChatMessage)
+            .where(ChatMessage.id.in_([row.id for row in rows]), ChatMessage.created_at < cutoff)
+            .execution_options(synchronize_session=False)
+        )
+        session.commit()
+        moved += len(rows)
+
+
+def maintain_partitions(cutoff, session, months_ahead):
+    """Create upcoming monthly partitions and drop empty ones before `cutoff` (Postgres only)."""
+    if session.get_bind().dialect.name != "postgresql":
+        return {"created": [], "dropped": []}
+
+    existing = session.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = 'chat_messages'"
+    )).scalars().all()
+
+    created = []
+    month = _month_start(datetime.utcnow())
+    for _ in range(months_ahead + 1):
+        name = f"chat_messages_{month:%Y_%m}"
+        if name not in existing:
+            session.execute(text(
+                f"CREATE TABLE {name} PARTITION OF chat_messages "
+                f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{_next_month(month):%Y-%m-%d}')"
+            ))
+            created.append(name)
+        month = _next_month(month)
+
+    dropped = []
+    for name in existing:
+        match = _PARTITION_NAME.match(name)
+        if match is None:
+            continue
+        if _next_month(datetime(int(match.group(1)), int(match.group(2)), 1)) > cutoff:
+            continue
+        if session.execute(text(f"SELECT 1 FROM {name} LIMIT 1")).first() is None:
+            session.execute(text(f"ALTER TABLE chat_messages DETACH PARTITION {name}"))
+            session.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    session.commit()
+    return {"created": created, "dropped": dropped}
+
+
+def archive(older_than_days=None, archive_dir=None, batch_size=None, session=None):
+    """Run the whole job; returns counts for logging."""
+    session = session or db.session
+    older_than_days = Config.CHAT_ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    archive_dir = archive_dir or Config.CHAT_ARCHIVE_DIR
+    batch_size = batch_size or Config.CHAT_ARCHIVE_BATCH_SIZE
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+
+    # Old turns still inside a conversation's window stay unsummarized, so
+    # page through conversation ids rather than re-querying until none are left.
+    summarized, after = 0, ""
+    while True:
+        touched = compact_summaries(cutoff, session, batch_size, after)
+        summarized += len(touched)
+        if len(touched) < batch_size:
+            break
+        after = touched[-1]
+    return {
+        "cutoff": cutoff.isoformat(),
+        "conversations_checked": summarized,
+        "turns_archived": move_turns(cutoff, session, batch_size, archive_dir),
+        "partitions": maintain_partitions(cutoff, session, Config.CHAT_PARTITION_MONTHS_AHEAD),
+    }
+
+
+def _dry_run(older_than_days, session):
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    candidates = session.execute(
+        select(db.func.count())
+        .select_from(ChatMessage)
+        .where(ChatMessage.created_at < cutoff)
+    ).scalar()
+    return {"cutoff": cutoff.isoformat(), "turns_older_than_cutoff": candidates}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old chat turns.")
+    parser.add_argument("--older-than-days", type=int, default=Config.CHAT_ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--archive-dir", default=Config.CHAT_ARCHIVE_DIR, help="write gzipped JSONL here instead of chat_messages_archive")
+    parser.add_argument("--batch-size", type=int, default=Config.CHAT_ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="only count the turns older than the cutoff")
+    args = parser.parse_args()
+
+    from app import create_app
+
+    with create_app().app_context():
+        if args.dry_run:
+            result = _dry_run(args.older_than_days, db.session)
+        else:
+            result = archive(args.older_than_days, args.archive_dir, args.batch_size)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
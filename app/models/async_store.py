@@ -0,0 +1,120 @@
+"""
+Async database access for the ASGI chat path.
+
+Uses a SQLAlchemy asyncio engine (asyncpg for Postgres) on the same database
+as the Flask-SQLAlchemy models. The history and summary logic in
+app.agents.memory is reused through AsyncSession.run_sync, so both execution
+modes read and write the conversation the same way, including the
+conversation-state cache. That cache is a SQLite file by default, so its
+reads and writes run in a thread rather than on the event loop.
+"""
+import asyncio
+import uuid
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.agents.memory import load_recent_rows, load_user_history, update_rolling_summary
+from app.cache import conversation_cache
+from app.models.chat import ChatMessage
+from config import Config
+
+_ASYNC_DRIVERS = {
+    "postgres://": "postgresql+asyncpg://",
+    "postgresql://": "postgresql+asyncpg://",
+    "postgresql+psycopg2://": "postgresql+asyncpg://",
+    "sqlite://": "sqlite+aiosqlite://",
+}
+
+_engine = None
+_sessionmaker = None
+
+
+def async_database_url(url):
+    """Swap a sync driver URL for its asyncio equivalent."""
+    for prefix, async_prefix in _ASYNC_DRIVERS.items():
+        if url.startswith(prefix):
+            return async_prefix + url[len(prefix):]
+    return url
+
+
+def get_sessionmaker():
+    global _engine, _sessionmaker
+    if _sessionmaker is None:
+        _engine = create_async_engine(
+            async_database_url(Config.SQLALCHEMY_DATABASE_URI),
+            pool_size=Config.ASYNC_DB_POOL_SIZE,
+            pool_pre_ping=True,
+        )
+        _sessionmaker = async_sessionmaker(_engine, expire_on_commit=False)
+    return _sessionmaker
+
+
+async def dispose():
+    global _engine, _sessionmaker
+    if _engine is not None:
+        await _engine.dispose()
+    _engine = _sessionmaker = None
+
+
+def _messages(rows):
+    return [{"role": role, "content": content} for role, content, _ in rows]
+
+
+async def aload_conversation(conversation_id, user_id=None):
+    """
+    Pick the conversation for this turn and load its history, like
+    chat_routes._load_conversation: the explicit id, else the user's default
+    conversation (resolved in the same query as its rows), else a new one.
+    Returns (conversation_id, summary, messages).
+    """
+    if user_id and not conversation_id:
+        async with get_sessionmaker()() as session:
+            loaded = await session.run_sync(
+                lambda sync_session: load_user_history(user_id, session=sync_session)
+            )
+        if loaded and loaded[0]:
+            conversation_id, summary, rows = loaded
+            await asyncio.to_thread(conversation_cache.put, conversation_id, summary, rows)
+            return conversation_id, summary, _messages(rows)
+    if not conversation_id:
+        # Brand-new conversation: nothing to load
+        return str(uuid.uuid4()), None, []
+    summary, messages = await aload_recent_history(conversation_id)
+    return conversation_id, summary, messages
+
+
+async def aload_recent_history(conversation_id):
+    """Same result as load_recent_history, from the conversation cache when possible."""
+    cached = await asyncio.to_thread(conversation_cache.get, conversation_id)
+    if cached is not None:
+        summary, rows = cached
+    else:
+        async with get_sessionmaker()() as session:
+            summary, rows = await session.run_sync(
+                lambda sync_session: load_recent_rows(conversation_id, session=sync_session)
+            )
+        await asyncio.to_thread(conversation_cache.put, conversation_id, summary, rows)
+    return summary, _messages(rows)
+
+
+async def apersist_turn(conversation_id, user_message, reply):
+    rows = [
+        {"conversation_id": conversation_id, "role": "user", "content": user_message, "created_at": datetime.utcnow()},
+        {"conversation_id": conversation_id, "role": "assistant", "content": reply, "created_at": datetime.utcnow()},
+    ]
+    async with get_sessionmaker()() as session:
+        await session.execute(insert(ChatMessage), rows)
+        summary = await session.run_sync(
+            lambda sync_session: conversation_cache.summary_text(
+                update_rolling_summary(conversation_id, session=sync_session)
+            )
+        )
+        await session.commit()
+    await asyncio.to_thread(
+        conversation_cache.append,
+        conversation_id,
+        [(row["role"], row["content"], row["created_at"]) for row in rows],
+        summary,
+    )
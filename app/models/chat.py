@@ -5,17 +5,69 @@ from app import db
 
 class ChatMessage(db.Model):
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        # Serves the windowed history query: newest N rows of one conversation.
+        db.Index("ix_chat_messages_conversation_created", "conversation_id", "created_at"),
+    )
 
+    # On Postgres the table is partitioned by month on created_at (migration
+    # 5c0d2e8f7a41); old turns move to chat_messages_archive (app/models/archival.py).
     id = db.Column(db.Integer, primary_key=True)
-    conversation_id = db.Column(db.String(64), index=True, nullable=False)
+    conversation_id = db.Column(db.String(64), nullable=False)
     role = db.Column(db.String(16), nullable=False)
     content = db.Column(db.Text, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
     def __repr__(self) -> str:
         return f"<ChatMessage {self.conversation_id} {self.role}>"
 
 
+class ArchivedChatMessage(db.Model):
+    """Raw turns moved out of chat_messages after being folded into the summary."""
+
+    __tablename__ = "chat_messages_archive"
+    __table_args__ = (
+        db.Index("ix_chat_messages_archive_conversation_created", "conversation_id", "created_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    conversation_id = db.Column(db.String(64), nullable=False)
+    role = db.Column(db.String(16), nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<ArchivedChatMessage {self.conversation_id} {self.role}>"
+
+
+class ConversationSummary(db.Model):
+    __tablename__ = "conversation_summaries"
+
+    conversation_id = db.Column(db.String(64), primary_key=True)
+    summary = db.Column(db.Text, nullable=False, default="")
+    # Messages created at or before this instant are folded into `summary`.
+    summarized_until = db.Column(db.DateTime, nullable=True)
+    message_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self) -> str:
+        return f"<ConversationSummary {self.conversation_id}>"
+
+
+class KnowledgeBaseEntry(db.Model):
+    __tablename__ = "knowledge_base_entries"
+
+    id = db.Column(db.Integer, primary_key=True)
+    topic = db.Column(db.String(255), unique=True, nullable=False)
+    keywords = db.Column(db.JSON, nullable=False)
+    response = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self) -> str:
+        return f"<KnowledgeBaseEntry {self.topic}>"
+
+
 class User(db.Model):
     __tablename__ = "users"
 
@@ -27,3 +79,52 @@ class User(db.Model):
 
     def __repr__(self) -> str:
         return f"<User {self.email}>"
+
+
+class Ticket(db.Model):
+    __tablename__ = "tickets"
+    __table_args__ = (
+        # One ticket per issue per conversation; repeats return the existing one.
+        db.UniqueConstraint("conversation_id", "fingerprint", name="uq_tickets_conversation_fingerprint"),
+    )
+
+    # Reserved in blocks from id_blocks (app/models/tickets.py), not autoincremented.
+    number = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    conversation_id = db.Column(db.String(64), nullable=True)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    issue = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(32), nullable=False, default="Created")
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<Ticket {self.number} {self.conversation_id}>"
+
+
+class TicketReport(db.Model):
+    """A conversation's report attached to an incident's parent ticket (app/agents/incidents.py)."""
+
+    __tablename__ = "ticket_reports"
+    __table_args__ = (
+        db.UniqueConstraint("ticket_number", "conversation_id", name="uq_ticket_reports_ticket_conversation"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    ticket_number = db.Column(db.BigInteger, db.ForeignKey("tickets.number"), nullable=False)
+    conversation_id = db.Column(db.String(64), nullable=False, index=True)
+    issue = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<TicketReport {self.ticket_number} {self.conversation_id}>"
+
+
+class IdBlock(db.Model):
+    """Named counters from which workers reserve ranges of IDs."""
+
+    __tablename__ = "id_blocks"
+
+    name = db.Column(db.String(64), primary_key=True)
+    next_value = db.Column(db.BigInteger, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<IdBlock {self.name} {self.next_value}>"
@@ -0,0 +1,193 @@
+"""
+Persistent support tickets.
+
+Ticket numbers come from the id_blocks counter table. Each worker reserves
+Ticket_ID_Block_Size numbers at once with a single
+`UPDATE ... RETURNING` and hands them out from memory, so creating a
+ticket costs one INSERT. Numbers are unique across workers and hosts. A
+worker that exits leaves a gap of its unused numbers; they are never reused.
+
+Tickets are idempotent per conversation: the same conversation reporting
+the same issue (same fingerprint) gets its existing ticket back instead of
+a new one.
+
+During an incident (app/agents/incidents.py) reports don't open tickets of
+their own: they are attached to the incident's parent ticket as
+ticket_reports rows, and show up among the conversation's tickets.
+"""
+import hashlib
+import os
+import threading
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.cache.response_cache import normalize_prompt
+from app.models.chat import IdBlock, Ticket, TicketReport
+from app.observability.metrics import counter
+from config import Config
+
+TICKET_COUNTER = "tickets"
+
+ticket_requests = counter(
+    "tickets_total",
+    "Ticket requests by outcome (created, or existing for an idempotent repeat)",
+    labelnames=("outcome",),
+)
+
+
+def fingerprint(issue):
+    """Stable key for an issue's text, insensitive to case, punctuation and spacing."""
+    return hashlib.sha256(normalize_prompt(issue).encode("utf-8")).hexdigest()[:32]
+
+
+def format_ticket_id(number):
+    return f"TICKET-{number:06d}"
+
+
+class BlockAllocator:
+    """Hands out numbers from blocks reserved in id_blocks under `name`."""
+
+    def __init__(self, name, block_size=None):
+        self.name = name
+        self.block_size = block_size
+        self._next = self._end = 0
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _reserve(self, connection, size):
+        reserved = connection.execute(
+            update(IdBlock)
+            .where(IdBlock.name == self.name)
+            .values(next_value=IdBlock.next_value + size)
+            .returning(IdBlock.next_value)
+        ).scalar()
+        if reserved is None:
+            # First use on a database that wasn't migrated (e.g. create_all)
+            try:
+                with connection.begin_nested():
+                    connection.execute(insert(IdBlock).values(name=self.name, next_value=1 + size))
+                reserved = 1 + size
+            except IntegrityError:
+                return self._reserve(connection, size)
+        return reserved
+
+    def next(self, engine):
+        with self._lock:
+            # A forked worker must not reuse the block its parent was handing out
+            if self._pid != os.getpid() or self._next >= self._end:
+                size = self.block_size or Config.TICKET_ID_BLOCK_SIZE
+                with engine.begin() as connection:
+                    end = self._reserve(connection, size)
+                self._next, self._end, self._pid = end - size, end, os.getpid()
+            value = self._next
+            self._next += 1
+            return value
+
+
+def _as_dict(ticket, incident=False):
+    return {
+        "ticket_id": format_ticket_id(ticket.number),
+        "number": ticket.number,
+        "conversation_id": ticket.conversation_id,
+        "issue": ticket.issue,
+        "status": ticket.status,
+        "incident": incident,
+    }
+
+
+class TicketStore:
+    def __init__(self):
+        self.app = None
+        self.allocator = BlockAllocator(TICKET_COUNTER)
+
+    def init_app(self, app):
+        self.app = app
+
+    def _existing(self, session, conversation_id, key):
+        return session.execute(
+            select(Ticket).where(Ticket.conversation_id == conversation_id, Ticket.fingerprint == key)
+        ).scalar()
+
+    def create(self, issue, conversation_id=None, key=None):
+        """
+        Create a ticket, or return the conversation's existing ticket for the same
+        issue. `key` overrides the fingerprint for issues that should share one
+        ticket however they are worded (e.g. "otp"). Returns (ticket dict,
+        whether it was created by this call).
+        """
+        key = key or fingerprint(issue)
+        # Its own app context, so the ticket commits independently of the request's session
+        with self.app.app_context():
+            session = db.session
+            if conversation_id is not None:
+                ticket = self._existing(session, conversation_id, key)
+                if ticket is not None:
+                    ticket_requests.inc(outcome="existing")
+                    return _as_dict(ticket), False
+
+            ticket = Ticket(
+                number=self.allocator.next(db.engine),
+                conversation_id=conversation_id,
+                fingerprint=key,
+                issue=issue,
+                status="Created",
+            )
+            session.add(ticket)
+            try:
+                session.commit()
+            except IntegrityError:
+                # Another request created the same ticket first
+                session.rollback()
+                ticket = self._existing(session, conversation_id, key)
+                ticket_requests.inc(outcome="existing")
+                return _as_dict(ticket), False
+            ticket_requests.inc(outcome="created")
+            return _as_dict(ticket), True
+
+    def attach(self, number, conversation_id, issue):
+        """Attach a conversation's report to ticket `number`; False when it was already attached."""
+        with self.app.app_context():
+            db.session.add(TicketReport(ticket_number=number, conversation_id=conversation_id, issue=issue))
+            try:
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                return False
+            return True
+
+    def status(self, number):
+        """Current status of ticket `number`, or None when it doesn't exist."""
+        with self.app.app_context():
+            return db.session.execute(select(Ticket.status).where(Ticket.number == number)).scalar()
+
+    def for_conversations(self, conversation_ids):
+        """
+        {conversation_id: [ticket dict, ...]} for all the given conversations,
+        including incident tickets their reports were attached to, in two queries.
+        """
+        conversation_ids = list(conversation_ids)
+        found = {conversation_id: [] for conversation_id in conversation_ids}
+        if not conversation_ids:
+            return found
+        with self.app.app_context():
+            rows = db.session.execute(
+                select(Ticket)
+                .where(Ticket.conversation_id.in_(conversation_ids))
+                .order_by(Ticket.conversation_id, Ticket.number)
+            ).scalars()
+            for ticket in rows:
+                found[ticket.conversation_id].append(_as_dict(ticket))
+            attached = db.session.execute(
+                select(TicketReport.conversation_id, Ticket)
+                .join(Ticket, Ticket.number == TicketReport.ticket_number)
+                .where(TicketReport.conversation_id.in_(conversation_ids))
+                .order_by(TicketReport.conversation_id, Ticket.number)
+            )
+            for conversation_id, ticket in attached:
+                found[conversation_id].append(_as_dict(ticket, incident=True))
+        return found
+
+
+ticket_store = TicketStore()
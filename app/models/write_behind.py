@@ -0,0 +1,155 @@
+"""
+Write-behind persistence for chat turns.
+
+With Chat_Persistence=write_behind, /chat/messages hands the new turn to
+ChatMessageWriter and replies without waiting for a commit. A background
+thread per worker bulk-inserts queued rows every Chat_Flush_Interval_Ms (or
+sooner once Chat_Flush_Batch_Size rows are waiting) and updates the rolling
+summaries of the conversations it touched, all in one transaction.
+
+Durability, compared with the default Chat_Persistence=sync:
+- A turn is acknowledged before it is durable. If the worker is killed
+  (SIGKILL, OOM, gunicorn timeout) rows still queued are lost: at most one
+  flush interval of turns for that worker.
+- Normal shutdown flushes the queue (atexit).
+- A failed flush is rolled back and retried on the next interval, up to
+  Chat_Flush_Max_Attempts times; after that the batch is logged and dropped.
+- When the queue is full enqueue() refuses the turn and the caller writes it
+  synchronously, so backpressure never drops data.
+- Reads in the same worker see queued turns through pending(). Other workers
+  see them once the flush commits, within one flush interval, or right away
+  through a shared conversation cache (which gets queued turns on enqueue and
+  is invalidated for a dropped batch).
+"""
+import atexit
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from app import db
+from app.agents.memory import update_rolling_summary
+from app.cache import conversation_cache
+from app.models.chat import ChatMessage
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class ChatMessageWriter:
+    def __init__(self):
+        self.app = None
+        self._queue = deque()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._failed_attempts = 0
+
+    def init_app(self, app):
+        self.app = app
+        atexit.register(self.flush)
+
+    def _ensure_thread(self):
+        # Started lazily so each forked gunicorn worker gets its own thread.
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._queue.clear()
+                    self._pending.clear()
+                    self._pid = os.getpid()
+                    self._thread = threading.Thread(target=self._run, name="chat-write-behind", daemon=True)
+                    self._thread.start()
+
+    def enqueue(self, conversation_id, user_message, reply):
+        """Queue a turn; returns False when the queue is full and the caller must write it itself."""
+        self._ensure_thread()
+        rows = [
+            {"conversation_id": conversation_id, "role": "user", "content": user_message, "created_at": datetime.utcnow()},
+            {"conversation_id": conversation_id, "role": "assistant", "content": reply, "created_at": datetime.utcnow()},
+        ]
+        with self._lock:
+            if len(self._queue) + len(rows) > Config.CHAT_WRITE_QUEUE_MAX:
+                return False
+            self._queue.extend(rows)
+            self._pending.setdefault(conversation_id, []).extend(rows)
+            full = len(self._queue) >= Config.CHAT_FLUSH_BATCH_SIZE
+        if full:
+            self._wakeup.set()
+        conversation_cache.append(conversation_id, [(row["role"], row["content"], row["created_at"]) for row in rows])
+        return True
+
+    def pending(self, conversation_id, after=None):
+        """Queued rows of a conversation created after `after`, as (role, content, created_at)."""
+        with self._lock:
+            rows = list(self._pending.get(conversation_id, ()))
+        return [
+            (row["role"], row["content"], row["created_at"])
+            for row in rows
+            if after is None or row["created_at"] > after
+        ]
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(Config.CHAT_FLUSH_INTERVAL_MS / 1000)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Chat write-behind flush failed")
+
+    def flush(self):
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self):
+        with self._lock:
+            batch = list(self._queue)
+        if not batch or self.app is None:
+            return 0
+
+        conversation_ids = {row["conversation_id"] for row in batch}
+        summaries, dropped = {}, False
+        with self.app.app_context():
+            try:
+                db.session.execute(insert(ChatMessage), batch)
+                db.session.flush()
+                for conversation_id in conversation_ids:
+                    summaries[conversation_id] = conversation_cache.summary_text(update_rolling_summary(conversation_id))
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                self._failed_attempts += 1
+                if self._failed_attempts < Config.CHAT_FLUSH_MAX_ATTEMPTS:
+                    raise
+                logger.error("Dropping %d chat messages after %d failed flushes", len(batch), self._failed_attempts)
+                dropped = True
+            finally:
+                db.session.remove()
+
+        for conversation_id in conversation_ids:
+            if dropped:
+                # The cache already has the dropped turns
+                conversation_cache.invalidate(conversation_id)
+            else:
+                conversation_cache.append(conversation_id, [], summaries[conversation_id])
+
+        self._failed_attempts = 0
+        with self._lock:
+            for _ in batch:
+                self._queue.popleft()
+            for row in batch:
+                rows = self._pending.get(row["conversation_id"])
+                if rows:
+                    rows.remove(row)
+                    if not rows:
+                        del self._pending[row["conversation_id"]]
+        return len(batch)
+
+
+chat_writer = ChatMessageWriter()
@@ -0,0 +1,148 @@
+import bisect
+import threading
+
+# name -> metric; every metric created through the helpers below lands here.
+REGISTRY = {}
+_registry_lock = threading.Lock()
+
+
+class Counter:
+    """Monotonic counter with optional labels, safe to share between threads."""
+
+    def __init__(self, name, description, labelnames=()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(label, "") for label in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(labels.get(label, "") for label in self.labelnames)
+        return self._values.get(key, 0)
+
+    def snapshot(self):
+        with self._lock:
+            return {key: value for key, value in self._values.items()}
+
+
+# Latency buckets in seconds, from sub-millisecond local work to slow LLM calls.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics) with optional labels."""
+
+    def __init__(self, name, description, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        self._observe(tuple(labels.get(label, "") for label in self.labelnames), value)
+
+    def labels(self, **labels):
+        """Bind label values once, for hot paths that observe the same series repeatedly."""
+        return _BoundHistogram(self, tuple(labels.get(label, "") for label in self.labelnames))
+
+    def _observe(self, key, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def snapshot(self):
+        """label values -> {"buckets": [(le, cumulative count)...], "count": n, "sum": s}"""
+        with self._lock:
+            values = {key: list(series) for key, series in self._values.items()}
+        result = {}
+        for key, series in values.items():
+            cumulative, buckets = 0, []
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                buckets.append((bound, cumulative))
+            result[key] = {"buckets": buckets, "count": cumulative, "sum": series[-1]}
+        return result
+
+
+class _BoundHistogram:
+    __slots__ = ("_histogram", "_key")
+
+    def __init__(self, histogram, key):
+        self._histogram = histogram
+        self._key = key
+
+    def observe(self, value):
+        self._histogram._observe(self._key, value)
+
+
+def _register(metric_class, name, *args, **kwargs):
+    with _registry_lock:
+        metric = REGISTRY.get(name)
+        if metric is None:
+            metric = REGISTRY[name] = metric_class(name, *args, **kwargs)
+        return metric
+
+
+def counter(name, description, labelnames=()):
+    """Get or create the process-wide counter called `name`."""
+    return _register(Counter, name, description, labelnames)
+
+
+def histogram(name, description, labelnames=(), buckets=DEFAULT_BUCKETS):
+    """Get or create the process-wide histogram called `name`."""
+    return _register(Histogram, name, description, labelnames, buckets)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(constant_labels=()):
+    """
+    Every registered metric in the Prometheus text exposition format.
+    `constant_labels` ((name, value) pairs) are added to every series.
+    """
+    constant_labels = tuple((name, _escape(value)) for name, value in constant_labels)
+    with _registry_lock:
+        metrics = sorted(REGISTRY.values(), key=lambda metric: metric.name)
+    lines = []
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {_escape(metric.description)}")
+        if isinstance(metric, Histogram):
+            lines.append(f"# TYPE {metric.name} histogram")
+            for key, series in sorted(metric.snapshot().items()):
+                for bound, count in series["buckets"]:
+                    labels = _labels(metric.labelnames, key, constant_labels + (("le", _number(bound)),))
+                    lines.append(f"{metric.name}_bucket{labels} {count}")
+                labels = _labels(metric.labelnames, key, constant_labels)
+                lines.append(f"{metric.name}_sum{labels} {_number(series['sum'])}")
+                lines.append(f"{metric.name}_count{labels} {series['count']}")
+        else:
+            lines.append(f"# TYPE {metric.name} counter")
+            for key, value in sorted(metric.snapshot().items()):
+                lines.append(f"{metric.name}{_labels(metric.labelnames, key, constant_labels)} {_number(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,154 @@
+"""
+Per-request stage timing.
+
+Code wraps each pipeline stage in `with span("kb"):`. A span adds its duration
+to the stage_duration_seconds histogram and, when a request is being traced,
+to that request's Trace, which becomes the Server-Timing header
+(Trace_Timing_Header) and carries the LLM token usage of the request.
+
+The current Trace lives in a ContextVar, so concurrent requests on worker
+threads or asyncio tasks each see their own. A span costs two perf_counter
+calls and one histogram update (see benchmarks/bench_tracing.py).
+"""
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from flask import g, request
+
+from app.observability.metrics import histogram
+from config import Config
+
+stage_latency = histogram(
+    "stage_duration_seconds",
+    "Time spent in each stage of the chat pipeline",
+    labelnames=("stage",),
+)
+request_latency = histogram(
+    "http_request_duration_seconds",
+    "Request handling time by route (streams: until the response starts)",
+    labelnames=("group", "route", "status"),
+)
+
+# Endpoints reported under their own group instead of their blueprint's name.
+ROUTE_GROUPS = {'chat.register': 'auth', 'chat.login': 'auth'}
+
+_current_trace = ContextVar("current_trace", default=None)
+
+# stage -> its bound stage_latency series, so a span doesn't rebuild label keys
+_stage_series = {}
+
+
+class Trace:
+    """Stage timings and LLM usage of one request."""
+
+    __slots__ = ("stages", "prompt_tokens", "completion_tokens")
+
+    def __init__(self):
+        # stage -> [calls, total seconds], in first-seen order
+        self.stages = {}
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def add(self, stage, seconds):
+        entry = self.stages.get(stage)
+        if entry is None:
+            self.stages[stage] = [1, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+
+    def server_timing(self):
+        """Server-Timing header value, durations in milliseconds."""
+        return ", ".join(
+            f"{stage.replace('.', '-')};dur={total * 1000:.2f}" for stage, (_, total) in self.stages.items()
+        )
+
+
+class span:
+    """Context manager timing one stage; usable as `with span("db.history"):`."""
+
+    __slots__ = ("stage", "series", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.series = _stage_series.get(stage)
+        if self.series is None:
+            self.series = _stage_series.setdefault(stage, stage_latency.labels(stage=stage))
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        self.series.observe(elapsed)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(self.stage, elapsed)
+        return False
+
+
+def traced(stage):
+    """Decorator form of span for functions that are a stage on their own."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def start_trace():
+    """Begin tracing the current request (or task); returns the Trace."""
+    trace = Trace()
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def record_usage(prompt_tokens, completion_tokens):
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.prompt_tokens += prompt_tokens or 0
+        trace.completion_tokens += completion_tokens or 0
+
+
+def usage():
+    """LLM token usage reported by Groq for the current request, or None if no call was made."""
+    trace = _current_trace.get()
+    if trace is None or not (trace.prompt_tokens or trace.completion_tokens):
+        return None
+    return {"prompt_tokens": trace.prompt_tokens, "completion_tokens": trace.completion_tokens}
+
+
+def _before_request():
+    g.request_started = time.perf_counter()
+    g.trace = start_trace()
+
+
+def _after_request(response):
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    group = ROUTE_GROUPS.get(request.endpoint, request.blueprint or "app")
+    elapsed = time.perf_counter() - started
+    request_latency.observe(elapsed, group=group, route=route, status=str(response.status_code))
+
+    if Config.TRACE_TIMING_HEADER:
+        trace = g.get('trace')
+        timing = trace.server_timing() if trace is not None else ""
+        total = f"total;dur={elapsed * 1000:.2f}"
+        response.headers["Server-Timing"] = f"{timing}, {total}" if timing else total
+    return response
+
+
+def init_app(app):
+    """Time every request and trace its stages."""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
@@ -0,0 +1,108 @@
+"""
+Native ASGI handler for POST /chat/messages.
+
+Same request and response contract as chat_routes.get_messages, but every
+wait (database, Groq) is awaited, so a single worker can serve hundreds of
+in-flight conversations. The stores without an async client (rate limiter,
+caches) run in a thread. asgi.py mounts it in front of the Flask app.
+"""
+import asyncio
+import json
+
+from app.agents.main_agent import aorchestrate_response
+from app.agents.prompts import build_history
+from app.auth.jwt_auth import CurrentUser, verify_token
+from app.auth.rate_limit import client_key, get_rate_limiter, llm_tokens_used, too_many_requests
+from app.models.async_store import aload_conversation, apersist_turn
+from app.observability.tracing import start_trace, usage
+
+
+async def _read_json(receive):
+    body = b""
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get("body", b"")
+        more_body = message.get("more_body", False)
+    try:
+        data = json.loads(body or b"{}")
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+async def _send_json(send, payload, status=200, headers=None):
+    body = json.dumps(payload).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("ascii")),
+        ] + [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in (headers or {}).items()],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def _token_from_scope(scope):
+    """Same rules as jwt_auth.get_token_from_header, read from raw ASGI headers."""
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            auth_header = value.decode("latin-1")
+            if auth_header.startswith('Bearer '):
+                return auth_header.split(' ')[1]
+            return auth_header
+    return None
+
+
+def _current_user(scope):
+    token = _token_from_scope(scope)
+    if token:
+        payload, error = verify_token(token, token_type='access')
+        if not error:
+            return CurrentUser.from_payload(payload)
+    return None
+
+
+def _conversation_request(user, data):
+    """(conversation_id, user_id) to load, with the same fallbacks as chat_routes._load_conversation."""
+    conversation_id = data.get('conversation_id')
+    user_id = data.get("user_id")
+
+    # The access token carries the user's default conversation id
+    if not user_id and user is not None:
+        user_id = user.id
+        conversation_id = conversation_id or user.default_conversation_id
+    return conversation_id, user_id
+
+
+async def chat_messages(scope, receive, send):
+    start_trace()
+    user = _current_user(scope)
+    client = scope.get("client")
+    rate_limit_key = client_key(user, client[0] if client else None)
+    bucket, retry_after = await asyncio.to_thread(get_rate_limiter().check, rate_limit_key)
+    if bucket:
+        body, headers = too_many_requests(bucket, retry_after)
+        await _send_json(send, body, status=429, headers=headers)
+        return
+
+    data = await _read_json(receive)
+    user_message = data.get('message')
+    if not user_message:
+        await _send_json(send, {"error": "message is required"}, status=400)
+        return
+
+    conversation_id, summary, previous_messages = await aload_conversation(*_conversation_request(user, data))
+    history = build_history(summary, previous_messages, user_message)
+
+    metadata = {}
+    reply = await aorchestrate_response(history, metadata, conversation_id)
+    llm_usage = usage()
+    if llm_usage:
+        metadata["usage"] = llm_usage
+    await asyncio.to_thread(get_rate_limiter().charge, rate_limit_key, llm_tokens_used(metadata, reply))
+
+    await apersist_turn(conversation_id, user_message, reply)
+
+    await _send_json(send, {"reply": reply, "conversation_id": conversation_id, "metadata": metadata})
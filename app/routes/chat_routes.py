@@ -1,20 +1,32 @@
+import json
 import uuid
 
-from flask import Blueprint, jsonify, request
-from werkzeug.security import check_password_hash, generate_password_hash
+from flask import Blueprint, Response, current_app, g, jsonify, request, stream_with_context
 
 from app import db
-from app.agents.main_agent import orchestrate_response
+from app.agents.main_agent import orchestrate_response, stream_response
+from app.agents.memory import load_recent_rows, load_user_history, update_rolling_summary
+from app.agents.prompts import build_history
+from app.cache import conversation_cache
 from app.models.chat import ChatMessage, User
+from app.models.tickets import ticket_store
+from app.models.write_behind import chat_writer
+from app.observability.tracing import traced, usage
 from app.auth.jwt_auth import (
     generate_access_token,
-    verify_token,
     token_required,
-    get_token_from_header
+    get_current_user
 )
+from app.auth.passwords import AuthBusy, password_hasher
+from app.auth.rate_limit import get_rate_limiter, llm_tokens_used, rate_limited
+from config import Config
 
 chat_bp = Blueprint('chat', __name__)
 
+def _auth_busy():
+    return jsonify({"error": "authentication is busy, please retry shortly"}), 503, {"Retry-After": "1"}
+
+
 @chat_bp.route('/register', methods=['POST'])
 def register():
     data = request.get_json() or {}
@@ -27,17 +39,22 @@ def register():
     if User.query.filter_by(email=email).first():
         return jsonify({"error": "email already registered"}), 400
 
+    try:
+        password_hash = password_hasher.hash(password)
+    except AuthBusy:
+        return _auth_busy()
+
     conversation_id = str(uuid.uuid4())
     user = User(
         email=email,
-        password_hash=generate_password_hash(password),
+        password_hash=password_hash,
         default_conversation_id=conversation_id,
     )
     db.session.add(user)
     db.session.commit()
 
     # Generate access token
-    access_token = generate_access_token(user.id, user.email)
+    access_token = generate_access_token(user.id, user.email, conversation_id)
 
     return jsonify(
         {
@@ -59,16 +76,26 @@ def login():
         return jsonify({"error": "email and password are required"}), 400
 
     user = User.query.filter_by(email=email).first()
-    if not user or not check_password_hash(user.password_hash, password):
+    if not user:
+        return jsonify({"error": "invalid credentials"}), 401
+
+    try:
+        valid, new_hash = password_hasher.verify(user.password_hash, password)
+    except AuthBusy:
+        return _auth_busy()
+    if not valid:
         return jsonify({"error": "invalid credentials"}), 401
 
     conversation_id = user.default_conversation_id or str(uuid.uuid4())
-    if user.default_conversation_id is None:
+    if user.default_conversation_id is None or new_hash:
         user.default_conversation_id = conversation_id
+        # Stored hash predates the configured method/cost; upgrade it now that we have the password
+        if new_hash:
+            user.password_hash = new_hash
         db.session.commit()
 
     # Generate access token
-    access_token = generate_access_token(user.id, user.email)
+    access_token = generate_access_token(user.id, user.email, conversation_id)
 
     return jsonify(
         {
@@ -80,122 +107,165 @@ def login():
     ), 200
 
 
-@chat_bp.route('/messages', methods=['POST'])
-def get_messages():
-    data = request.get_json() or {}
-    user_message = data.get('message')
+@traced("db.history")
+def _load_conversation(data):
+    """
+    Pick the conversation for this turn (explicit id, the user's default, or a
+    new one) and load its recent rows and summary from the conversation cache,
+    or else in a single query. Returns (conversation_id, summary, rows).
+    """
     conversation_id = data.get('conversation_id')
     user_id = data.get("user_id")
 
-    # Try to get user_id from JWT token if not provided in body
-    if not user_id:
-        token = get_token_from_header()
-        if token:
-            payload, error = verify_token(token, token_type='access')
-            if not error:
-                user_id = payload.get('user_id')
+    # Fall back to the access token's user; its default conversation id rides
+    # in the token, so only tokens issued before that claim need a lookup
+    user = get_current_user()
+    if not user_id and user is not None:
+        user_id = user.id
+        conversation_id = conversation_id or user.default_conversation_id
 
-    # If a user_id is provided (from body or token), prefer their default conversation id
+    # If a user_id is provided without a conversation, prefer their default conversation id
     if user_id and not conversation_id:
-        user = User.query.get(user_id)
-        if user and user.default_conversation_id:
-            conversation_id = user.default_conversation_id
+        loaded = load_user_history(user_id)
+        if loaded and loaded[0]:
+            _fill_cache(*loaded)
+            return loaded
 
     if not conversation_id:
-        conversation_id = str(uuid.uuid4())
+        # Brand-new conversation: nothing to load
+        return str(uuid.uuid4()), None, []
+
+    cached = conversation_cache.get(conversation_id)
+    if cached is not None:
+        return (conversation_id, *cached)
+    summary, rows = load_recent_rows(conversation_id)
+    _fill_cache(conversation_id, summary, rows)
+    return conversation_id, summary, rows
+
+
+def _fill_cache(conversation_id, summary, rows):
+    # Include turns this worker hasn't flushed yet, or the next append would skip them
+    pending = chat_writer.pending(conversation_id, after=rows[-1][2] if rows else None)
+    conversation_cache.put(conversation_id, summary, rows + pending)
+
+
+@traced("prompt.build")
+def _build_history(conversation_id, summary, rows, user_message):
+    """Assemble the system prompt, recent context and the new user turn."""
+    # Turns this worker queued for write-behind but hasn't flushed yet
+    rows = rows + chat_writer.pending(conversation_id, after=rows[-1][2] if rows else None)
+    previous_messages = [
+        {"role": role, "content": content}
+        for role, content, _ in rows[-Config.HISTORY_WINDOW_MESSAGES:]
+    ]
+    return build_history(summary, previous_messages, user_message)
 
-    if not user_message:
-        return jsonify({"error": "message is required"}), 400
 
-    # Fetch prior context for this conversation
-    previous_messages = (
-        ChatMessage.query.filter_by(conversation_id=conversation_id)
-        .order_by(ChatMessage.created_at.asc())
-        .all()
-    )
+@traced("db.persist")
+def _persist_turn(conversation_id, user_message, reply):
+    """Persist the new turn for future context"""
+    if Config.CHAT_PERSISTENCE == "write_behind" and chat_writer.enqueue(conversation_id, user_message, reply):
+        return
 
-    # InterCloud company context
-    intercloud_context = """
-InterCloud (https://intercloud.com.bd/) is a leading IT-enabled technology brand of Bangladesh, part of Brilliant Group. 
+    messages = [
+        ChatMessage(conversation_id=conversation_id, role="user", content=user_message),
+        ChatMessage(conversation_id=conversation_id, role="assistant", content=reply),
+    ]
+    db.session.add_all(messages)
+    db.session.flush()
+    # Read before the commit expires them
+    rows = [(message.role, message.content, message.created_at) for message in messages]
+    summary = conversation_cache.summary_text(update_rolling_summary(conversation_id))
+    db.session.commit()
+    conversation_cache.append(conversation_id, rows, summary)
 
-Our Products & Services:
-1. Ants Shop - Online shopping hub bringing major national brands into a single platform with best prices, easy ordering, 7-day return policy, quick delivery, and cash on delivery.
 
-2. Brilliant Cloud - First public cloud service provider in Bangladesh offering:
-   - IaaS/VM Instance, BaaS, STaaS, S3, LaaS, MaaS
-   - Cost savings, no power headaches, no physical servers
-   - Fast disaster recovery, redundancy, scalability
+def _add_usage(metadata):
+    """Token usage Groq reported for this request, when the LLM was called."""
+    llm_usage = usage()
+    if llm_usage:
+        metadata["usage"] = llm_usage
 
-3. Brilliant Telephony - Nationwide IP Telephony Service Provider (IPTSP) with:
-   - App-based PBX, Hosted PBX, Business Telephony
-   - Audio Conference, Toll Free Service, Shortcode
 
-4. Brilliant PBX - First app-based PBX solution in Bangladesh with:
-   - Personal IVR Setup, Custom Portal to Manage
-   - 0 Upfront Cost, Roam Anywhere
-   - Free App to App Calls, 24/7 Customer Support, Easy Configuration
+def _sse(payload, event=None):
+    """Format one Server-Sent Events frame."""
+    frame = f"event: {event}\n" if event else ""
+    return f"{frame}data: {json.dumps(payload)}\n\n"
+
+
+@chat_bp.route('/messages', methods=['POST'])
+@rate_limited
+def get_messages():
+    data = request.get_json() or {}
+    user_message = data.get('message')
+
+    if not user_message:
+        return jsonify({"error": "message is required"}), 400
 
-5. SMS Solutions - Commercial enterprise SMS with:
-   - Call Back Option, Push Pull Service
-   - Masking, Non-masking, Return SMS, QoS Ensured
+    conversation_id, summary, rows = _load_conversation(data)
+    history = _build_history(conversation_id, summary, rows, user_message)
 
-6. Internet & Data - Global telecommunications leadership:
-   - Business Internet, Domestic Data Connectivity
-   - Multi Protocol Label Switching (MPLS)
-   - Direct Internet Access, Internet Private Leased Circuit (IPLC)
+    metadata = {}
+    reply = orchestrate_response(history, metadata, conversation_id)
+    _add_usage(metadata)
+    get_rate_limiter().charge(g.rate_limit_key, llm_tokens_used(metadata, reply))
 
-7. Brilliant Connect - Communication app for friends and family:
-   - App to App Calling, Video Calling, Text Messaging
-   - Photo and Video Sharing, Location Sharing
-   - Security by Encryption
+    _persist_turn(conversation_id, user_message, reply)
 
-Sister Companies: NovoTel, NovoCom, Novoair, Tusuka
-"""
+    return jsonify({"reply": reply, "conversation_id": conversation_id, "metadata": metadata})
 
-    history = [
-        {
-            "role": "system",
-            "content": (
-                f"You are a smart AI support agent for InterCloud company (https://intercloud.com.bd/).\n\n"
-                f"{intercloud_context}\n\n"
-                "IMPORTANT RULES:\n"
-                "1. Always maintain awareness of InterCloud's products and services in every conversation.\n"
-                "2. When users greet you or express they need help, ask what issue they're experiencing.\n"
-                "3. Once you understand their issue clearly, use the appropriate tool:\n\n"
-                "- To search documentation: respond ONLY with '__Search__: <query>'\n"
-                "- To summarize text: respond ONLY with '__SUMMARY__: <text>'\n"
-                "- To create a support ticket: respond ONLY with '__CREATE_TICKET__: <issue_description>'\n\n"
-                "4. Always gather enough information before creating a ticket. The issue description should be clear and specific.\n"
-                "5. After responding to the user, ALWAYS end your message with a relevant question about InterCloud's services or products that could help them further. "
-                "This question should be natural and related to the conversation context, even if the conversation went off-topic.\n"
-                "6. When creating tickets, always provide the direct ticket creation link: https://app-support.brilliant.com.bd/create-ticket"
-                "7. If they ask for Ants Shop website, provide this link: https://ants.brilliant.com.bd/"
-            ),
-        }
-    ]
 
-    history.extend(
-        {"role": msg.role, "content": msg.content} for msg in previous_messages
-    )
-    history.append({"role": "user", "content": user_message})
+@chat_bp.route('/messages/stream', methods=['POST'])
+@rate_limited
+def stream_messages():
+    """
+    Same contract as /messages, but the reply is sent as Server-Sent Events:
+    `data: {"delta": ...}` frames as text arrives, then one `event: done` frame
+    carrying the full reply. The turn is persisted once the stream completes.
+    """
+    data = request.get_json() or {}
+    user_message = data.get('message')
 
-    reply = orchestrate_response(history)
+    if not user_message:
+        return jsonify({"error": "message is required"}), 400
 
-    # Persist the new turn for future context
-    db.session.add(
-        ChatMessage(
-            conversation_id=conversation_id,
-            role="user",
-            content=user_message,
-        )
-    )
-    db.session.add(
-        ChatMessage(
-            conversation_id=conversation_id,
-            role="assistant",
-            content=reply,
+    conversation_id, summary, rows = _load_conversation(data)
+    history = _build_history(conversation_id, summary, rows, user_message)
+    metadata = {}
+
+    def events():
+        chunks = []
+        try:
+            for chunk in stream_response(history, metadata, conversation_id):
+                chunks.append(chunk)
+                yield _sse({"delta": chunk})
+        except Exception:
+            current_app.logger.exception("Streaming reply failed for %s", conversation_id)
+            yield _sse({"error": "reply generation failed"}, event="error")
+            return
+
+        reply = "".join(chunks)
+        _add_usage(metadata)
+        get_rate_limiter().charge(g.rate_limit_key, llm_tokens_used(metadata, reply))
+        _persist_turn(conversation_id, user_message, reply)
+        yield _sse(
+            {"reply": reply, "conversation_id": conversation_id, "metadata": metadata},
+            event="done",
         )
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    db.session.commit()
 
-    return jsonify({"reply": reply, "conversation_id": conversation_id})
+
+@chat_bp.route('/tickets', methods=['GET'])
+@token_required
+def list_tickets():
+    """Tickets opened in the caller's default conversation."""
+    conversation_id = get_current_user().default_conversation_id
+    if not conversation_id:
+        return jsonify({"tickets": []})
+    tickets = ticket_store.for_conversations([conversation_id])[conversation_id]
+    return jsonify({"conversation_id": conversation_id, "tickets": tickets})
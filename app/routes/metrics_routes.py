@@ -0,0 +1,43 @@
+import hmac
+import os
+
+from flask import Blueprint, Response, jsonify, request
+
+from app.agents.incidents import incidents
+from app.observability.metrics import render_prometheus
+from config import Config
+
+metrics_bp = Blueprint('metrics', __name__)
+
+_LOOPBACK = ("127.0.0.1", "::1")
+
+
+@metrics_bp.before_request
+def require_metrics_token():
+    """Bearer Metrics_Token, or a loopback client when no token is configured."""
+    if Config.METRICS_TOKEN:
+        auth_header = request.headers.get("Authorization", "")
+        token = auth_header[len("Bearer "):] if auth_header.startswith("Bearer ") else ""
+        if hmac.compare_digest(token.encode("utf-8"), Config.METRICS_TOKEN.encode("utf-8")):
+            return None
+        return jsonify({"error": "metrics token is missing or invalid"}), 401
+    if request.remote_addr in _LOOPBACK:
+        return None
+    return jsonify({"error": "metrics are only served to localhost unless Metrics_Token is set"}), 403
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Prometheus scrape endpoint. Counters and histograms are per worker
+    process, so every series carries a pid label naming the worker that
+    answered; query with sum without (pid) for totals.
+    """
+    body = render_prometheus(constant_labels=(("pid", os.getpid()),))
+    return Response(body, mimetype="text/plain; version=0.0.4")
+
+
+@metrics_bp.route('/incidents', methods=['GET'])
+def incident_counts():
+    """This worker's keyword-triggered report counts for the current window, and any open incidents."""
+    return jsonify({**incidents.counts(), "pid": os.getpid()})
@@ -1,4 +1,12 @@
 # tools/knowledge_base.py
+import json
+import math
+import re
+import threading
+from collections import deque
+
+from config import Config
+
 KNOWLEDGE_BASE = {
     "password reset": {
         "keywords": ["password", "reset", "forgot password", "change password"],
@@ -14,13 +22,158 @@ KNOWLEDGE_BASE = {
     }
 }
 
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def _words(text):
+    return tuple(_WORD_PATTERN.findall(text.lower()))
+
+
+class KnowledgeBaseIndex:
+    """
+    All KB keywords compiled into one Aho-Corasick automaton over words, so a
+    lookup is a single pass over the query regardless of how many entries exist.
+
+    Each matched keyword votes for the topics that list it, weighted by phrase
+    length and by how specific the keyword is (keywords shared by many topics
+    count for less). Confidence is the winning topic's share of all votes.
+    """
+
+    def __init__(self, entries):
+        self.responses = {}
+        keyword_topics = {}
+        for topic, data in entries.items():
+            self.responses[topic] = data["response"]
+            for keyword in data["keywords"]:
+                words = _words(keyword)
+                if words:
+                    keyword_topics.setdefault(words, set()).add(topic)
+
+        topic_count = max(len(self.responses), 1)
+        self.keywords = list(keyword_topics)
+        self.votes = [
+            [(topic, len(words) * math.log(1 + topic_count / len(keyword_topics[words])))
+             for topic in sorted(keyword_topics[words])]
+            for words in self.keywords
+        ]
+        self._build_automaton()
+
+    def _build_automaton(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        for keyword_id, words in enumerate(self.keywords):
+            state = 0
+            for word in words:
+                next_state = self._goto[state].get(word)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][word] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append(keyword_id)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(word, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def matches(self, query):
+        """Ids of the distinct keywords that occur in the query."""
+        found = set()
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for word in _words(query):
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+    def search(self, query):
+        scores = {}
+        for keyword_id in self.matches(query):
+            for topic, weight in self.votes[keyword_id]:
+                scores[topic] = scores.get(topic, 0.0) + weight
+
+        if not scores:
+            return {"found": False, "response": None, "topic": None, "confidence": 0.0}
+
+        topic = max(scores, key=scores.get)
+        confidence = scores[topic] / sum(scores.values())
+        found = confidence >= Config.KB_MIN_CONFIDENCE
+        return {
+            "found": found,
+            "response": self.responses[topic] if found else None,
+            "topic": topic,
+            "confidence": round(confidence, 3),
+        }
+
+
+def load_entries_from_file(path):
+    """Read KB entries from a JSON file shaped like KNOWLEDGE_BASE."""
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+_app = None
+
+
+def init_app(app):
+    """Remember the app, so the database is readable outside a request (e.g. the ASGI path)."""
+    global _app
+    _app = app
+
+
+def load_entries_from_db():
+    """Read KB entries from the knowledge_base_entries table, in the app's context."""
+    from app.models.chat import KnowledgeBaseEntry
+
+    with _app.app_context():
+        return {
+            entry.topic: {"keywords": entry.keywords, "response": entry.response}
+            for entry in KnowledgeBaseEntry.query.all()
+        }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def load_knowledge_base():
+    """
+    Build the index from the configured sources: the built-in entries, then
+    Knowledge_Base_Path, then the database when Knowledge_Base_From_DB is set.
+    Later sources override topics of the same name.
+    """
+    global _index
+    entries = dict(KNOWLEDGE_BASE)
+    if Config.KNOWLEDGE_BASE_PATH:
+        entries.update(load_entries_from_file(Config.KNOWLEDGE_BASE_PATH))
+    if Config.KNOWLEDGE_BASE_FROM_DB:
+        entries.update(load_entries_from_db())
+    _index = KnowledgeBaseIndex(entries)
+    return _index
+
+
+def get_knowledge_base():
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                load_knowledge_base()
+    return _index
+
+
 def search_knowledge_base(query):
     """Search knowledge base before using other tools"""
-    query_lower = query.lower()
-    
-    for topic, data in KNOWLEDGE_BASE.items():
-        for keyword in data["keywords"]:
-            if keyword in query_lower:
-                return {"found": True, "response": data["response"]}
-    
-    return {"found": False, "response": None}
\ No newline at end of file
+    return get_knowledge_base().search(query)
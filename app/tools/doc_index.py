@@ -0,0 +1,187 @@
+"""
+BM25 index over support documents.
+
+Build it offline from a directory of .md/.txt files:
+
+    python -m app.tools.doc_index <docs_dir> <index.json>
+
+and point Doc_Index_Path at the output. Each worker loads the index lazily on
+its first search and keeps it for the life of the process.
+"""
+import argparse
+import gzip
+import heapq
+import json
+import math
+import os
+import re
+import threading
+
+from config import Config
+
+_TERM_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do for from how i in is it my of on or the to "
+    "was what when where which with you your".split()
+)
+
+PASSAGE_MAX_WORDS = 120
+SNIPPET_MAX_CHARS = 300
+
+
+def tokenize(text):
+    return [term for term in _TERM_PATTERN.findall(text.lower()) if term not in STOPWORDS]
+
+
+class DocIndex:
+    """Inverted index with Okapi BM25 scoring."""
+
+    def __init__(self, docs, postings, doc_lengths, k1=1.5, b=0.75):
+        self.docs = docs
+        self.postings = postings
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        self.avg_length = (sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0.0
+        total = len(docs)
+        self.idf = {
+            term: math.log(1 + (total - len(entries) + 0.5) / (len(entries) + 0.5))
+            for term, entries in postings.items()
+        }
+
+    @classmethod
+    def build(cls, docs, k1=1.5, b=0.75):
+        """docs: list of {"title", "content", "source"?} passages."""
+        postings = {}
+        doc_lengths = []
+        for doc_id, doc in enumerate(docs):
+            terms = tokenize(f"{doc['title']} {doc['content']}")
+            doc_lengths.append(len(terms))
+            counts = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((doc_id, tf))
+        return cls(docs, postings, doc_lengths, k1, b)
+
+    def search(self, query, k=3):
+        scores = {}
+        k1, b = self.k1, self.b
+        avg_length = self.avg_length or 1.0
+        for term in set(tokenize(query)):
+            entries = self.postings.get(term)
+            if not entries:
+                continue
+            idf = self.idf[term]
+            for doc_id, tf in entries:
+                norm = k1 * (1 - b + b * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+
+        results = []
+        for doc_id, score in heapq.nlargest(k, scores.items(), key=lambda item: item[1]):
+            doc = self.docs[doc_id]
+            content = doc["content"]
+            if len(content) > SNIPPET_MAX_CHARS:
+                content = content[:SNIPPET_MAX_CHARS].rsplit(" ", 1)[0] + "..."
+            results.append({
+                "title": doc["title"],
+                "content": content,
+                "source": doc.get("source"),
+                "score": round(score, 3),
+            })
+        return results
+
+    def save(self, path):
+        data = {
+            "version": 1,
+            "k1": self.k1,
+            "b": self.b,
+            "docs": self.docs,
+            "doc_lengths": self.doc_lengths,
+            "postings": self.postings,
+        }
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "wt", encoding="utf-8") as handle:
+            json.dump(data, handle)
+
+    @classmethod
+    def load(cls, path):
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as handle:
+            data = json.load(handle)
+        postings = {term: [tuple(entry) for entry in entries] for term, entries in data["postings"].items()}
+        return cls(data["docs"], postings, data["doc_lengths"], data["k1"], data["b"])
+
+
+def split_passages(title, text, source=None):
+    """Split a document into paragraph passages of at most PASSAGE_MAX_WORDS words."""
+    passages = []
+    heading = title
+    for block in re.split(r"\n\s*\n", text):
+        block = block.strip()
+        if not block:
+            continue
+        if block.startswith("#"):
+            first_line, _, block = block.partition("\n")
+            heading = first_line.lstrip("#").strip() or title
+            block = block.strip()
+            if not block:
+                continue
+        words = block.split()
+        for start in range(0, len(words), PASSAGE_MAX_WORDS):
+            passages.append({
+                "title": heading,
+                "content": " ".join(words[start:start + PASSAGE_MAX_WORDS]),
+                "source": source,
+            })
+    return passages
+
+
+def ingest_directory(docs_dir):
+    """Read every .md/.txt file under docs_dir into passages."""
+    passages = []
+    for root, _, files in os.walk(docs_dir):
+        for name in sorted(files):
+            if not name.lower().endswith((".md", ".txt")):
+                continue
+            path = os.path.join(root, name)
+            with open(path, encoding="utf-8") as handle:
+                text = handle.read()
+            title = os.path.splitext(name)[0].replace("_", " ").replace("-", " ")
+            passages.extend(split_passages(title, text, os.path.relpath(path, docs_dir)))
+    return passages
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_doc_index(default_documents=()):
+    """
+    The process-wide index: loaded from Doc_Index_Path on first use, or built
+    in memory from `default_documents` when no index file is configured.
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                if Config.DOC_INDEX_PATH and os.path.exists(Config.DOC_INDEX_PATH):
+                    _index = DocIndex.load(Config.DOC_INDEX_PATH)
+                else:
+                    _index = DocIndex.build(list(default_documents))
+    return _index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the support-doc BM25 index.")
+    parser.add_argument("docs_dir", help="directory of .md/.txt support documents")
+    parser.add_argument("output", help="index file to write (.json or .json.gz)")
+    args = parser.parse_args()
+
+    passages = ingest_directory(args.docs_dir)
+    DocIndex.build(passages).save(args.output)
+    print(f"Indexed {len(passages)} passages into {args.output}")
+
+
+if __name__ == "__main__":
+    main()
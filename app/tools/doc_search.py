@@ -1,11 +1,13 @@
-def search_docs(query):
-    documents = [
-        {"title": "password reset", "content": "To reset your password, go to the settings page..."},
-        {"title": "Billing", "content": "For billing inquiries, please contact support."},
-        {"title": "Account Deletion", "content": "contact support to delete your account."}
-    ]
-    results = []
-    for doc in documents:
-        if query.lower() in doc["title"].lower():
-            results.append(doc)
-    return results
\ No newline at end of file
+from app.tools.doc_index import get_doc_index
+
+# Used when no Doc_Index_Path is configured.
+DEFAULT_DOCUMENTS = [
+    {"title": "password reset", "content": "To reset your password, go to the settings page..."},
+    {"title": "Billing", "content": "For billing inquiries, please contact support."},
+    {"title": "Account Deletion", "content": "contact support to delete your account."}
+]
+
+
+def search_docs(query, k=3):
+    """Top-k support document passages for the query, best first, with BM25 scores."""
+    return get_doc_index(DEFAULT_DOCUMENTS).search(query, k=k)
@@ -1,12 +1,13 @@
-import random
+from app.models.tickets import ticket_store
 
 TICKET_CREATION_LINK = "https://app-support.brilliant.com.bd/create-ticket"
 
-def create_ticket(issue):
-    ticket_id = f"TICKET-{random.randint(1000, 9999)}"
-    return {
-        "ticket_id": ticket_id,
-        "issue": issue,
-        "status": "Created",
-        "ticket_link": TICKET_CREATION_LINK
-    }
\ No newline at end of file
+def create_ticket(issue, conversation_id=None, key=None):
+    """
+    Opens a ticket, or returns the conversation's open ticket for the same issue
+    (see app/models/tickets.py). `key` groups differently worded reports of one issue.
+    Returns (ticket, created): whether this call opened it.
+    """
+    ticket, created = ticket_store.create(issue, conversation_id=conversation_id, key=key)
+    ticket["ticket_link"] = TICKET_CREATION_LINK
+    return ticket, created
@@ -0,0 +1,38 @@
+"""
+ASGI entry point: async chat path in front of the regular Flask app.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 4
+
+POST /chat/messages is served by the native async handler; every other route
+(register, login, streaming, ...) runs through the Flask app via WsgiToAsgi.
+"""
+import asyncio
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import create_app, warm_up
+from app.models import async_store
+from app.routes.async_chat import chat_messages
+
+flask_app = create_app()
+_wsgi_app = WsgiToAsgi(flask_app)
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                # Build the indexes and load the models before the first request, off the event loop
+                await asyncio.to_thread(warm_up, flask_app)
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await async_store.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    if scope["type"] == "http" and scope["method"] == "POST" and scope["path"] == "/chat/messages":
+        await chat_messages(scope, receive, send)
+        return
+
+    await _wsgi_app(scope, receive, send)
@@ -0,0 +1,78 @@
+"""
+Auth overhead per chat request, before and after the verified-token cache.
+
+    python benchmarks/bench_auth.py [--users 200] [--out auth.json]
+
+"before" is the old hot path: jwt.decode on every request, then a User row
+lookup to find default_conversation_id. "after_cold" is the first request with
+a token (decode + cache insert), "after_warm" every later one (cache hit, the
+conversation id read from the token).
+"""
+import argparse
+import os
+import random
+import tempfile
+
+from common import summarize, time_calls, write_results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["Database_URL"] = f"sqlite:///{os.path.join(tmp.name, 'auth.sqlite')}"
+    os.environ.setdefault("JWT_Secret", "benchmark-secret-that-is-long-enough")
+
+    import jwt
+
+    from app import create_app, db
+    from app.auth import jwt_auth
+    from app.auth.jwt_auth import CurrentUser, generate_access_token, verify_token
+    from app.models.chat import User
+
+    app = create_app()
+    rng = random.Random(args.seed)
+    with app.app_context():
+        db.create_all()
+        users = [
+            User(email=f"user{i}@example.com", password_hash="x", default_conversation_id=f"conv-{i}")
+            for i in range(args.users)
+        ]
+        db.session.add_all(users)
+        db.session.commit()
+        tokens = [generate_access_token(u.id, u.email, u.default_conversation_id) for u in users]
+        requests = [(rng.choice(tokens),) for _ in range(args.requests)]
+
+        def before(token):
+            payload = jwt.decode(token, jwt_auth.JWT_SECRET, algorithms=['HS256'])
+            if payload.get('type') != 'access':
+                return None
+            # Each request had a fresh session, so the row always came from the database
+            db.session.expunge_all()
+            return db.session.get(User, payload['user_id']).default_conversation_id
+
+        def after(token):
+            payload, error = verify_token(token, token_type='access')
+            return None if error else CurrentUser.from_payload(payload).default_conversation_id
+
+        def after_cold(token):
+            jwt_auth._verified_tokens.clear()
+            return after(token)
+
+        results = {
+            "users": args.users,
+            "before": summarize(time_calls(before, requests)),
+            "after_cold": summarize(time_calls(after_cold, requests)),
+            "after_warm": summarize(time_calls(after, requests)),
+        }
+    tmp.cleanup()
+    write_results("auth_overhead", results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+History loading per turn with and without the conversation-state cache.
+
+    python benchmarks/bench_conversation_cache.py [--conversations 200] [--turns 40]
+
+Fills a throwaway SQLite database with conversations of --turns turns each,
+then times what /chat/messages does before answering: "database" is
+load_recent_rows, "cache_sqlite" and "cache_memory" are conversation_cache.get
+on warm entries of each backend, and "append" is the write-side update after a
+turn. Against Postgres over a network the database column only gets slower.
+"""
+import argparse
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from common import summarize, time_calls, write_results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["Database_URL"] = f"sqlite:///{os.path.join(tmp.name, 'history.sqlite')}"
+    os.environ["Conversation_Cache_Path"] = os.path.join(tmp.name, "conversation_cache.sqlite")
+
+    from app import create_app, db
+    from app.agents.memory import load_recent_rows, update_rolling_summary
+    from app.cache import conversation_cache
+    from app.cache.backends import make_backend
+    from app.models.chat import ChatMessage
+    from config import Config
+
+    app = create_app()
+    conversation_ids = [f"conv-{i}" for i in range(args.conversations)]
+    start = datetime.utcnow() - timedelta(days=1)
+    with app.app_context():
+        db.create_all()
+        for conversation_id in conversation_ids:
+            db.session.add_all(
+                ChatMessage(
+                    conversation_id=conversation_id,
+                    role="user" if turn % 2 == 0 else "assistant",
+                    content=f"message {turn} of {conversation_id} about billing and setup",
+                    created_at=start + timedelta(seconds=turn),
+                )
+                for turn in range(args.turns * 2)
+            )
+            db.session.flush()
+            update_rolling_summary(conversation_id)
+        db.session.commit()
+
+        calls = [(conversation_id,) for conversation_id in conversation_ids]
+        results = {
+            "conversations": args.conversations,
+            "turns": args.turns,
+            "window": Config.HISTORY_WINDOW_MESSAGES,
+            "database": summarize(time_calls(load_recent_rows, calls, args.repeat)),
+        }
+        states = {conversation_id: load_recent_rows(conversation_id) for conversation_id in conversation_ids}
+
+    for kind in ("sqlite", "memory"):
+        conversation_cache._backend = make_backend(
+            kind,
+            Config.CONVERSATION_CACHE_MAX_ENTRIES,
+            path=Config.CONVERSATION_CACHE_PATH,
+            table="conversation_cache",
+            max_bytes=Config.CONVERSATION_CACHE_MAX_BYTES,
+        )
+        for conversation_id, (summary, rows) in states.items():
+            conversation_cache.put(conversation_id, summary, rows)
+        results[f"cache_{kind}"] = summarize(time_calls(conversation_cache.get, calls, args.repeat))
+        now = datetime.utcnow()
+        turn = [("user", "one more question", now), ("assistant", "one more answer", now)]
+        results[f"append_{kind}"] = summarize(
+            time_calls(lambda conversation_id: conversation_cache.append(conversation_id, turn), calls, args.repeat)
+        )
+    tmp.cleanup()
+    write_results("conversation_cache", results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+BM25 doc-index query latency against corpus size, plus build and load cost.
+
+    python benchmarks/bench_doc_search.py [--sizes 1000 10000 100000] [--out docs.json]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from common import summarize, time_calls, write_results
+
+from app.tools.doc_index import DocIndex
+
+
+def synthetic_corpus(size, rng, vocabulary):
+    # Zipf-like term frequencies, like real support prose.
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    return [
+        {
+            "title": " ".join(rng.choices(vocabulary, weights, k=3)),
+            "content": " ".join(rng.choices(vocabulary, weights, k=rng.randint(40, 120))),
+        }
+        for _ in range(size)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--vocabulary", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = [f"word{i}" for i in range(args.vocabulary)]
+    results = []
+    for size in args.sizes:
+        docs = synthetic_corpus(size, rng, vocabulary)
+        queries = [(" ".join(rng.sample(vocabulary[:2000], 4)),) for _ in range(args.queries)]
+
+        start = time.perf_counter()
+        index = DocIndex.build(docs)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "index.json.gz")
+            index.save(path)
+            size_kb = os.path.getsize(path) / 1024
+            start = time.perf_counter()
+            index = DocIndex.load(path)
+            load_ms = (time.perf_counter() - start) * 1000
+
+        results.append({
+            "passages": size,
+            "build_ms": round(build_ms, 1),
+            "load_ms": round(load_ms, 1),
+            "index_kb": round(size_kb, 1),
+            "query": summarize(time_calls(index.search, queries)),
+        })
+
+    write_results("doc_search_query", results, args.out)
+
+
+if __name__ == "__main__":
+    main()
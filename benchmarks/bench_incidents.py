@@ -0,0 +1,82 @@
+"""
+OTP outage burst with and without incident aggregation.
+
+    python benchmarks/bench_incidents.py [--conversations 2000] [--repeats 0.3] [--threads 8]
+
+--conversations users report missing OTP codes, a --repeats share of them
+twice, through the same _direct_reply the chat path uses. Runs with
+Incident_Store none (one ticket per conversation, as before) and memory
+(aggregation), on a throwaway SQLite database, and reports tickets opened,
+reports attached to the incident, and per-report latency. "sketch_bytes" is
+the fixed memory of the per-category counting structures.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import summarize, write_results
+
+MESSAGES = ["I am not getting my OTP", "no otp code arriving", "verification code never comes", "otp not received!!"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--conversations", type=int, default=2000)
+    parser.add_argument("--repeats", type=float, default=0.3)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["Database_URL"] = f"sqlite:///{os.path.join(tmp.name, 'incidents.sqlite')}"
+
+    from app import create_app, db
+    from app.agents.incidents import IncidentAggregator, _Category
+    from app.agents import main_agent
+    from app.models.chat import Ticket, TicketReport
+    from config import Config
+
+    app = create_app()
+    rng = random.Random(args.seed)
+    reports = [f"conv-{i}" for i in range(args.conversations)]
+    reports += rng.sample(reports, int(args.conversations * args.repeats))
+    rng.shuffle(reports)
+
+    sketch = _Category(Config.INCIDENT_WINDOW_SECONDS).sketch._current
+    results = {
+        "conversations": args.conversations,
+        "reports": len(reports),
+        "threshold": Config.INCIDENT_THRESHOLD,
+        "sketch_bytes": sketch.width * sketch.depth * 4 * 2,
+    }
+    for kind in ("none", "memory"):
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+        Config.INCIDENT_STORE = kind
+        main_agent.incidents = IncidentAggregator()
+
+        def one(conversation_id):
+            history = [{"role": "user", "content": rng.choice(MESSAGES)}]
+            start = time.perf_counter_ns()
+            main_agent._direct_reply(history, conversation_id=f"{kind}-{conversation_id}")
+            return (time.perf_counter_ns() - start) / 1000
+
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            latencies = list(pool.map(one, reports))
+        with app.app_context():
+            results[kind] = {
+                "tickets": db.session.query(Ticket).count(),
+                "attached_reports": db.session.query(TicketReport).count(),
+                "latency": summarize(latencies),
+            }
+    tmp.cleanup()
+    write_results("incidents", results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Knowledge-base lookup latency as the KB grows, compiled index vs the old
+linear substring scan.
+
+    python benchmarks/bench_knowledge_base.py [--sizes 10 100 1000 10000] [--out kb.json]
+"""
+import argparse
+import random
+import time
+
+from common import summarize, time_calls, write_results
+
+from app.tools.Knowledge_base import KnowledgeBaseIndex
+
+FILLER = "hi i need some help with my account it is not working since this morning please".split()
+
+
+def synthetic_kb(size, rng):
+    vocabulary = [f"term{i}" for i in range(max(50, size * 2))]
+    entries = {}
+    for i in range(size):
+        keywords = []
+        for _ in range(4):
+            words = rng.sample(vocabulary, rng.choice((1, 1, 2)))
+            keywords.append(" ".join(words))
+        entries[f"topic {i}"] = {"keywords": keywords, "response": f"Answer for topic {i}"}
+    return entries
+
+
+def synthetic_queries(entries, count, rng):
+    topics = list(entries.values())
+    queries = []
+    for _ in range(count):
+        words = rng.sample(FILLER, 10)
+        if rng.random() < 0.7:
+            words.insert(rng.randrange(len(words)), rng.choice(rng.choice(topics)["keywords"]))
+        queries.append((" ".join(words),))
+    return queries
+
+
+def linear_scan(entries):
+    """The pre-index implementation: first substring hit in dict order."""
+    def search(query):
+        query_lower = query.lower()
+        for topic, data in entries.items():
+            for keyword in data["keywords"]:
+                if keyword in query_lower:
+                    return {"found": True, "response": data["response"]}
+        return {"found": False, "response": None}
+    return search
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    results = []
+    for size in args.sizes:
+        entries = synthetic_kb(size, rng)
+        queries = synthetic_queries(entries, args.queries, rng)
+
+        start = time.perf_counter()
+        index = KnowledgeBaseIndex(entries)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        results.append({
+            "entries": size,
+            "build_ms": round(build_ms, 2),
+            "indexed_lookup": summarize(time_calls(index.search, queries, repeat=3)),
+            "linear_scan": summarize(time_calls(linear_scan(entries), queries, repeat=1)),
+        })
+
+    write_results("knowledge_base_lookup", results, args.out)
+
+
+if __name__ == "__main__":
+    main()
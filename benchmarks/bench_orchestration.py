@@ -0,0 +1,108 @@
+"""
+Sequential vs concurrent orchestration (Orchestration_Mode) against the fake
+Groq server.
+
+    python benchmarks/bench_orchestration.py --conversations 200 --latency 0.3
+
+With Followup_LLM_Fallback on, a reply the question bank doesn't cover costs
+two LLM round-trips in sequential mode and one overlapped pair in concurrent
+mode. --kb-share of the messages are knowledge-base questions, where the
+speculative completion is dropped; "upstream_calls" shows what that costs.
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import summarize, write_results
+from fake_groq_server import start_server
+
+KB_MESSAGES = ["i forgot my password", "how do i reset my password", "what are your business hours"]
+
+
+def _histories(count, kb_share, rng):
+    from app.agents.prompts import build_history
+
+    # Unique messages outside the question bank, so the follow-up needs the LLM
+    return [
+        build_history(None, [], rng.choice(KB_MESSAGES) if rng.random() < kb_share else f"question {i} about my setup")
+        for i in range(count)
+    ]
+
+
+def run_sync(histories, workers):
+    from app.agents.main_agent import orchestrate_response
+
+    def one(history):
+        start = time.perf_counter()
+        orchestrate_response(history)
+        return (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(one, histories))
+
+
+def run_async(histories, concurrency):
+    from app.agents.main_agent import aorchestrate_response
+
+    async def main():
+        limit = asyncio.Semaphore(concurrency)
+
+        async def one(history):
+            async with limit:
+                start = time.perf_counter()
+                await aorchestrate_response(history)
+                return (time.perf_counter() - start) * 1000
+
+        return await asyncio.gather(*(one(history) for history in histories))
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.3, help="fake Groq latency in seconds")
+    parser.add_argument("--kb-share", type=float, default=0.2)
+    parser.add_argument("--workers", type=int, default=16, help="sync request threads / async concurrency")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    server, base_url = start_server(latency=args.latency)
+    settings = server.RequestHandlerClass.settings
+    # Config reads the environment at import time, so set it before importing the app.
+    os.environ["Groq_Base_URL"] = base_url
+    os.environ["Response_Cache_Backend"] = "none"
+    os.environ["Followup_LLM_Fallback"] = "true"
+
+    from config import Config
+
+    histories = _histories(args.conversations, args.kb_share, random.Random(args.seed))
+    results = {
+        "conversations": args.conversations,
+        "fake_latency_s": args.latency,
+        "kb_share": args.kb_share,
+        "workers": args.workers,
+    }
+    for runner_name, runner in (("sync", run_sync), ("async", run_async)):
+        for mode in ("sequential", "concurrent"):
+            Config.ORCHESTRATION_MODE = mode
+            calls_before = settings.requests
+            start = time.perf_counter()
+            latencies = runner([list(history) for history in histories], args.workers)
+            elapsed = time.perf_counter() - start
+            results[f"{runner_name}_{mode}"] = {
+                "elapsed_s": round(elapsed, 2),
+                "upstream_calls": settings.requests - calls_before,
+                "latency": summarize(latencies, unit="ms"),
+            }
+    server.shutdown()
+
+    write_results("orchestration_modes", results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Microbenchmarks for the per-message steps of the chat pipeline: context
+packing, knowledge-base lookup, doc search and history loading.
+
+    python benchmarks/bench_pipeline.py [--history-sizes 10 100 1000] [--out pipeline.json]
+
+History loading runs against a throwaway SQLite database seeded with one
+conversation per size; the other steps are pure CPU.
+"""
+import argparse
+import os
+import random
+import tempfile
+
+from common import summarize, time_calls, write_results
+
+from fake_groq_server import DEFAULT_REPLY
+
+USER_TURNS = [
+    "my vm instance is not reachable over ssh since this morning",
+    "how do i configure call forwarding on the hosted pbx",
+    "i was charged twice on my last invoice",
+    "can you tell me more about brilliant cloud storage tiers",
+    "the connect app keeps logging me out on android",
+    "what is the difference between app based pbx and hosted pbx",
+]
+
+
+def synthetic_history(turns, rng):
+    messages = []
+    for _ in range(turns):
+        messages.append({"role": "user", "content": rng.choice(USER_TURNS)})
+        messages.append({"role": "assistant", "content": DEFAULT_REPLY})
+    return messages
+
+
+def bench_pack_context(sizes, rng, repeat):
+    from app.agents.context_builder import estimate_tokens, pack_context
+    from app.agents.prompts import build_history
+
+    results = []
+    for size in sizes:
+        history = build_history(None, synthetic_history(size // 2, rng), rng.choice(USER_TURNS))
+        estimate_tokens.cache_clear()
+        results.append({
+            "messages": len(history),
+            "pack_context": summarize(time_calls(pack_context, [(history,)], repeat=repeat)),
+        })
+    return results
+
+
+def bench_lookups(rng, count):
+    from app.tools.doc_search import search_docs
+    from app.tools.Knowledge_base import search_knowledge_base
+
+    queries = [(rng.choice(USER_TURNS + ["forgot password", "billing invoice question"]),) for _ in range(count)]
+    return {
+        "search_knowledge_base": summarize(time_calls(search_knowledge_base, queries)),
+        "search_docs": summarize(time_calls(search_docs, queries)),
+    }
+
+
+def bench_history_loading(sizes, rng, repeat):
+    from app import create_app, db
+    from app.agents.memory import load_recent_rows, load_user_history, update_rolling_summary
+    from app.models.chat import ChatMessage, User
+
+    app = create_app()
+    results = []
+    with app.app_context():
+        db.create_all()
+        for size in sizes:
+            conversation_id = f"conv-{size}"
+            user = User(email=f"bench{size}@example.com", password_hash="x", default_conversation_id=conversation_id)
+            db.session.add(user)
+            db.session.add_all(
+                ChatMessage(conversation_id=conversation_id, role=m["role"], content=m["content"])
+                for m in synthetic_history(size // 2, rng)
+            )
+            db.session.flush()
+            update_rolling_summary(conversation_id)
+            db.session.commit()
+
+            user_id = user.id
+            db.session.remove()
+
+            def by_conversation():
+                load_recent_rows(conversation_id)
+                db.session.remove()
+
+            def by_user():
+                load_user_history(user_id)
+                db.session.remove()
+
+            results.append({
+                "stored_messages": size,
+                "load_recent_rows": summarize(time_calls(by_conversation, [()], repeat=repeat)),
+                "load_user_history": summarize(time_calls(by_user, [()], repeat=repeat)),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--history-sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    # Config reads the environment when app is first imported
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["Database_URL"] = f"sqlite:///{os.path.join(tmp.name, 'history.sqlite')}"
+
+    rng = random.Random(args.seed)
+    results = {
+        "pack_context": bench_pack_context(args.history_sizes, rng, args.repeat),
+        "lookups": bench_lookups(rng, args.queries),
+        "history_loading": bench_history_loading(args.history_sizes, rng, args.repeat),
+    }
+    tmp.cleanup()
+    write_results("chat_pipeline", results, args.out)
+
+
+if __name__ == "__main__":
+    main()
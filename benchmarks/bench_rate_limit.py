@@ -0,0 +1,52 @@
+"""
+Per-request overhead of the rate limiter for each bucket store.
+
+    python benchmarks/bench_rate_limit.py [--keys 1 1000] [--out rate_limit.json]
+
+Times RateLimiter.check (two bucket updates) plus the post-turn charge, for a
+single hot client and for traffic spread over many clients.
+"""
+import argparse
+import os
+import random
+import tempfile
+
+from common import summarize, time_calls, write_results
+
+from app.auth.rate_limit import RateLimiter, make_store
+
+
+def limiter(store):
+    # Limits high enough that nothing is refused; this measures bookkeeping only.
+    return RateLimiter(store, 1e9, 1e9, 1e12, 1e12)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--keys", type=int, nargs="+", default=[1, 1000])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--stores", nargs="+", default=["memory", "sqlite"])
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for kind in args.stores:
+            for key_count in args.keys:
+                path = os.path.join(tmp, f"{kind}-{key_count}.sqlite")
+                rate_limiter = limiter(make_store(kind, path=path))
+                keys = [(f"user:{rng.randrange(key_count)}",) for _ in range(args.requests)]
+                results.append({
+                    "store": kind,
+                    "clients": key_count,
+                    "check": summarize(time_calls(rate_limiter.check, keys)),
+                    "charge": summarize(time_calls(lambda key: rate_limiter.charge(key, 500), keys)),
+                })
+
+    write_results("rate_limit_overhead", results, args.out)
+
+
+if __name__ == "__main__":
+    main()
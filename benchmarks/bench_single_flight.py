@@ -0,0 +1,123 @@
+"""
+Burst of near-identical messages with and without single-flight.
+
+    python benchmarks/bench_single_flight.py [--workers 4] [--threads 50] [--spread 0.5] [--latency 0.3]
+
+Simulates an incident: --workers processes (like gunicorn workers) with
+--threads users each send variants of the same message ("SMS codes are not
+arriving!!", "sms codes are not arriving?") within --spread seconds. Every
+user gets an answer plus an LLM follow-up question, the two calls the chat
+path makes. Runs with Single_Flight_Store none, memory (coalescing within a
+worker) and sqlite (across workers), and reports upstream calls against the
+fake Groq server. The response cache is off, so only coalescing saves calls.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+
+from common import summarize, write_results
+from fake_groq_server import start_server
+
+VARIANTS = [
+    "SMS codes are not arriving",
+    "sms codes are not arriving!!",
+    "SMS codes are NOT arriving?",
+    "  sms   codes are not arriving.",
+]
+
+
+def _worker(index, args, results):
+    from app.agents.main_agent import _followup_question_llm, generate_response
+    from app.agents.prompts import build_history
+    from app.agents.followups import followup_messages
+
+    rng = random.Random(args.seed + index)
+    barrier = threading.Barrier(args.threads)
+    latencies, coalesced = [], []
+    lock = threading.Lock()
+
+    def user(variant, delay):
+        barrier.wait()
+        time.sleep(delay)
+        metadata = {}
+        start = time.perf_counter()
+        reply = generate_response(build_history(None, [], variant), metadata)
+        _followup_question_llm(followup_messages(reply))
+        with lock:
+            latencies.append((time.perf_counter() - start) * 1000)
+            coalesced.append(metadata.get("coalesced"))
+
+    threads = [
+        threading.Thread(target=user, args=(rng.choice(VARIANTS), rng.uniform(0, args.spread)))
+        for _ in range(args.threads)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put((latencies, coalesced))
+
+
+def run(kind, args, settings, tmp):
+    from app.cache import single_flight
+    from config import Config
+
+    Config.SINGLE_FLIGHT_STORE = kind
+    Config.SINGLE_FLIGHT_PATH = os.path.join(tmp, "single_flight.sqlite")
+    single_flight._single_flight = None
+    before = settings.requests
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    workers = [context.Process(target=_worker, args=(index, args, results)) for index in range(args.workers)]
+    for worker in workers:
+        worker.start()
+    latencies, coalesced = [], []
+    for _ in workers:
+        worker_latencies, worker_coalesced = results.get()
+        latencies += worker_latencies
+        coalesced += worker_coalesced
+    for worker in workers:
+        worker.join()
+
+    users = args.workers * args.threads
+    upstream = settings.requests - before
+    return {
+        "users": users,
+        "llm_calls": users * 2,
+        "upstream_calls": upstream,
+        "reduction": round(1 - upstream / (users * 2), 3),
+        "answers_from_this_worker": coalesced.count("follower"),
+        "answers_from_other_workers": coalesced.count("shared"),
+        "latency": summarize(latencies, unit="ms"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=50)
+    parser.add_argument("--spread", type=float, default=0.5, help="arrivals are spread over this many seconds")
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    server, url = start_server(latency=args.latency)
+    settings = server.RequestHandlerClass.settings
+    os.environ.update(Groq_Base_URL=url, Response_Cache_Backend="none")
+
+    tmp = tempfile.TemporaryDirectory()
+    results = {"workers": args.workers, "threads": args.threads, "spread_s": args.spread, "latency_s": args.latency}
+    for kind in ("none", "memory", "sqlite"):
+        results[kind] = run(kind, args, settings, tmp.name)
+    tmp.cleanup()
+    server.shutdown()
+    write_results("single_flight", results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Cold start: importing the app, create_app() and warm_up().
+
+    python benchmarks/bench_startup.py [--runs 5] [--top 15]
+
+Each run is a fresh interpreter (python -X importtime), the way a gunicorn
+master or a worker without preloading starts. Reports the median of
+"import_create_ms" (import app and create_app()) and "warm_up_ms" (the
+first-use work a preloading master does before forking), plus the modules
+with the largest self and cumulative import times from the median run and
+the total of the app's own modules. Before lazy imports, the Groq SDK, NumPy
+and Alembic were loaded at import time.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from common import REPO_ROOT, write_results
+
+# Written to stderr between create_app() and warm_up(), splitting the import log.
+MARKER = "-- warm_up --"
+
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from app import create_app, warm_up
+app = create_app()
+created = time.perf_counter()
+sys.stderr.write(%r + "\\n")
+sys.stderr.flush()
+warm_up(app)
+done = time.perf_counter()
+print(json.dumps({"import_create_ms": (created - start) * 1000, "warm_up_ms": (done - created) * 1000}))
+""" % MARKER
+
+
+def parse_importtime(stderr):
+    """{module: (self_us, cumulative_us)} from -X importtime output."""
+    modules = {}
+    for line in stderr.split(MARKER)[0].splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if self_us.isdigit():
+            modules[name] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def run_once(env):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SCRIPT],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    timings = json.loads(proc.stdout.strip().splitlines()[-1])
+    return timings, parse_importtime(proc.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    env = dict(os.environ, Database_URL=f"sqlite:///{os.path.join(tmp.name, 'startup.sqlite')}")
+    runs = sorted((run_once(env) for _ in range(args.runs)), key=lambda run: run[0]["import_create_ms"])
+    timings, modules = runs[len(runs) // 2]
+    tmp.cleanup()
+
+    def top(index):
+        ranked = sorted(modules.items(), key=lambda item: item[1][index], reverse=True)[:args.top]
+        return [{"module": name, "ms": round(times[index] / 1000, 2)} for name, times in ranked]
+
+    app_self_us = sum(self_us for name, (self_us, _) in modules.items() if name == "app" or name.startswith("app."))
+    results = {
+        "runs": args.runs,
+        "import_create_ms": round(statistics.median(run[0]["import_create_ms"] for run in runs), 2),
+        "warm_up_ms": round(statistics.median(run[0]["warm_up_ms"] for run in runs), 2),
+        "modules_imported": len(modules),
+        "app_modules_self_ms": round(app_self_us / 1000, 2),
+        "loaded_at_import": {name: name in modules for name in ("groq", "numpy", "alembic", "flask_migrate", "httpx")},
+        "top_self": top(0),
+        "top_cumulative": top(1),
+    }
+    write_results("startup", results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Ticket creation throughput with block-allocated numbers.
+
+    python benchmarks/bench_tickets.py [--tickets 2000] [--threads 8] [--block-sizes 1 100]
+
+Runs against a throwaway SQLite database. Block size 1 is the "one counter
+round-trip per ticket" baseline. "repeat" re-creates tickets that already
+exist in the same conversations (the idempotent path). "old_random_ids" counts
+how many of the same number of TICKET-{randint(1000, 9999)} ids collided.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import summarize, write_results
+
+
+def _run(store, jobs, threads):
+    def one(job):
+        start = time.perf_counter_ns()
+        store.create(*job)
+        return (time.perf_counter_ns() - start) / 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = list(pool.map(one, jobs))
+    elapsed = time.perf_counter() - start
+    return {
+        "tickets_per_s": round(len(jobs) / elapsed, 1),
+        "latency": summarize(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickets", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--block-sizes", type=int, nargs="+", default=[1, 100])
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["Database_URL"] = f"sqlite:///{os.path.join(tmp.name, 'tickets.sqlite')}"
+
+    from app import create_app, db
+    from app.models.tickets import BlockAllocator, TICKET_COUNTER, ticket_store
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+
+    rng = random.Random(args.seed)
+    old_ids = [rng.randint(1000, 9999) for _ in range(args.tickets)]
+    results = {
+        "tickets": args.tickets,
+        "threads": args.threads,
+        "old_random_ids": {"collisions": args.tickets - len(set(old_ids))},
+    }
+    for block_size in args.block_sizes:
+        ticket_store.allocator = BlockAllocator(TICKET_COUNTER, block_size)
+        jobs = [(f"issue {i} for block {block_size}", f"conv-{block_size}-{i}") for i in range(args.tickets)]
+        results[f"block_{block_size}"] = {
+            "create": _run(ticket_store, jobs, args.threads),
+            "repeat": _run(ticket_store, jobs, args.threads),
+        }
+    tmp.cleanup()
+    write_results("ticket_creation", results, args.out)
+
+
+if __name__ == "__main__":
+    main()
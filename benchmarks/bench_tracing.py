@@ -0,0 +1,49 @@
+"""
+Cost of one tracing span, with and without a request trace active.
+
+    python benchmarks/bench_tracing.py [--spans 100000] [--out tracing.json]
+"""
+import argparse
+import time
+
+from common import write_results
+
+from app.observability.tracing import _current_trace, span, start_trace
+
+
+def per_span_ns(count):
+    start = time.perf_counter_ns()
+    for _ in range(count):
+        with span("bench"):
+            pass
+    return (time.perf_counter_ns() - start) / count
+
+
+def empty_loop_ns(count):
+    start = time.perf_counter_ns()
+    for _ in range(count):
+        pass
+    return (time.perf_counter_ns() - start) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--spans", type=int, default=100000)
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    baseline = empty_loop_ns(args.spans)
+    _current_trace.set(None)
+    untraced = per_span_ns(args.spans) - baseline
+    start_trace()
+    traced = per_span_ns(args.spans) - baseline
+
+    write_results("tracing_span_overhead", {
+        "spans": args.spans,
+        "untraced_ns_per_span": round(untraced, 1),
+        "traced_ns_per_span": round(traced, 1),
+    }, args.out)
+
+
+if __name__ == "__main__":
+    main()
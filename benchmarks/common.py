@@ -0,0 +1,75 @@
+"""Shared helpers for the benchmark scripts: timing and JSON result output."""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+# Benchmarks import the app package; make sure it resolves when run as a script.
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+# Importing app/__init__ needs no real credentials, but the Groq client does.
+os.environ.setdefault("Groq_API_Key", "benchmark")
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples, unit="us"):
+    """p50/p90/p99/mean/max of a list of durations already expressed in `unit`."""
+    return {
+        "unit": unit,
+        "count": len(samples),
+        "mean": round(statistics.fmean(samples), 3) if samples else 0.0,
+        "p50": round(percentile(samples, 50), 3),
+        "p90": round(percentile(samples, 90), 3),
+        "p99": round(percentile(samples, 99), 3),
+        "max": round(max(samples), 3) if samples else 0.0,
+    }
+
+
+def time_calls(fn, args_list, repeat=1):
+    """Call fn(*args) for every args tuple, `repeat` times; per-call microseconds."""
+    samples = []
+    for _ in range(repeat):
+        for args in args_list:
+            start = time.perf_counter_ns()
+            fn(*args)
+            samples.append((time.perf_counter_ns() - start) / 1000)
+    return samples
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(name, results, out=None):
+    """Print results as JSON, and write them to `out` when given, tagged with the commit."""
+    document = {
+        "benchmark": name,
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "results": results,
+    }
+    text = json.dumps(document, indent=2)
+    print(text)
+    if out:
+        with open(out, "w", encoding="utf-8") as handle:
+            handle.write(text + "\n")
+    return document
@@ -0,0 +1,74 @@
+"""
+Compare benchmark results between two runs (files or run_all.py directories).
+
+    python benchmarks/compare.py benchmarks/results/<old> benchmarks/results/<new>
+
+Prints p50/p99 for every latency summary found in both runs and the new/old
+ratio; ratios above --threshold are flagged.
+"""
+import argparse
+import json
+import os
+
+
+def load(path):
+    """{benchmark name: document} for a result file or a directory of them."""
+    if os.path.isdir(path):
+        paths = [os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith(".json")]
+    else:
+        paths = [path]
+    documents = {}
+    for p in paths:
+        with open(p, encoding="utf-8") as handle:
+            document = json.load(handle)
+        documents[document["benchmark"]] = document
+    return documents
+
+
+def summaries(node, path=""):
+    """Yield (path, summary) for every summarize() dict in a results tree."""
+    if isinstance(node, dict):
+        if "p50" in node and "unit" in node:
+            yield path, node
+            return
+        for key, value in node.items():
+            yield from summaries(value, f"{path}.{key}" if path else str(key))
+    elif isinstance(node, list):
+        for index, value in enumerate(node):
+            # Label list entries by their size field when they have one (e.g. messages=100).
+            label = next((f"{k}={v}" for k, v in value.items() if not isinstance(v, dict)), index) \
+                if isinstance(value, dict) else index
+            yield from summaries(value, f"{path}[{label}]")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=1.10, help="flag ratios above this")
+    args = parser.parse_args()
+
+    old, new = load(args.old), load(args.new)
+    regressions = 0
+    for name in sorted(old.keys() & new.keys()):
+        print(f"{name}  ({old[name]['commit']} -> {new[name]['commit']})")
+        before = dict(summaries(old[name]["results"]))
+        for path, after in summaries(new[name]["results"]):
+            base = before.get(path)
+            if base is None or not base["p50"]:
+                continue
+            ratio = after["p50"] / base["p50"]
+            flag = "  <-- slower" if ratio > args.threshold else ""
+            regressions += bool(flag)
+            print(
+                f"  {path:<60} p50 {base['p50']:>10} -> {after['p50']:<10} "
+                f"p99 {base['p99']:>10} -> {after['p99']:<10} {after['unit']:<3} x{ratio:.2f}{flag}"
+            )
+    for name in sorted(old.keys() ^ new.keys()):
+        print(f"{name}  (only in {'old' if name in old else 'new'})")
+    if regressions:
+        print(f"{regressions} summaries slower than x{args.threshold:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Local stand-in for the Groq (OpenAI-compatible) chat completions API.
+
+    python benchmarks/fake_groq_server.py --port 8088 --latency 0.3
+
+then run the app with Groq_Base_URL=http://127.0.0.1:8088. Supports plain and
+streamed completions; every response is delayed by --latency seconds before
+the first byte and then produced at --tokens-per-second. --model-latency and
+--model-reply override both per model, e.g. to make the large tier slower or
+the small one hedge:
+
+    --model-latency llama-3.3-70b-versatile=0.9 --model-reply "llama-3.1-8b-instant=I'm not sure."
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = (
+    "Thanks for reaching out. Our team can help with that; could you share "
+    "a few more details about what you are seeing on your account?"
+)
+
+
+class FakeGroqSettings:
+    def __init__(self, latency=0.3, tokens_per_second=0.0, reply=DEFAULT_REPLY, model_latency=None, model_reply=None):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.reply = reply
+        self.model_latency = dict(model_latency or {})
+        self.model_reply = dict(model_reply or {})
+        self.requests = 0
+        self.requests_by_model = {}
+        self._lock = threading.Lock()
+
+    def count_request(self, model):
+        with self._lock:
+            self.requests += 1
+            self.requests_by_model[model] = self.requests_by_model.get(model, 0) + 1
+
+
+def _completion_tokens(text):
+    return max(1, len(text.split()))
+
+
+class FakeGroqHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    settings = FakeGroqSettings()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.endswith("/chat/completions"):
+            self.send_error(404)
+            return
+
+        settings = self.settings
+        model = request.get("model", "llama-3.1-8b-instant")
+        settings.count_request(model)
+        time.sleep(settings.model_latency.get(model, settings.latency))
+
+        prompt_tokens = sum(_completion_tokens(m.get("content") or "") for m in request.get("messages", []))
+        reply = settings.model_reply.get(model, settings.reply)
+        if request.get("stream"):
+            self._stream(model, reply, prompt_tokens)
+        else:
+            self._complete(model, reply, prompt_tokens)
+
+    def _pace(self, tokens):
+        if self.settings.tokens_per_second > 0:
+            time.sleep(tokens / self.settings.tokens_per_second)
+
+    def _complete(self, model, reply, prompt_tokens):
+        completion_tokens = _completion_tokens(reply)
+        self._pace(completion_tokens)
+        body = json.dumps({
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": reply},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, model, reply, prompt_tokens):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        words = reply.split(" ")
+        for position, word in enumerate(words):
+            self._pace(1)
+            delta = word if position == 0 else f" {word}"
+            self._chunk({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": delta}, "finish_reason": None}],
+            })
+        self._chunk({
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "x_groq": {"usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(words),
+                "total_tokens": prompt_tokens + len(words),
+            }},
+        })
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _chunk(self, payload):
+        self._write_chunk(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+class FakeGroqServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def start_server(host="127.0.0.1", port=0, **settings):
+    """Start the fake server in a daemon thread; returns (server, base_url)."""
+    handler = type("Handler", (FakeGroqHandler,), {"settings": FakeGroqSettings(**settings)})
+    server = FakeGroqServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8088)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds before the first byte")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="0 = instant")
+    parser.add_argument("--reply", default=DEFAULT_REPLY)
+    parser.add_argument("--model-latency", action="append", default=[], metavar="MODEL=SECONDS")
+    parser.add_argument("--model-reply", action="append", default=[], metavar="MODEL=TEXT")
+    args = parser.parse_args()
+
+    server, base_url = start_server(
+        args.host, args.port,
+        latency=args.latency, tokens_per_second=args.tokens_per_second, reply=args.reply,
+        model_latency={model: float(value) for model, _, value in (e.partition("=") for e in args.model_latency)},
+        model_reply=dict(e.partition("=")[::2] for e in args.model_reply),
+    )
+    print(f"Fake Groq server listening on {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
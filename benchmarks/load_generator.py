@@ -0,0 +1,158 @@
+"""
+HTTP load generator for the register -> login -> chat flow.
+
+    python benchmarks/load_generator.py --users 50 --mean-turns 6 --latency 0.3
+
+Each virtual user registers, logs in, then holds one conversation whose length
+is drawn from a geometric distribution (mean --mean-turns, capped at
+--max-turns), pausing --think-time seconds between messages. Some turns go to
+/chat/messages/stream.
+
+Without --target the app runs in-process on a throwaway SQLite database with
+its Groq calls going to benchmarks/fake_groq_server.py, and rate limiting off
+(Rate_Limit_Store=none) unless already set in the environment. With --target
+the flows run against an already running deployment.
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+import httpx
+
+from common import summarize, write_results
+from fake_groq_server import start_server
+from bench_pipeline import USER_TURNS
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+
+    def call(self, client, endpoint, path, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = client.post(path, **kwargs)
+            status = str(response.status_code)
+        except httpx.HTTPError:
+            response, status = None, "error"
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.latencies[endpoint].append(elapsed_ms)
+            self.statuses[endpoint][status] += 1
+        return response
+
+
+def conversation_length(rng, mean, cap):
+    # Geometric: most conversations are short, a few run long.
+    turns = 1
+    while turns < cap and rng.random() > 1 / mean:
+        turns += 1
+    return turns
+
+
+def virtual_user(base_url, recorder, rng, args):
+    email = f"load-{uuid.uuid4().hex[:12]}@example.com"
+    credentials = {"email": email, "password": "load-test-password"}
+    with httpx.Client(base_url=base_url, timeout=args.timeout) as client:
+        if recorder.call(client, "register", "/chat/register", json=credentials) is None:
+            return
+        response = recorder.call(client, "login", "/chat/login", json=credentials)
+        if response is None or response.status_code != 200:
+            return
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        for _ in range(conversation_length(rng, args.mean_turns, args.max_turns)):
+            message = {"message": rng.choice(USER_TURNS)}
+            if rng.random() < args.stream_share:
+                recorder.call(client, "messages_stream", "/chat/messages/stream", json=message, headers=headers)
+            else:
+                recorder.call(client, "messages", "/chat/messages", json=message, headers=headers)
+            if args.think_time:
+                time.sleep(rng.uniform(0, 2 * args.think_time))
+
+
+def start_app(groq_base_url, users):
+    """Run the app in a background thread on a fresh SQLite database; returns (server, base_url)."""
+    tmp = tempfile.mkdtemp()
+    os.environ["Database_URL"] = f"sqlite:///{os.path.join(tmp, 'load.sqlite')}"
+    os.environ["Groq_Base_URL"] = groq_base_url
+    os.environ.setdefault("JWT_Secret", "load-test-secret-that-is-long-enough")
+    os.environ.setdefault("Rate_Limit_Store", "none")
+    os.environ.setdefault("Password_Hash_Queue_Max", str(max(16, users)))
+
+    from werkzeug.serving import make_server
+
+    from app import create_app, db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--target", help="base URL of a running deployment")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--mean-turns", type=float, default=6)
+    parser.add_argument("--max-turns", type=int, default=30)
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean seconds between messages")
+    parser.add_argument("--stream-share", type=float, default=0.2)
+    parser.add_argument("--latency", type=float, default=0.3, help="fake Groq latency in seconds")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    groq_server = app_server = None
+    base_url = args.target
+    if base_url is None:
+        groq_server, groq_base_url = start_server(latency=args.latency, tokens_per_second=args.tokens_per_second)
+        app_server, base_url = start_app(groq_base_url, args.users)
+
+    recorder = Recorder()
+    seeds = random.Random(args.seed)
+    threads = [
+        threading.Thread(target=virtual_user, args=(base_url, recorder, random.Random(seeds.random()), args))
+        for _ in range(args.users)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    if app_server is not None:
+        app_server.shutdown()
+        groq_server.shutdown()
+
+    requests = sum(len(samples) for samples in recorder.latencies.values())
+    results = {
+        "target": args.target or "in-process",
+        "users": args.users,
+        "mean_turns": args.mean_turns,
+        "fake_latency_s": None if args.target else args.latency,
+        "elapsed_s": round(elapsed, 2),
+        "requests": requests,
+        "throughput_per_s": round(requests / elapsed, 1) if elapsed else 0.0,
+        "endpoints": {
+            endpoint: {"statuses": dict(recorder.statuses[endpoint]), "latency": summarize(samples, unit="ms")}
+            for endpoint, samples in recorder.latencies.items()
+        },
+    }
+    write_results("http_load", results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Concurrency of the sync vs async chat orchestration against a fake Groq server.
+
+    python benchmarks/load_test.py --conversations 400 --latency 0.3
+
+"sync" mimics the Dockerfile's gunicorn setup: --sync-workers threads, each
+blocked on its Groq call. "async" runs every conversation on one event loop
+through aorchestrate_response, as a single ASGI worker would.
+"""
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import summarize, write_results
+from fake_groq_server import start_server
+
+
+def _histories(count):
+    from app.agents.prompts import build_history
+
+    # Unique, KB-free messages so every conversation reaches the LLM.
+    return [build_history(None, [], f"question {i} about my setup") for i in range(count)]
+
+
+def run_sync(histories, workers):
+    from app.agents.main_agent import orchestrate_response
+
+    def one(history):
+        start = time.perf_counter()
+        orchestrate_response(history)
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        latencies = list(pool.map(one, histories))
+    return time.perf_counter() - start, latencies
+
+
+def run_async(histories, concurrency):
+    from app.agents.main_agent import aorchestrate_response
+
+    async def main():
+        limit = asyncio.Semaphore(concurrency)
+
+        async def one(history):
+            async with limit:
+                start = time.perf_counter()
+                await aorchestrate_response(history)
+                return (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(one(history) for history in histories))
+        return time.perf_counter() - start, latencies
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--conversations", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=0.3, help="fake Groq latency in seconds")
+    parser.add_argument("--sync-workers", type=int, default=4)
+    parser.add_argument("--async-concurrency", type=int, default=500)
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    server, base_url = start_server(latency=args.latency)
+    # Config reads the environment at import time, so set it before importing the app.
+    os.environ["Groq_Base_URL"] = base_url
+    os.environ["Response_Cache_Backend"] = "none"
+    os.environ["Followup_LLM_Fallback"] = "false"
+
+    histories = _histories(args.conversations)
+    results = {"conversations": args.conversations, "fake_latency_s": args.latency}
+    for mode, runner, width in (
+        ("sync", run_sync, args.sync_workers),
+        ("async", run_async, args.async_concurrency),
+    ):
+        elapsed, latencies = runner([list(history) for history in histories], width)
+        results[mode] = {
+            "concurrency": width,
+            "elapsed_s": round(elapsed, 2),
+            "throughput_per_s": round(len(latencies) / elapsed, 1),
+            "latency": summarize(latencies, unit="ms"),
+        }
+    server.shutdown()
+
+    write_results("chat_concurrency", results, args.out)
+
+
+if __name__ == "__main__":
+    main()
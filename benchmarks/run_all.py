@@ -0,0 +1,65 @@
+"""
+Run every benchmark and collect the results under benchmarks/results/<commit>/.
+
+    python benchmarks/run_all.py [--quick] [--only pipeline http_load]
+
+Compare two commits with benchmarks/compare.py:
+
+    python benchmarks/compare.py benchmarks/results/<old> benchmarks/results/<new>
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+from common import REPO_ROOT, _git_commit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# name -> (script, extra arguments for --quick)
+BENCHMARKS = {
+    "pipeline": ("bench_pipeline.py", ["--repeat", "20", "--queries", "200"]),
+    "knowledge_base": ("bench_knowledge_base.py", ["--sizes", "10", "1000"]),
+    "doc_search": ("bench_doc_search.py", ["--sizes", "1000", "10000"]),
+    "intent_router": ("bench_intent_router.py", ["--repeat", "2"]),
+    "rate_limit": ("bench_rate_limit.py", ["--requests", "500"]),
+    "auth": ("bench_auth.py", ["--requests", "500"]),
+    "tickets": ("bench_tickets.py", ["--tickets", "200"]),
+    "conversation_cache": ("bench_conversation_cache.py", ["--conversations", "50", "--repeat", "2"]),
+    "single_flight": ("bench_single_flight.py", ["--workers", "2", "--threads", "20", "--latency", "0.05"]),
+    "incidents": ("bench_incidents.py", ["--conversations", "200"]),
+    "startup": ("bench_startup.py", ["--runs", "3", "--top", "10"]),
+    "tracing": ("bench_tracing.py", ["--spans", "10000"]),
+    "orchestration": ("load_test.py", ["--conversations", "50", "--latency", "0.05"]),
+    "orchestration_modes": ("bench_orchestration.py", ["--conversations", "50", "--latency", "0.05"]),
+    "http_load": ("load_generator.py", ["--users", "10", "--mean-turns", "3", "--latency", "0.05"]),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS))
+    parser.add_argument("--quick", action="store_true", help="smaller runs, for a smoke check")
+    parser.add_argument("--out-dir", help="default: benchmarks/results/<commit>")
+    args = parser.parse_args()
+
+    out_dir = args.out_dir or os.path.join(HERE, "results", _git_commit() or "unknown")
+    os.makedirs(out_dir, exist_ok=True)
+
+    failed = []
+    for name in args.only or BENCHMARKS:
+        script, quick_args = BENCHMARKS[name]
+        out = os.path.join(out_dir, f"{name}.json")
+        command = [sys.executable, os.path.join(HERE, script), *(quick_args if args.quick else []), "--out", out]
+        print(f"== {name}", file=sys.stderr, flush=True)
+        # One process per benchmark: each sets its own env before importing the app.
+        if subprocess.run(command, cwd=REPO_ROOT, stdout=subprocess.DEVNULL).returncode != 0:
+            failed.append(name)
+
+    print(f"results in {out_dir}", file=sys.stderr)
+    if failed:
+        sys.exit(f"failed: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
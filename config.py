@@ -1,8 +1,185 @@
 import os
 
+from dotenv import load_dotenv
+
+# The one place .env is read; everything else takes its settings from Config.
+load_dotenv()
+
 class Config:
     SECRET_KEY = os.getenv('Secret_Key')
     SQLALCHEMY_DATABASE_URI = os.getenv('Database_URL')
     GROQ_API_KEY = os.getenv('Groq_API_Key')
     JWT_SECRET = os.getenv('JWT_Secret')
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Conversation memory: how many recent messages are loaded verbatim,
+    # and how large the rolling summary of older turns may grow.
+    HISTORY_WINDOW_MESSAGES = int(os.getenv('History_Window_Messages', 18))
+    HISTORY_SUMMARY_BATCH = int(os.getenv('History_Summary_Batch', 200))
+    HISTORY_SUMMARY_MAX_CHARS = int(os.getenv('History_Summary_Max_Chars', 2000))
+
+    # Prompt packing: total model context, minus room left for the completion.
+    CONTEXT_TOKEN_BUDGET = int(os.getenv('Context_Token_Budget', 6000))
+    COMPLETION_TOKEN_RESERVE = int(os.getenv('Completion_Token_Reserve', 1000))
+
+    # Follow-up questions come from a local question bank; only ask the LLM
+    # for one when this is enabled and no service matches the reply.
+    FOLLOWUP_LLM_FALLBACK = os.getenv('Followup_LLM_Fallback', 'false').lower() in ('1', 'true', 'yes')
+
+    # Knowledge base: extra entries from a JSON file and/or the database, and
+    # the share of keyword votes a topic needs before it answers directly.
+    KNOWLEDGE_BASE_PATH = os.getenv('Knowledge_Base_Path')
+    KNOWLEDGE_BASE_FROM_DB = os.getenv('Knowledge_Base_From_DB', 'false').lower() in ('1', 'true', 'yes')
+    KB_MIN_CONFIDENCE = float(os.getenv('KB_Min_Confidence', 0.6))
+
+    # Prebuilt support-doc index (see app/tools/doc_index.py).
+    DOC_INDEX_PATH = os.getenv('Doc_Index_Path')
+
+    # LLM response cache: 'memory' (per worker), 'sqlite' (shared by all
+    # workers on the host through Response_Cache_Path) or 'none'.
+    RESPONSE_CACHE_BACKEND = os.getenv('Response_Cache_Backend', 'memory')
+    RESPONSE_CACHE_PATH = os.getenv('Response_Cache_Path', '/tmp/intercloud_response_cache.sqlite')
+    RESPONSE_CACHE_TTL = int(os.getenv('Response_Cache_TTL', 3600))
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('Response_Cache_Max_Entries', 2048))
+
+    # Conversation-state cache (see app/cache/conversation_cache.py): recent
+    # turns and summary per conversation, 'sqlite' (shared by all workers on
+    # the host), 'memory' (single-process deployments only) or 'none'.
+    # Max_Bytes caps the memory backend.
+    CONVERSATION_CACHE_BACKEND = os.getenv('Conversation_Cache_Backend', 'sqlite')
+    CONVERSATION_CACHE_PATH = os.getenv('Conversation_Cache_Path', '/tmp/intercloud_conversation_cache.sqlite')
+    CONVERSATION_CACHE_TTL = int(os.getenv('Conversation_Cache_TTL', 1800))
+    CONVERSATION_CACHE_MAX_ENTRIES = int(os.getenv('Conversation_Cache_Max_Entries', 10000))
+    CONVERSATION_CACHE_MAX_BYTES = int(os.getenv('Conversation_Cache_Max_Bytes', 64 * 1024 * 1024))
+
+    # Single-flight for LLM completions (see app/cache/single_flight.py):
+    # identical concurrent prompts share one Groq call. Store: 'memory' (per
+    # worker), 'sqlite' (shared by all workers on the host) or 'none' to
+    # disable. A finished reply stays shareable for Window_Ms; a caller stops
+    # waiting for someone else's call after Wait_Seconds.
+    SINGLE_FLIGHT_STORE = os.getenv('Single_Flight_Store', 'sqlite')
+    SINGLE_FLIGHT_PATH = os.getenv('Single_Flight_Path', '/tmp/intercloud_single_flight.sqlite')
+    SINGLE_FLIGHT_WINDOW_MS = int(os.getenv('Single_Flight_Window_Ms', 2000))
+    SINGLE_FLIGHT_WAIT_SECONDS = float(os.getenv('Single_Flight_Wait_Seconds', 30))
+    SINGLE_FLIGHT_POLL_MS = int(os.getenv('Single_Flight_Poll_Ms', 50))
+
+    # Groq endpoint override (e.g. a local fake server for load tests).
+    GROQ_BASE_URL = os.getenv('Groq_Base_URL')
+
+    # Connection pool of the asyncio engine used by the ASGI chat path.
+    ASYNC_DB_POOL_SIZE = int(os.getenv('Async_DB_Pool_Size', 10))
+
+    # LLM gateway: pool size, per-attempt timeout, overall deadline, retries
+    # with jittered backoff, and the circuit breaker guarding Groq.
+    LLM_POOL_CONNECTIONS = int(os.getenv('LLM_Pool_Connections', 20))
+    LLM_POOL_KEEPALIVE = int(os.getenv('LLM_Pool_Keepalive', 10))
+    LLM_TIMEOUT_SECONDS = float(os.getenv('LLM_Timeout_Seconds', 20))
+    LLM_DEADLINE_SECONDS = float(os.getenv('LLM_Deadline_Seconds', 45))
+    LLM_MAX_RETRIES = int(os.getenv('LLM_Max_Retries', 2))
+    LLM_BACKOFF_BASE_SECONDS = float(os.getenv('LLM_Backoff_Base_Seconds', 0.25))
+    LLM_BACKOFF_MAX_SECONDS = float(os.getenv('LLM_Backoff_Max_Seconds', 4))
+    LLM_BREAKER_THRESHOLD = int(os.getenv('LLM_Breaker_Threshold', 5))
+    LLM_BREAKER_RESET_SECONDS = float(os.getenv('LLM_Breaker_Reset_Seconds', 30))
+
+    # Model tiers (see app/agents/model_router.py): the model behind each
+    # tier, overrides of the tier per call site/intent ("answer.doc_search=large,
+    # tool_followup=large"), escalation of weak small-tier answers, per-worker
+    # concurrency per tier, and prices in USD per million tokens.
+    MODEL_SMALL = os.getenv('Model_Small', 'llama-3.1-8b-instant')
+    MODEL_LARGE = os.getenv('Model_Large', 'llama-3.3-70b-versatile')
+    MODEL_ROUTES = os.getenv('Model_Routes', '')
+    MODEL_ESCALATION = os.getenv('Model_Escalation', 'true').lower() in ('1', 'true', 'yes')
+    MODEL_ESCALATION_LONG_PROMPT_CHARS = int(os.getenv('Model_Escalation_Long_Prompt_Chars', 400))
+    MODEL_ESCALATION_MIN_REPLY_CHARS = int(os.getenv('Model_Escalation_Min_Reply_Chars', 40))
+    MODEL_SMALL_CONCURRENCY = int(os.getenv('Model_Small_Concurrency', 32))
+    MODEL_LARGE_CONCURRENCY = int(os.getenv('Model_Large_Concurrency', 4))
+    MODEL_TIER_WAIT_SECONDS = float(os.getenv('Model_Tier_Wait_Seconds', 5))
+    MODEL_SMALL_INPUT_PRICE = float(os.getenv('Model_Small_Input_Price', 0.05))
+    MODEL_SMALL_OUTPUT_PRICE = float(os.getenv('Model_Small_Output_Price', 0.08))
+    MODEL_LARGE_INPUT_PRICE = float(os.getenv('Model_Large_Input_Price', 0.59))
+    MODEL_LARGE_OUTPUT_PRICE = float(os.getenv('Model_Large_Output_Price', 0.79))
+
+    # Chat orchestration: 'sequential', or 'concurrent' to overlap the LLM call
+    # with the local lookups and run independent calls side by side (see
+    # app/agents/fanout.py), at most Orchestration_Max_Parallel per request.
+    ORCHESTRATION_MODE = os.getenv('Orchestration_Mode', 'sequential')
+    ORCHESTRATION_MAX_PARALLEL = int(os.getenv('Orchestration_Max_Parallel', 4))
+    ORCHESTRATION_POOL_WORKERS = int(os.getenv('Orchestration_Pool_Workers', 32))
+
+    # Chat turn persistence: 'sync' commits before replying; 'write_behind'
+    # batches inserts in the background (see app/models/write_behind.py for
+    # the durability trade-off).
+    CHAT_PERSISTENCE = os.getenv('Chat_Persistence', 'sync')
+    CHAT_FLUSH_INTERVAL_MS = int(os.getenv('Chat_Flush_Interval_Ms', 200))
+    CHAT_FLUSH_BATCH_SIZE = int(os.getenv('Chat_Flush_Batch_Size', 200))
+    CHAT_FLUSH_MAX_ATTEMPTS = int(os.getenv('Chat_Flush_Max_Attempts', 3))
+    CHAT_WRITE_QUEUE_MAX = int(os.getenv('Chat_Write_Queue_Max', 5000))
+
+    # Archival (see app/models/archival.py): turns older than this that are
+    # already in the conversation summary leave chat_messages, into
+    # chat_messages_archive or, with Chat_Archive_Dir, gzipped JSONL files.
+    # On Postgres the job also keeps this many monthly partitions ahead.
+    CHAT_ARCHIVE_AFTER_DAYS = int(os.getenv('Chat_Archive_After_Days', 90))
+    CHAT_ARCHIVE_BATCH_SIZE = int(os.getenv('Chat_Archive_Batch_Size', 5000))
+    CHAT_ARCHIVE_DIR = os.getenv('Chat_Archive_Dir')
+    CHAT_PARTITION_MONTHS_AHEAD = int(os.getenv('Chat_Partition_Months_Ahead', 3))
+
+    # Tickets (see app/models/tickets.py): each worker reserves this many
+    # ticket numbers per database round-trip.
+    TICKET_ID_BLOCK_SIZE = int(os.getenv('Ticket_ID_Block_Size', 100))
+
+    # Incident aggregation (see app/agents/incidents.py): once this many
+    # conversations in a worker report the same keyword-triggered issue (OTP)
+    # within the window, reports join one parent incident ticket and get the
+    # cached incident status as reply. The store shares open incidents:
+    # 'sqlite' (all workers on the host), 'memory' (per worker) or 'none' to
+    # disable aggregation.
+    INCIDENT_STORE = os.getenv('Incident_Store', 'sqlite')
+    INCIDENT_STORE_PATH = os.getenv('Incident_Store_Path', '/tmp/intercloud_incidents.sqlite')
+    INCIDENT_WINDOW_SECONDS = int(os.getenv('Incident_Window_Seconds', 300))
+    INCIDENT_THRESHOLD = int(os.getenv('Incident_Threshold', 20))
+    INCIDENT_STATUS_TTL = float(os.getenv('Incident_Status_TTL', 30))
+
+    # Local intent router (see app/agents/intent_router.py): model file, and
+    # the confidence below which a message goes through the LLM as before.
+    INTENT_MODEL_PATH = os.getenv(
+        'Intent_Model_Path',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'agents', 'intent_data', 'intent_router.npz'),
+    )
+    INTENT_MIN_CONFIDENCE = float(os.getenv('Intent_Min_Confidence', 0.75))
+
+    # Per-client rate limits on the chat endpoints (see app/auth/rate_limit.py).
+    # Store: 'memory' (per worker), 'sqlite', 'redis' or 'none' to disable.
+    RATE_LIMIT_STORE = os.getenv('Rate_Limit_Store', 'memory')
+    RATE_LIMIT_STORE_PATH = os.getenv('Rate_Limit_Store_Path', '/tmp/intercloud_rate_limit.sqlite')
+    RATE_LIMIT_REDIS_URL = os.getenv('Rate_Limit_Redis_URL', 'redis://localhost:6379/0')
+    RATE_LIMIT_REQUESTS_PER_MINUTE = float(os.getenv('Rate_Limit_Requests_Per_Minute', 30))
+    RATE_LIMIT_REQUEST_BURST = float(os.getenv('Rate_Limit_Request_Burst', 10))
+    RATE_LIMIT_LLM_TOKENS_PER_MINUTE = float(os.getenv('Rate_Limit_LLM_Tokens_Per_Minute', 20000))
+    RATE_LIMIT_LLM_TOKEN_BURST = float(os.getenv('Rate_Limit_LLM_Token_Burst', 40000))
+
+    # How many verified access tokens each worker remembers (0 disables).
+    JWT_CACHE_SIZE = int(os.getenv('JWT_Cache_Size', 4096))
+
+    # Password hashing (see app/auth/passwords.py): werkzeug method and cost,
+    # pool size per worker, and how many jobs may wait before login/register
+    # answer 503.
+    PASSWORD_HASH_METHOD = os.getenv('Password_Hash_Method', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.getenv('Password_Hash_Workers', 1))
+    PASSWORD_HASH_QUEUE_MAX = int(os.getenv('Password_Hash_Queue_Max', 16))
+    PASSWORD_HASH_TIMEOUT_SECONDS = float(os.getenv('Password_Hash_Timeout_Seconds', 10))
+
+    # Web server (gunicorn.conf.py). With Gunicorn_Preload the master imports
+    # the app and builds its indexes once, and the workers fork with them.
+    GUNICORN_BIND = os.getenv('Gunicorn_Bind', '0.0.0.0:5000')
+    GUNICORN_WORKERS = int(os.getenv('Gunicorn_Workers', 4))
+    GUNICORN_TIMEOUT = int(os.getenv('Gunicorn_Timeout', 120))
+    GUNICORN_PRELOAD = os.getenv('Gunicorn_Preload', 'true').lower() in ('1', 'true', 'yes')
+
+    # Observability: the Prometheus /metrics endpoint, and a Server-Timing
+    # header with per-stage durations on every response.
+    METRICS_ENDPOINT_ENABLED = os.getenv('Metrics_Endpoint_Enabled', 'true').lower() in ('1', 'true', 'yes')
+    # /metrics and /incidents require "Authorization: Bearer <Metrics_Token>";
+    # without a token they only answer clients on the loopback interface.
+    METRICS_TOKEN = os.getenv('Metrics_Token')
+    TRACE_TIMING_HEADER = os.getenv('Trace_Timing_Header', 'false').lower() in ('1', 'true', 'yes')
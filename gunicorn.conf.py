@@ -0,0 +1,38 @@
+"""
+Gunicorn settings:
+
+    gunicorn -c gunicorn.conf.py "app:create_app()"
+
+With Gunicorn_Preload (the default) the master imports the app and runs
+app.warm_up before forking, so workers start with the Groq SDK, NumPy and the
+indexes already loaded, sharing those pages copy-on-write, instead of each
+paying for them on its first request. Whatever holds sockets, threads or
+pools is created per process on first use (pid checks), so forking is safe;
+post_fork only drops the database connections the master may have opened.
+
+Migrations don't run here; see migrate.py.
+"""
+from config import Config
+
+bind = Config.GUNICORN_BIND
+workers = Config.GUNICORN_WORKERS
+timeout = Config.GUNICORN_TIMEOUT
+preload_app = Config.GUNICORN_PRELOAD
+
+
+def when_ready(server):
+    # In the master, after the app is loaded and before any worker is forked
+    if server.cfg.preload_app:
+        from app import warm_up
+
+        warm_up(server.app.wsgi())
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        from app import db
+
+        # The child must open its own connections; close=False leaves the master's alone
+        with server.app.wsgi().app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
@@ -0,0 +1,19 @@
+"""
+Database migrations, run apart from the web server:
+
+    python migrate.py             # upgrade to the latest revision
+    python migrate.py <revision>  # or to a given one
+
+Run it once per release, before rolling out the new workers, e.g. as a
+one-off container from the same image (`docker run <image> python migrate.py`).
+`flask db ...` keeps working for development.
+"""
+import sys
+
+from flask_migrate import upgrade
+
+from app import create_app
+
+if __name__ == '__main__':
+    with create_app(migrations=True).app_context():
+        upgrade(revision=sys.argv[1] if len(sys.argv) > 1 else 'head')
@@ -0,0 +1,53 @@
+"""history window index and conversation summaries
+
+Revision ID: 3a7d91c4e2b5
+Revises: c2e99c2ff1fb
+Create Date: 2026-10-18 10:12:44.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3a7d91c4e2b5'
+down_revision = 'c2e99c2ff1fb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # chat_messages predates the migration history on existing deployments;
+    # create it here so a fresh database ends up with the same schema.
+    inspector = sa.inspect(op.get_bind())
+    if 'chat_messages' not in inspector.get_table_names():
+        op.create_table('chat_messages',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('conversation_id', sa.String(length=64), nullable=False),
+        sa.Column('role', sa.String(length=16), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('chat_messages', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_chat_messages_conversation_id'), ['conversation_id'], unique=False)
+            batch_op.create_index(batch_op.f('ix_chat_messages_created_at'), ['created_at'], unique=False)
+
+    with op.batch_alter_table('chat_messages', schema=None) as batch_op:
+        batch_op.create_index('ix_chat_messages_conversation_created', ['conversation_id', 'created_at'], unique=False)
+
+    op.create_table('conversation_summaries',
+    sa.Column('conversation_id', sa.String(length=64), nullable=False),
+    sa.Column('summary', sa.Text(), nullable=False),
+    sa.Column('summarized_until', sa.DateTime(), nullable=True),
+    sa.Column('message_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('conversation_id')
+    )
+
+
+def downgrade():
+    op.drop_table('conversation_summaries')
+
+    with op.batch_alter_table('chat_messages', schema=None) as batch_op:
+        batch_op.drop_index('ix_chat_messages_conversation_created')
@@ -0,0 +1,136 @@
+"""partition chat_messages by month and add chat_messages_archive
+
+Revision ID: 5c0d2e8f7a41
+Revises: 8e41b0d7a9c3
+Create Date: 2026-10-18 14:52:09.613027
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c0d2e8f7a41'
+down_revision = '8e41b0d7a9c3'
+branch_labels = None
+depends_on = None
+
+# Monthly partitions created ahead of the current month; the archival job
+# (app/models/archival.py) keeps extending them.
+MONTHS_AHEAD = 3
+
+
+def _next_month(month):
+    return month.replace(year=month.year + 1, month=1) if month.month == 12 else month.replace(month=month.month + 1)
+
+
+def _create_partition(month):
+    op.execute(
+        f"CREATE TABLE IF NOT EXISTS chat_messages_{month:%Y_%m} PARTITION OF chat_messages "
+        f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{_next_month(month):%Y-%m-%d}')"
+    )
+
+
+def _partition_postgres():
+    bind = op.get_bind()
+    op.execute("ALTER TABLE chat_messages RENAME TO chat_messages_unpartitioned")
+    op.execute("ALTER TABLE chat_messages_unpartitioned RENAME CONSTRAINT chat_messages_pkey TO chat_messages_unpartitioned_pkey")
+    op.execute("ALTER SEQUENCE chat_messages_id_seq OWNED BY NONE")
+    op.execute("DROP INDEX IF EXISTS ix_chat_messages_conversation_id")
+    op.execute("DROP INDEX IF EXISTS ix_chat_messages_created_at")
+    op.execute("DROP INDEX IF EXISTS ix_chat_messages_conversation_created")
+
+    # The partition key has to be part of the primary key.
+    op.execute("""
+        CREATE TABLE chat_messages (
+            id INTEGER NOT NULL DEFAULT nextval('chat_messages_id_seq'),
+            conversation_id VARCHAR(64) NOT NULL,
+            role VARCHAR(16) NOT NULL,
+            content TEXT NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+            CONSTRAINT chat_messages_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("ALTER SEQUENCE chat_messages_id_seq OWNED BY chat_messages.id")
+    op.create_index('ix_chat_messages_conversation_created', 'chat_messages', ['conversation_id', 'created_at'], unique=False)
+
+    now = datetime.utcnow()
+    oldest = bind.execute(sa.text("SELECT min(created_at) FROM chat_messages_unpartitioned")).scalar() or now
+    month = oldest.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    last = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    for _ in range(MONTHS_AHEAD):
+        last = _next_month(last)
+    while month <= last:
+        _create_partition(month)
+        month = _next_month(month)
+    # Catches rows outside the monthly ranges (e.g. clock skew) instead of failing the insert.
+    op.execute("CREATE TABLE chat_messages_default PARTITION OF chat_messages DEFAULT")
+
+    op.execute("""
+        INSERT INTO chat_messages (id, conversation_id, role, content, created_at)
+        SELECT id, conversation_id, role, content, COALESCE(created_at, now() AT TIME ZONE 'utc')
+        FROM chat_messages_unpartitioned
+    """)
+    op.execute("DROP TABLE chat_messages_unpartitioned")
+
+
+def _unpartition_postgres():
+    op.execute("ALTER TABLE chat_messages RENAME TO chat_messages_partitioned")
+    op.execute("ALTER TABLE chat_messages_partitioned RENAME CONSTRAINT chat_messages_pkey TO chat_messages_partitioned_pkey")
+    op.execute("ALTER SEQUENCE chat_messages_id_seq OWNED BY NONE")
+    op.execute("DROP INDEX IF EXISTS ix_chat_messages_conversation_created")
+    op.execute("""
+        CREATE TABLE chat_messages (
+            id INTEGER NOT NULL DEFAULT nextval('chat_messages_id_seq'),
+            conversation_id VARCHAR(64) NOT NULL,
+            role VARCHAR(16) NOT NULL,
+            content TEXT NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE,
+            CONSTRAINT chat_messages_pkey PRIMARY KEY (id)
+        )
+    """)
+    op.execute("ALTER SEQUENCE chat_messages_id_seq OWNED BY chat_messages.id")
+    op.execute("INSERT INTO chat_messages SELECT id, conversation_id, role, content, created_at FROM chat_messages_partitioned")
+    op.execute("DROP TABLE chat_messages_partitioned")
+    op.create_index('ix_chat_messages_conversation_created', 'chat_messages', ['conversation_id', 'created_at'], unique=False)
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        _partition_postgres()
+    else:
+        # Other databases (SQLite in development) keep one table; the composite
+        # index already serves every query the single-column ones did.
+        op.execute("UPDATE chat_messages SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+        with op.batch_alter_table('chat_messages', schema=None) as batch_op:
+            batch_op.drop_index('ix_chat_messages_conversation_id')
+            batch_op.drop_index('ix_chat_messages_created_at')
+            batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+
+    op.create_table('chat_messages_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('conversation_id', sa.String(length=64), nullable=False),
+    sa.Column('role', sa.String(length=16), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('chat_messages_archive', schema=None) as batch_op:
+        batch_op.create_index('ix_chat_messages_archive_conversation_created', ['conversation_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_table('chat_messages_archive')
+
+    if op.get_bind().dialect.name == 'postgresql':
+        _unpartition_postgres()
+        op.create_index('ix_chat_messages_conversation_id', 'chat_messages', ['conversation_id'], unique=False)
+        op.create_index('ix_chat_messages_created_at', 'chat_messages', ['created_at'], unique=False)
+    else:
+        with op.batch_alter_table('chat_messages', schema=None) as batch_op:
+            batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=True)
+            batch_op.create_index('ix_chat_messages_conversation_id', ['conversation_id'], unique=False)
+            batch_op.create_index('ix_chat_messages_created_at', ['created_at'], unique=False)
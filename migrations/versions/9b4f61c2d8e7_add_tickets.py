@@ -0,0 +1,44 @@
+"""add tickets and id_blocks
+
+Revision ID: 9b4f61c2d8e7
+Revises: 5c0d2e8f7a41
+Create Date: 2026-10-18 15:20:41.207316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b4f61c2d8e7'
+down_revision = '5c0d2e8f7a41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('id_blocks',
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('next_value', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.bulk_insert(
+        sa.table('id_blocks', sa.column('name', sa.String), sa.column('next_value', sa.BigInteger)),
+        [{'name': 'tickets', 'next_value': 1}],
+    )
+
+    op.create_table('tickets',
+    sa.Column('number', sa.BigInteger(), autoincrement=False, nullable=False),
+    sa.Column('conversation_id', sa.String(length=64), nullable=True),
+    sa.Column('fingerprint', sa.String(length=64), nullable=False),
+    sa.Column('issue', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=32), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('number'),
+    sa.UniqueConstraint('conversation_id', 'fingerprint', name='uq_tickets_conversation_fingerprint')
+    )
+
+
+def downgrade():
+    op.drop_table('tickets')
+    op.drop_table('id_blocks')
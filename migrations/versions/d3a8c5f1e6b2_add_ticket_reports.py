@@ -0,0 +1,38 @@
+"""add ticket_reports
+
+Revision ID: d3a8c5f1e6b2
+Revises: 9b4f61c2d8e7
+Create Date: 2026-10-18 16:05:12.480913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a8c5f1e6b2'
+down_revision = '9b4f61c2d8e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('ticket_reports',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('ticket_number', sa.BigInteger(), nullable=False),
+    sa.Column('conversation_id', sa.String(length=64), nullable=False),
+    sa.Column('issue', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['ticket_number'], ['tickets.number'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('ticket_number', 'conversation_id', name='uq_ticket_reports_ticket_conversation')
+    )
+    with op.batch_alter_table('ticket_reports', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_ticket_reports_conversation_id'), ['conversation_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('ticket_reports', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_ticket_reports_conversation_id'))
+
+    op.drop_table('ticket_reports')
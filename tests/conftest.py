@@ -0,0 +1,41 @@
+"""
+Shared fixtures. Settings are read when config is imported, so the
+environment is set up here, before anything imports the app: a throwaway
+SQLite database and in-process caches instead of the /tmp SQLite files.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ.update(
+    Database_URL=f"sqlite:///{os.path.join(_tmp.name, 'test.sqlite')}",
+    Groq_API_Key="test",
+    Response_Cache_Backend="memory",
+    Conversation_Cache_Backend="memory",
+    Single_Flight_Store="memory",
+    Incident_Store="memory",
+)
+
+from app import create_app, db  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def app():
+    return create_app()
+
+
+@pytest.fixture
+def session(app):
+    """A fresh schema per test, with an app context pushed."""
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield db.session
+        db.session.remove()
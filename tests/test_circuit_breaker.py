@@ -0,0 +1,173 @@
+import time
+
+import httpx
+import pytest
+
+from app.agents import llm_gateway
+from app.agents.llm_gateway import CircuitBreaker, LLMError, LLMUnavailable
+from config import Config
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def _expire(breaker):
+    """Move opened_at back past the reset timeout."""
+    breaker.opened_at = time.monotonic() - breaker.reset_timeout - 1
+
+
+def test_opens_after_threshold_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.record_failure()
+        assert breaker.state == "closed"
+        assert breaker.allow() == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.allow() is False
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_half_open_lets_a_single_trial_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    _expire(breaker)
+    assert breaker.state == "half_open"
+    assert breaker.allow() == "half_open"
+    assert breaker.allow() is False
+
+
+def test_trial_success_closes():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    _expire(breaker)
+    breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+    assert breaker.allow() == "closed"
+
+
+def test_trial_failure_reopens():
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30)
+    for _ in range(5):
+        breaker.record_failure()
+    _expire(breaker)
+    assert breaker.allow() == "half_open"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.allow() is False
+
+
+def test_closed_after_trial_needs_the_full_threshold_again():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(3):
+        breaker.record_failure()
+    _expire(breaker)
+    breaker.allow()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_end_trial_without_a_verdict_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    _expire(breaker)
+    breaker.allow()
+    breaker.end_trial()
+    assert breaker.state == "open"
+    _expire(breaker)
+    assert breaker.allow() == "half_open"
+
+
+def test_end_trial_after_a_verdict_does_nothing():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    _expire(breaker)
+    breaker.allow()
+    breaker.record_success()
+    breaker.end_trial()
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+
+
+class _Completions:
+    def __init__(self, outcome):
+        self.outcome = outcome
+
+    def create(self, **kwargs):
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return self.outcome
+
+
+class _Client:
+    def __init__(self, outcome):
+        self.chat = type("Chat", (), {"completions": _Completions(outcome)})()
+
+
+@pytest.fixture
+def gateway_breaker(monkeypatch):
+    """A half-open breaker installed in the gateway, and a way to script the client."""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    _expire(breaker)
+    monkeypatch.setattr(llm_gateway, "breaker", breaker)
+
+    def respond(outcome):
+        monkeypatch.setattr(llm_gateway, "get_client", lambda: _Client(outcome))
+
+    return breaker, respond
+
+
+def test_gateway_trial_rejected_by_upstream_reopens(gateway_breaker):
+    breaker, respond = gateway_breaker
+    groq = llm_gateway.sdk()
+    response = httpx.Response(400, request=httpx.Request("POST", "http://groq.test"))
+    respond(groq.BadRequestError("bad request", response=response, body=None))
+    with pytest.raises(LLMError):
+        llm_gateway._complete(MESSAGES, "test", "model", False)
+    # A non-retryable error is no verdict on upstream health, but the trial is over
+    assert breaker.state == "open"
+    assert not breaker._trial_in_flight
+
+
+def test_gateway_trial_that_raises_unexpectedly_reopens(gateway_breaker):
+    breaker, respond = gateway_breaker
+    respond(RuntimeError("boom"))
+    with pytest.raises(RuntimeError):
+        llm_gateway._complete(MESSAGES, "test", "model", False)
+    assert breaker.state == "open"
+
+
+def test_gateway_trial_out_of_retries_reopens(gateway_breaker, monkeypatch):
+    breaker, respond = gateway_breaker
+    monkeypatch.setattr(Config, "LLM_MAX_RETRIES", 0)
+    groq = llm_gateway.sdk()
+    respond(groq.APIConnectionError(request=httpx.Request("POST", "http://groq.test")))
+    with pytest.raises(LLMUnavailable):
+        llm_gateway._complete(MESSAGES, "test", "model", False)
+    assert breaker.state == "open"
+
+
+def test_gateway_trial_success_closes(gateway_breaker):
+    breaker, respond = gateway_breaker
+    respond("reply")
+    assert llm_gateway._complete(MESSAGES, "test", "model", False) == "reply"
+    assert breaker.state == "closed"
+
+
+def test_gateway_fails_fast_while_open(gateway_breaker):
+    breaker, respond = gateway_breaker
+    breaker.opened_at = time.monotonic()
+    respond("reply")
+    with pytest.raises(LLMUnavailable):
+        llm_gateway._complete(MESSAGES, "test", "model", False)
@@ -0,0 +1,107 @@
+import pytest
+from sqlalchemy import func, select, update
+
+from app.agents.incidents import IncidentAggregator
+from app.models.chat import Ticket, TicketReport
+from config import Config
+
+ISSUE = "I'm not getting my OTP"
+
+
+@pytest.fixture
+def incidents(session, monkeypatch):
+    monkeypatch.setattr(Config, "INCIDENT_STORE", "memory")
+    monkeypatch.setattr(Config, "INCIDENT_THRESHOLD", 3)
+    return IncidentAggregator()
+
+
+def _reports(session):
+    return session.execute(
+        select(TicketReport.conversation_id).order_by(TicketReport.conversation_id)
+    ).scalars().all()
+
+
+def test_no_incident_below_threshold(incidents, session):
+    assert incidents.report("otp", "c1", ISSUE) is None
+    assert incidents.report("otp", "c2", ISSUE) is None
+    # A conversation repeating itself doesn't count twice
+    assert incidents.report("otp", "c2", ISSUE) is None
+    assert session.scalar(select(func.count()).select_from(Ticket)) == 0
+
+
+def test_threshold_opens_one_parent_ticket(incidents, session):
+    incidents.report("otp", "c1", ISSUE)
+    incidents.report("otp", "c2", ISSUE)
+    status = incidents.report("otp", "c3", ISSUE)
+    assert status["attached"]
+    assert status["category"] == "otp"
+    assert status["label"] == "OTP delivery"
+
+    incidents.report("otp", "c4", ISSUE)
+    parents = session.execute(select(Ticket)).scalars().all()
+    assert [parent.number for parent in parents] == [status["number"]]
+    assert parents[0].conversation_id == "incident:otp"
+
+
+def test_conversations_before_the_incident_attach_on_their_next_report(incidents, session):
+    incidents.report("otp", "c1", ISSUE)
+    incidents.report("otp", "c2", ISSUE)
+    incidents.report("otp", "c3", ISSUE)
+    assert _reports(session) == ["c3"]
+
+    # c1 and c2 pushed the count to the threshold; the sketch sees them as repeats
+    assert incidents.report("otp", "c1", ISSUE)["attached"]
+    assert incidents.report("otp", "c2", ISSUE)["attached"]
+    assert _reports(session) == ["c1", "c2", "c3"]
+
+
+def test_repeat_reports_attach_once(incidents, session):
+    for conversation_id in ("c1", "c2", "c3"):
+        incidents.report("otp", conversation_id, ISSUE)
+    status = incidents.report("otp", "c3", "still no OTP")
+    assert status is not None
+    assert not status["attached"]
+    assert _reports(session) == ["c3"]
+
+
+def test_sketch_collision_does_not_stop_attaching(incidents, session, monkeypatch):
+    for conversation_id in ("c1", "c2", "c3"):
+        incidents.report("otp", conversation_id, ISSUE)
+    # Every key collides: each new conversation looks like a repeat to the sketch
+    monkeypatch.setattr(incidents, "_count", lambda category, conversation_id, now: Config.INCIDENT_THRESHOLD)
+    assert incidents.report("otp", "c4", ISSUE)["attached"]
+    assert "c4" in _reports(session)
+
+
+def test_resolved_incident_stops_attaching(incidents, session, monkeypatch):
+    # Re-read the parent ticket's status on every report
+    monkeypatch.setattr(Config, "INCIDENT_STATUS_TTL", 0)
+    for conversation_id in ("c1", "c2", "c3"):
+        status = incidents.report("otp", conversation_id, ISSUE)
+    session.execute(update(Ticket).where(Ticket.number == status["number"]).values(status="Resolved"))
+    session.commit()
+
+    assert incidents.report("otp", "c5", ISSUE) is None
+    assert "c5" not in _reports(session)
+
+
+def test_categories_are_counted_separately(incidents, session):
+    for conversation_id in ("c1", "c2"):
+        incidents.report("otp", conversation_id, ISSUE)
+    assert incidents.report("billing", "c3", "I was billed twice") is None
+    counts = incidents.counts()["categories"]
+    assert counts["otp"]["conversations"] == 2
+    assert counts["billing"]["conversations"] == 1
+
+
+def test_disabled_store_handles_every_report_as_before(session, monkeypatch):
+    monkeypatch.setattr(Config, "INCIDENT_STORE", "none")
+    monkeypatch.setattr(Config, "INCIDENT_THRESHOLD", 1)
+    incidents = IncidentAggregator()
+    assert incidents.report("otp", "c1", ISSUE) is None
+    assert session.scalar(select(func.count()).select_from(Ticket)) == 0
+
+
+def test_reports_without_a_conversation_are_not_counted(incidents):
+    assert incidents.report("otp", None, ISSUE) is None
+    assert incidents.counts()["categories"] == {}
@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.agents.memory import load_recent_rows, load_user_history, update_rolling_summary
+from app.models.chat import ChatMessage, ConversationSummary, User
+from config import Config
+
+START = datetime(2024, 1, 1, 12, 0)
+
+
+def add_turns(session, conversation_id, count, start=0):
+    """`count` alternating user/assistant messages, one second apart; returns them oldest first."""
+    messages = [
+        ChatMessage(
+            conversation_id=conversation_id,
+            role="user" if i % 2 == 0 else "assistant",
+            content=f"message {i}",
+            created_at=START + timedelta(seconds=i),
+        )
+        for i in range(start, start + count)
+    ]
+    session.add_all(messages)
+    session.commit()
+    return messages
+
+
+@pytest.fixture
+def batch(monkeypatch):
+    monkeypatch.setattr(Config, "HISTORY_SUMMARY_BATCH", 3)
+
+
+def test_nothing_to_fold_inside_the_window(session):
+    add_turns(session, "c1", 4)
+    assert update_rolling_summary("c1", window=4) is None
+    assert session.get(ConversationSummary, "c1") is None
+
+
+def test_overflow_is_folded_in_batches(session, batch):
+    messages = add_turns(session, "c1", 10)
+
+    summary = update_rolling_summary("c1", window=4)
+    session.commit()
+    assert summary.message_count == 3
+    assert summary.summarized_until == messages[2].created_at
+    assert summary.summary == "User: message 0\nAssistant: message 1\nUser: message 2"
+
+    summary = update_rolling_summary("c1", window=4)
+    session.commit()
+    assert summary.message_count == 6
+    assert summary.summarized_until == messages[5].created_at
+    assert summary.summary.splitlines()[-1] == "Assistant: message 5"
+
+    # Everything before the window is folded; further calls change nothing
+    summary = update_rolling_summary("c1", window=4)
+    assert summary.message_count == 6
+    assert summary.summarized_until == messages[5].created_at
+
+
+def test_new_turns_fold_only_what_left_the_window(session, batch):
+    messages = add_turns(session, "c1", 6)
+    update_rolling_summary("c1", window=4)
+    session.commit()
+    messages += add_turns(session, "c1", 2, start=6)
+
+    summary = update_rolling_summary("c1", window=4)
+    assert summary.message_count == 4
+    assert summary.summarized_until == messages[3].created_at
+
+
+def test_conversations_are_folded_independently(session, batch):
+    add_turns(session, "c1", 6)
+    add_turns(session, "c2", 4)
+    update_rolling_summary("c1", window=4)
+    session.commit()
+    assert update_rolling_summary("c2", window=4) is None
+
+
+def test_summary_keeps_its_newest_lines_within_budget(session, monkeypatch):
+    monkeypatch.setattr(Config, "HISTORY_SUMMARY_MAX_CHARS", 40)
+    add_turns(session, "c1", 12)
+    summary = update_rolling_summary("c1", window=2)
+    assert len(summary.summary) <= 40
+    assert summary.summary.splitlines()[-1] == "Assistant: message 9"
+    # Trimmed at a line boundary, not mid-line
+    assert all(line.startswith(("User: ", "Assistant: ")) for line in summary.summary.splitlines())
+
+
+def test_load_recent_rows_skips_summarized_messages(session, batch):
+    add_turns(session, "c1", 10)
+    update_rolling_summary("c1", window=4)
+    session.commit()
+
+    summary, rows = load_recent_rows("c1", limit=18)
+    assert summary.splitlines()[0] == "User: message 0"
+    assert [content for _, content, _ in rows] == [f"message {i}" for i in range(3, 10)]
+
+    _, rows = load_recent_rows("c1", limit=2)
+    assert [content for _, content, _ in rows] == ["message 8", "message 9"]
+
+
+def test_load_recent_rows_without_a_summary(session):
+    add_turns(session, "c1", 3)
+    summary, rows = load_recent_rows("c1")
+    assert summary is None
+    assert [(role, content) for role, content, _ in rows] == [
+        ("user", "message 0"), ("assistant", "message 1"), ("user", "message 2"),
+    ]
+
+
+def test_load_user_history_resolves_the_default_conversation(session, batch):
+    user = User(email="ana@example.com", password_hash="x", default_conversation_id="c1")
+    session.add(user)
+    add_turns(session, "c1", 6)
+    update_rolling_summary("c1", window=4)
+    session.commit()
+
+    conversation_id, summary, rows = load_user_history(user.id)
+    assert conversation_id == "c1"
+    assert summary.startswith("User: message 0")
+    assert [content for _, content, _ in rows] == ["message 2", "message 3", "message 4", "message 5"]
+
+
+def test_load_user_history_for_a_new_or_unknown_user(session):
+    user = User(email="new@example.com", password_hash="x", default_conversation_id="c9")
+    session.add(user)
+    session.commit()
+    assert load_user_history(user.id) == ("c9", None, [])
+    assert load_user_history(user.id + 1) is None
@@ -0,0 +1,95 @@
+import pytest
+
+from app.cache import response_cache
+from app.cache.response_cache import cache_key, conversation_key, lookup, normalize_prompt, store
+
+SYSTEM = {"role": "system", "content": "You are the support assistant."}
+
+
+def user(content):
+    return {"role": "user", "content": content}
+
+
+def assistant(content):
+    return {"role": "assistant", "content": content}
+
+
+@pytest.fixture(autouse=True)
+def backend(monkeypatch):
+    """A fresh in-memory backend per test."""
+    monkeypatch.setattr(response_cache, "_backend", None)
+    return response_cache.get_backend()
+
+
+def test_normalize_prompt_ignores_case_punctuation_and_spacing():
+    assert normalize_prompt("  How do I RESET my password?!  ") == "how do i reset my password?"
+    assert normalize_prompt("reset, password") == normalize_prompt("Reset   password.")
+
+
+def test_cache_key_normalizes_the_user_turn():
+    assert cache_key([SYSTEM, user("What is Intercloud?")]) == cache_key([SYSTEM, user("what is  INTERCLOUD?")])
+
+
+def test_cache_key_depends_on_the_system_prompt():
+    other = {"role": "system", "content": "You are the billing assistant."}
+    assert cache_key([SYSTEM, user("hello")]) != cache_key([other, user("hello")])
+
+
+def test_cache_key_leaves_out_the_conversation_so_far():
+    first = [SYSTEM, user("what services do you offer?")]
+    later = [SYSTEM, user("hi"), assistant("Hello! How can I help?"), user("What services do you offer?")]
+    assert cache_key(first) == cache_key(later)
+
+
+def test_conversation_key_includes_the_conversation_so_far():
+    first = [SYSTEM, user("what services do you offer?")]
+    later = [SYSTEM, user("hi"), assistant("Hello! How can I help?"), user("What services do you offer?")]
+    assert conversation_key(first) != conversation_key(later)
+    assert conversation_key(later) == conversation_key(later[:-1] + [user("What services, do you offer?")])
+
+
+@pytest.mark.parametrize("messages", [
+    [],
+    [SYSTEM, user("hi"), assistant("Hello!")],
+    [user("no system prompt")],
+])
+def test_cache_key_is_none_when_not_cacheable(messages):
+    assert cache_key(messages) is None
+
+
+def test_conversation_key_is_none_unless_answering_a_user_turn():
+    assert conversation_key([SYSTEM, user("hi"), assistant("Hello!")]) is None
+    assert conversation_key([]) is None
+
+
+def test_first_turn_reply_is_stored_and_served():
+    messages = [SYSTEM, user("What is Intercloud?")]
+    key, reply = lookup(messages)
+    assert key is not None and reply is None
+    store(key, "Intercloud is a cloud provider.", messages)
+
+    assert lookup([SYSTEM, user("what is intercloud?")]) == (key, "Intercloud is a cloud provider.")
+
+
+def test_mid_conversation_reply_is_not_stored(backend):
+    messages = [SYSTEM, user("my name is Ana"), assistant("Hi Ana!"), user("What is Intercloud?")]
+    key = cache_key(messages)
+    store(key, "Ana, Intercloud is a cloud provider.", messages)
+    assert backend.get(key) is None
+
+
+def test_mid_conversation_turn_only_served_for_faq_intents():
+    first = [SYSTEM, user("What is Intercloud?")]
+    key, _ = lookup(first)
+    store(key, "Intercloud is a cloud provider.", first)
+
+    later = [SYSTEM, user("hi"), assistant("Hello!"), user("What is Intercloud?")]
+    assert lookup(later) == (None, None)
+    assert lookup(later, intent="ticket") == (None, None)
+    assert lookup(later, intent=response_cache.FAQ_INTENTS[0]) == (key, "Intercloud is a cloud provider.")
+
+
+def test_disabled_backend_skips_lookup(monkeypatch):
+    monkeypatch.setattr(response_cache, "_backend", None)
+    monkeypatch.setattr(response_cache.Config, "RESPONSE_CACHE_BACKEND", "none")
+    assert lookup([SYSTEM, user("What is Intercloud?")]) == (None, None)
@@ -0,0 +1,86 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func, select
+
+from app import db
+from app.models.chat import IdBlock, Ticket
+from app.models.tickets import BlockAllocator, fingerprint, format_ticket_id, ticket_store
+
+
+def test_fingerprint_ignores_wording_noise():
+    assert fingerprint("My server is DOWN!") == fingerprint("my server is down")
+    assert fingerprint("my server is down") != fingerprint("my database is down")
+
+
+def test_create_is_idempotent_per_conversation(session):
+    ticket, created = ticket_store.create("My server is down!", conversation_id="c1")
+    assert created
+    assert ticket["ticket_id"] == format_ticket_id(ticket["number"])
+    assert ticket["status"] == "Created"
+
+    again, created = ticket_store.create("my server is DOWN", conversation_id="c1")
+    assert not created
+    assert again == ticket
+    assert session.scalar(select(func.count()).select_from(Ticket)) == 1
+
+
+def test_same_issue_in_another_conversation_gets_its_own_ticket(session):
+    first, _ = ticket_store.create("My server is down", conversation_id="c1")
+    second, created = ticket_store.create("My server is down", conversation_id="c2")
+    assert created
+    assert second["number"] != first["number"]
+
+
+def test_different_issue_in_the_same_conversation_gets_its_own_ticket(session):
+    first, _ = ticket_store.create("My server is down", conversation_id="c1")
+    second, created = ticket_store.create("I was billed twice", conversation_id="c1")
+    assert created
+    assert second["number"] != first["number"]
+
+
+def test_key_shares_a_ticket_however_the_issue_is_worded(session):
+    first, _ = ticket_store.create("I never got the OTP", conversation_id="c1", key="otp")
+    second, created = ticket_store.create("OTP code not arriving", conversation_id="c1", key="otp")
+    assert not created
+    assert second["number"] == first["number"]
+
+
+def test_without_a_conversation_every_call_creates(session):
+    first, _ = ticket_store.create("My server is down")
+    second, created = ticket_store.create("My server is down")
+    assert created
+    assert second["number"] != first["number"]
+
+
+def test_concurrent_creates_for_the_same_issue_share_one_ticket(session):
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: ticket_store.create("My server is down", conversation_id="c1"), range(8)))
+    assert len({ticket["number"] for ticket, _ in results}) == 1
+    assert sum(created for _, created in results) == 1
+
+
+def test_allocator_reserves_blocks_and_hands_out_sequential_numbers(session):
+    allocator = BlockAllocator("test", block_size=5)
+    assert [allocator.next(db.engine) for _ in range(7)] == [1, 2, 3, 4, 5, 6, 7]
+    # Two blocks reserved: the counter points past the second one
+    assert session.get(IdBlock, "test").next_value == 11
+
+
+def test_allocators_sharing_a_counter_never_overlap(session):
+    allocators = [BlockAllocator("test", block_size=3) for _ in range(4)]
+    engine = db.engine
+
+    def take(allocator):
+        return [allocator.next(engine) for _ in range(25)]
+
+    with ThreadPoolExecutor(len(allocators)) as pool:
+        numbers = [number for taken in pool.map(take, allocators) for number in taken]
+    assert len(numbers) == len(set(numbers)) == 100
+
+
+def test_allocator_is_thread_safe(session):
+    allocator = BlockAllocator("test", block_size=4)
+    engine = db.engine
+    with ThreadPoolExecutor(8) as pool:
+        numbers = list(pool.map(lambda _: allocator.next(engine), range(64)))
+    assert sorted(numbers) == list(range(1, 65))